@@ -0,0 +1,35 @@
+"""add composite indexes on lancamento
+
+Revision ID: 5e0b7c2d9a61
+Revises: c3a9e1f2b7d4
+Create Date: 2026-10-17 10:02:17.554930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e0b7c2d9a61'
+down_revision: Union[str, Sequence[str], None] = 'c3a9e1f2b7d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_lancamento_data_id', 'lancamento', ['data', 'id'], unique=False)
+    op.create_index('ix_lancamento_natureza_data', 'lancamento', ['natureza_code', 'data'], unique=False)
+    op.create_index('ix_lancamento_conta_data', 'lancamento', ['conta_id', 'data'], unique=False)
+    op.create_index('ix_lancamento_categoria_data', 'lancamento', ['categoria_id', 'data'], unique=False)
+    op.create_index('ix_lancamento_centro_data', 'lancamento', ['centro_id', 'data'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_lancamento_centro_data', table_name='lancamento')
+    op.drop_index('ix_lancamento_categoria_data', table_name='lancamento')
+    op.drop_index('ix_lancamento_conta_data', table_name='lancamento')
+    op.drop_index('ix_lancamento_natureza_data', table_name='lancamento')
+    op.drop_index('ix_lancamento_data_id', table_name='lancamento')
@@ -0,0 +1,68 @@
+"""create lancamento_mensal rollup
+
+Revision ID: 9d4f2a6b8e13
+Revises: 5e0b7c2d9a61
+Create Date: 2026-10-17 14:21:40.118302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4f2a6b8e13'
+down_revision: Union[str, Sequence[str], None] = '5e0b7c2d9a61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('lancamento_mensal',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('mes', sa.Date(), nullable=False),
+    sa.Column('natureza_code', sa.String(), nullable=False),
+    sa.Column('conta_id', sa.Integer(), nullable=True),
+    sa.Column('categoria_id', sa.Integer(), nullable=True),
+    sa.Column('centro_id', sa.Integer(), nullable=True),
+    sa.Column('dre', sa.Boolean(), nullable=False),
+    sa.Column('ir_eduardo', sa.Boolean(), nullable=False),
+    sa.Column('ir_roberto', sa.Boolean(), nullable=False),
+    sa.Column('valor', sa.Numeric(), nullable=False),
+    sa.Column('quantidade', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['natureza_code'], ['natureza.code'], ),
+    sa.ForeignKeyConstraint(['conta_id'], ['conta.id'], ),
+    sa.ForeignKeyConstraint(['categoria_id'], ['categoria.id'], ),
+    sa.ForeignKeyConstraint(['centro_id'], ['centro.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_lancamento_mensal_categoria_mes', 'lancamento_mensal', ['categoria_id', 'mes'], unique=False)
+    op.create_index('ux_lancamento_mensal_chave', 'lancamento_mensal', [
+        'mes', 'natureza_code',
+        sa.text('coalesce(conta_id, 0)'),
+        sa.text('coalesce(categoria_id, 0)'),
+        sa.text('coalesce(centro_id, 0)'),
+        'dre', 'ir_eduardo', 'ir_roberto',
+    ], unique=True)
+
+    # carga inicial a partir dos lançamentos existentes
+    if op.get_bind().dialect.name == 'postgresql':
+        mes = "date_trunc('month', data)::date"
+    else:
+        mes = "date(data, 'start of month')"
+    op.execute(
+        "INSERT INTO lancamento_mensal "
+        "(mes, natureza_code, conta_id, categoria_id, centro_id, dre, ir_eduardo, ir_roberto, valor, quantidade) "
+        f"SELECT {mes}, natureza_code, conta_id, categoria_id, centro_id, "
+        "coalesce(dre, false), coalesce(ir_eduardo, false), coalesce(ir_roberto, false), sum(valor), count(*) "
+        "FROM lancamento GROUP BY 1, 2, 3, 4, 5, 6, 7, 8"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ux_lancamento_mensal_chave', table_name='lancamento_mensal')
+    op.drop_index('ix_lancamento_mensal_categoria_mes', table_name='lancamento_mensal')
+    op.drop_table('lancamento_mensal')
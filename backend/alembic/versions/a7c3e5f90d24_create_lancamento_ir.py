@@ -0,0 +1,123 @@
+"""create lancamento_ir, drop ir_eduardo/ir_roberto
+
+Revision ID: a7c3e5f90d24
+Revises: f4b9d2a7c318
+Create Date: 2026-10-17 22:40:03.551871
+
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c3e5f90d24'
+down_revision: Union[str, Sequence[str], None] = 'f4b9d2a7c318'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# coluna antiga → sócio (nome do seed)
+COLUNAS_SOCIOS = {'ir_eduardo': 'Eduardo Paim', 'ir_roberto': 'Roberto Paim'}
+
+
+def _mes() -> str:
+    if op.get_bind().dialect.name == 'postgresql':
+        return "date_trunc('month', data)::date"
+    return "date(data, 'start of month')"
+
+
+def _chave_mensal(*flags) -> list:
+    return [
+        'mes', 'natureza_code',
+        sa.text('coalesce(conta_id, 0)'),
+        sa.text('coalesce(categoria_id, 0)'),
+        sa.text('coalesce(centro_id, 0)'),
+        'dre', *flags,
+    ]
+
+
+def _nova_versao_lancamento() -> None:
+    """Todas as linhas mudam de formato: os clientes do delta recebem tudo de novo."""
+    agora = datetime.now(timezone.utc).replace(tzinfo=None)
+    op.get_bind().execute(
+        sa.text("UPDATE tabela_versao SET versao = versao + 1, atualizado_em = :agora "
+                "WHERE tabela IN ('lancamento', 'lancamento_mensal')"),
+        {'agora': agora},
+    )
+    op.execute("UPDATE lancamento SET seq = (SELECT versao FROM tabela_versao WHERE tabela = 'lancamento')")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('lancamento_ir',
+    sa.Column('lancamento_id', sa.Integer(), nullable=False),
+    sa.Column('socio_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['lancamento_id'], ['lancamento.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['socio_id'], ['socio.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('lancamento_id', 'socio_id')
+    )
+    op.create_index('ix_lancamento_ir_socio', 'lancamento_ir', ['socio_id', 'lancamento_id'], unique=False)
+
+    bind = op.get_bind()
+    for coluna, nome in COLUNAS_SOCIOS.items():
+        # marcações antigas sem o sócio cadastrado: cria o sócio para não perdê-las
+        bind.execute(sa.text(
+            "INSERT INTO socio (nome, saldo_inicial) SELECT CAST(:nome AS VARCHAR), 0 "
+            f"WHERE EXISTS (SELECT 1 FROM lancamento WHERE {coluna}) "
+            "AND NOT EXISTS (SELECT 1 FROM socio WHERE nome = :nome)"
+        ), {'nome': nome})
+        bind.execute(sa.text(
+            "INSERT INTO lancamento_ir (lancamento_id, socio_id) "
+            f"SELECT l.id, s.id FROM lancamento l JOIN socio s ON s.nome = :nome WHERE l.{coluna}"
+        ), {'nome': nome})
+
+    # resumo mensal sem as marcações de IR
+    op.drop_index('ux_lancamento_mensal_chave', table_name='lancamento_mensal')
+    op.execute("DELETE FROM lancamento_mensal")
+    op.drop_column('lancamento_mensal', 'ir_roberto')
+    op.drop_column('lancamento_mensal', 'ir_eduardo')
+    op.execute(
+        "INSERT INTO lancamento_mensal "
+        "(mes, natureza_code, conta_id, categoria_id, centro_id, dre, valor, quantidade) "
+        f"SELECT {_mes()}, natureza_code, conta_id, categoria_id, centro_id, "
+        "coalesce(dre, false), sum(valor), count(*) "
+        "FROM lancamento GROUP BY 1, 2, 3, 4, 5, 6"
+    )
+    op.create_index('ux_lancamento_mensal_chave', 'lancamento_mensal', _chave_mensal(), unique=True)
+
+    op.drop_column('lancamento', 'ir_roberto')
+    op.drop_column('lancamento', 'ir_eduardo')
+    _nova_versao_lancamento()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('lancamento', sa.Column('ir_eduardo', sa.Boolean(), server_default=sa.false(), nullable=True))
+    op.add_column('lancamento', sa.Column('ir_roberto', sa.Boolean(), server_default=sa.false(), nullable=True))
+    bind = op.get_bind()
+    for coluna, nome in COLUNAS_SOCIOS.items():
+        bind.execute(sa.text(
+            f"UPDATE lancamento SET {coluna} = true WHERE id IN ("
+            "SELECT i.lancamento_id FROM lancamento_ir i JOIN socio s ON s.id = i.socio_id WHERE s.nome = :nome)"
+        ), {'nome': nome})
+
+    op.drop_index('ux_lancamento_mensal_chave', table_name='lancamento_mensal')
+    op.execute("DELETE FROM lancamento_mensal")
+    # NOT NULL sem default não entra por ALTER (SQLite recusa); o INSERT abaixo recalcula as marcações
+    op.add_column('lancamento_mensal', sa.Column('ir_eduardo', sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.add_column('lancamento_mensal', sa.Column('ir_roberto', sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.execute(
+        "INSERT INTO lancamento_mensal "
+        "(mes, natureza_code, conta_id, categoria_id, centro_id, dre, ir_eduardo, ir_roberto, valor, quantidade) "
+        f"SELECT {_mes()}, natureza_code, conta_id, categoria_id, centro_id, "
+        "coalesce(dre, false), coalesce(ir_eduardo, false), coalesce(ir_roberto, false), sum(valor), count(*) "
+        "FROM lancamento GROUP BY 1, 2, 3, 4, 5, 6, 7, 8"
+    )
+    op.create_index('ux_lancamento_mensal_chave', 'lancamento_mensal',
+                    _chave_mensal('ir_eduardo', 'ir_roberto'), unique=True)
+
+    op.drop_index('ix_lancamento_ir_socio', table_name='lancamento_ir')
+    op.drop_table('lancamento_ir')
+    _nova_versao_lancamento()
@@ -0,0 +1,74 @@
+"""create anexo, add lancamento.anexo_id
+
+Revision ID: b2d6e8a1f357
+Revises: a7c3e5f90d24
+Create Date: 2026-10-17 23:55:12.204417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2d6e8a1f357'
+down_revision: Union[str, Sequence[str], None] = 'a7c3e5f90d24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# o batch recria lancamento no SQLite e os triggers da busca (b7e1c5d93f20) somem com a tabela
+SQLITE_TRIGGERS_BUSCA = [
+    """CREATE TRIGGER IF NOT EXISTS lancamento_fts_ai AFTER INSERT ON lancamento BEGIN
+        INSERT INTO lancamento_fts(rowid, descricao, fornecedor_cliente)
+        VALUES (new.id, new.descricao, new.fornecedor_cliente);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS lancamento_fts_ad AFTER DELETE ON lancamento BEGIN
+        INSERT INTO lancamento_fts(lancamento_fts, rowid, descricao, fornecedor_cliente)
+        VALUES ('delete', old.id, old.descricao, old.fornecedor_cliente);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS lancamento_fts_au AFTER UPDATE OF descricao, fornecedor_cliente ON lancamento BEGIN
+        INSERT INTO lancamento_fts(lancamento_fts, rowid, descricao, fornecedor_cliente)
+        VALUES ('delete', old.id, old.descricao, old.fornecedor_cliente);
+        INSERT INTO lancamento_fts(rowid, descricao, fornecedor_cliente)
+        VALUES (new.id, new.descricao, new.fornecedor_cliente);
+    END""",
+]
+
+
+def _recriar_triggers_busca() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        for sql in SQLITE_TRIGGERS_BUSCA:
+            op.execute(sql)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('anexo',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('nome', sa.String(), nullable=False),
+    sa.Column('mimetype', sa.String(), nullable=True),
+    sa.Column('tamanho', sa.BigInteger(), nullable=False),
+    sa.Column('storage_id', sa.String(), nullable=False),
+    sa.Column('url', sa.String(), nullable=False),
+    sa.Column('miniatura', sa.LargeBinary(), nullable=True),
+    sa.Column('miniatura_falhou', sa.Boolean(), server_default=sa.false(), nullable=False),
+    sa.Column('criado_em', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('sha256')
+    )
+    # anexos antigos (só a URL em anexo_nome) continuam sem anexo_id: o conteúdo está no Drive
+    with op.batch_alter_table('lancamento') as batch_op:
+        batch_op.add_column(sa.Column('anexo_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('lancamento_anexo_id_fkey', 'anexo', ['anexo_id'], ['id'])
+    _recriar_triggers_busca()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('lancamento') as batch_op:
+        batch_op.drop_constraint('lancamento_anexo_id_fkey', type_='foreignkey')
+        batch_op.drop_column('anexo_id')
+    _recriar_triggers_busca()
+    op.drop_table('anexo')
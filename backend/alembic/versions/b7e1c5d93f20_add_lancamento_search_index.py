@@ -0,0 +1,85 @@
+"""add full-text search index on lancamento
+
+Revision ID: b7e1c5d93f20
+Revises: 9d4f2a6b8e13
+Create Date: 2026-10-17 16:05:12.407713
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e1c5d93f20'
+down_revision: Union[str, Sequence[str], None] = '9d4f2a6b8e13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# mesmas expressões de backend/search.py (PG_DOCUMENTO / PG_TSVECTOR)
+DOCUMENTO = "f_unaccent(coalesce(descricao, '') || ' ' || coalesce(fornecedor_cliente, ''))"
+
+# FTS5 external content sobre lancamento, mantida por triggers
+SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS lancamento_fts USING fts5(
+        descricao, fornecedor_cliente,
+        content='lancamento', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS lancamento_fts_ai AFTER INSERT ON lancamento BEGIN
+        INSERT INTO lancamento_fts(rowid, descricao, fornecedor_cliente)
+        VALUES (new.id, new.descricao, new.fornecedor_cliente);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS lancamento_fts_ad AFTER DELETE ON lancamento BEGIN
+        INSERT INTO lancamento_fts(lancamento_fts, rowid, descricao, fornecedor_cliente)
+        VALUES ('delete', old.id, old.descricao, old.fornecedor_cliente);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS lancamento_fts_au AFTER UPDATE OF descricao, fornecedor_cliente ON lancamento BEGIN
+        INSERT INTO lancamento_fts(lancamento_fts, rowid, descricao, fornecedor_cliente)
+        VALUES ('delete', old.id, old.descricao, old.fornecedor_cliente);
+        INSERT INTO lancamento_fts(rowid, descricao, fornecedor_cliente)
+        VALUES (new.id, new.descricao, new.fornecedor_cliente);
+    END""",
+]
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS lancamento_fts_au",
+    "DROP TRIGGER IF EXISTS lancamento_fts_ad",
+    "DROP TRIGGER IF EXISTS lancamento_fts_ai",
+    "DROP TABLE IF EXISTS lancamento_fts",
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        # unaccent() é STABLE; o wrapper IMMUTABLE permite usá-lo em índice
+        op.execute(
+            "CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text "
+            "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT AS "
+            "$$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$"
+        )
+        op.execute(
+            "CREATE INDEX ix_lancamento_busca_tsv ON lancamento "
+            f"USING gin (to_tsvector('portuguese'::regconfig, {DOCUMENTO}))"
+        )
+        op.execute(
+            "CREATE INDEX ix_lancamento_busca_trgm ON lancamento "
+            f"USING gin (({DOCUMENTO}) gin_trgm_ops)"
+        )
+    else:
+        for sql in SQLITE_DDL:
+            op.execute(sql)
+        op.execute("INSERT INTO lancamento_fts(lancamento_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_lancamento_busca_trgm', table_name='lancamento')
+        op.drop_index('ix_lancamento_busca_tsv', table_name='lancamento')
+        op.execute("DROP FUNCTION IF EXISTS f_unaccent(text)")
+    else:
+        for sql in SQLITE_DROP:
+            op.execute(sql)
@@ -0,0 +1,47 @@
+"""add categoria_aporte_id and categoria_retirada_id to socio
+
+Revision ID: c3a9e1f2b7d4
+Revises: 74f5d1f443c0
+Create Date: 2026-10-17 09:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3a9e1f2b7d4'
+down_revision: Union[str, Sequence[str], None] = '74f5d1f443c0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # batch: no SQLite a FK só entra recriando a tabela
+    with op.batch_alter_table('socio') as batch_op:
+        batch_op.add_column(sa.Column('categoria_aporte_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('categoria_retirada_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('socio_categoria_aporte_id_fkey', 'categoria', ['categoria_aporte_id'], ['id'])
+        batch_op.create_foreign_key('socio_categoria_retirada_id_fkey', 'categoria', ['categoria_retirada_id'], ['id'])
+
+    # preenche o mapeamento que antes era feito pelo nome do sócio
+    op.execute(
+        "UPDATE socio SET categoria_aporte_id = "
+        "(SELECT MIN(c.id) FROM categoria c WHERE UPPER(c.nome) = 'APORTE ' || UPPER(socio.nome))"
+    )
+    op.execute(
+        "UPDATE socio SET categoria_retirada_id = "
+        "(SELECT MIN(c.id) FROM categoria c WHERE UPPER(c.nome) = 'RETIRADAS ' || UPPER(socio.nome))"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('socio') as batch_op:
+        batch_op.drop_constraint('socio_categoria_retirada_id_fkey', type_='foreignkey')
+        batch_op.drop_constraint('socio_categoria_aporte_id_fkey', type_='foreignkey')
+        batch_op.drop_column('categoria_retirada_id')
+        batch_op.drop_column('categoria_aporte_id')
@@ -0,0 +1,47 @@
+"""create job
+
+Revision ID: d5f1a3c7e962
+Revises: b2d6e8a1f357
+Create Date: 2026-10-18 01:21:37.880915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5f1a3c7e962'
+down_revision: Union[str, Sequence[str], None] = 'b2d6e8a1f357'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('job',
+    sa.Column('id', sa.String(length=32), nullable=False),
+    sa.Column('tipo', sa.String(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('parametros', sa.JSON(), nullable=False),
+    sa.Column('dono', sa.String(), nullable=True),
+    sa.Column('lease_ate', sa.DateTime(), nullable=True),
+    sa.Column('feito', sa.Integer(), nullable=True),
+    sa.Column('total', sa.Integer(), nullable=True),
+    sa.Column('resultado', sa.JSON(), nullable=True),
+    sa.Column('arquivo_nome', sa.String(), nullable=True),
+    sa.Column('arquivo_mimetype', sa.String(), nullable=True),
+    sa.Column('erro', sa.String(), nullable=True),
+    sa.Column('criado_em', sa.DateTime(), nullable=False),
+    sa.Column('iniciado_em', sa.DateTime(), nullable=True),
+    sa.Column('concluido_em', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_job_status_criado', 'job', ['status', 'criado_em'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_job_status_criado', table_name='job')
+    op.drop_table('job')
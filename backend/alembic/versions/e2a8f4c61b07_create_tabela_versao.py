@@ -0,0 +1,39 @@
+"""create tabela_versao
+
+Revision ID: e2a8f4c61b07
+Revises: b7e1c5d93f20
+Create Date: 2026-10-17 17:32:48.920144
+
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a8f4c61b07'
+down_revision: Union[str, Sequence[str], None] = 'b7e1c5d93f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    tabela_versao = op.create_table('tabela_versao',
+    sa.Column('tabela', sa.String(), nullable=False),
+    sa.Column('versao', sa.Integer(), nullable=False),
+    sa.Column('atualizado_em', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('tabela')
+    )
+    agora = datetime.now(timezone.utc).replace(tzinfo=None)
+    op.bulk_insert(tabela_versao, [
+        {'tabela': t, 'versao': 1, 'atualizado_em': agora}
+        for t in ['natureza', 'conta', 'categoria', 'centro', 'socio', 'lancamento', 'lancamento_mensal']
+    ])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('tabela_versao')
@@ -0,0 +1,47 @@
+"""add lancamento.seq and lancamento_excluido
+
+Revision ID: f4b9d2a7c318
+Revises: e2a8f4c61b07
+Create Date: 2026-10-17 21:05:12.418330
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4b9d2a7c318'
+down_revision: Union[str, Sequence[str], None] = 'e2a8f4c61b07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('lancamento', sa.Column('seq', sa.Integer(), nullable=True))
+    # o que já existe entra na versão atual de lancamento: since=0 traz tudo
+    op.execute(
+        "UPDATE lancamento SET seq = COALESCE("
+        "(SELECT versao FROM tabela_versao WHERE tabela = 'lancamento'), 1)"
+    )
+    op.create_index('ix_lancamento_seq_id', 'lancamento', ['seq', 'id'], unique=False)
+    op.create_index('ix_lancamento_seq_pendente', 'lancamento', ['id'], unique=False,
+                    sqlite_where=sa.text('seq IS NULL'), postgresql_where=sa.text('seq IS NULL'))
+    op.create_table('lancamento_excluido',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('lancamento_id', sa.Integer(), nullable=False),
+    sa.Column('seq', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_lancamento_excluido_seq'), 'lancamento_excluido', ['seq'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_lancamento_excluido_seq'), table_name='lancamento_excluido')
+    op.drop_table('lancamento_excluido')
+    op.drop_index('ix_lancamento_seq_pendente', table_name='lancamento')
+    op.drop_index('ix_lancamento_seq_id', table_name='lancamento')
+    op.drop_column('lancamento', 'seq')
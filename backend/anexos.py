@@ -0,0 +1,155 @@
+"""Anexos endereçados pelo conteúdo: SHA-256, sem reenviar arquivo repetido.
+
+O upload lê o arquivo (que o Starlette já mantém em disco) em pedaços no pool
+de upload calculando o SHA-256 e o tamanho. Se já existe um anexo com o mesmo
+hash — a mesma NF-e ou recibo anexado de novo — ele é devolvido sem passar
+pelo armazenamento; senão o arquivo vai para o ``storage`` e ganha uma linha
+em ``anexo``. Os lançamentos apontam para o anexo por ``anexo_id``.
+
+As miniaturas das imagens são geradas por um worker próprio, depois que a
+resposta do upload já saiu, e gravadas na própria linha do anexo: o extrato
+mostra a prévia sem ir ao Drive. O conteúdo de um anexo nunca muda, então a
+rota da miniatura pode ser guardada pelo navegador indefinidamente. Precisa do
+Pillow; sem ele (ou para PDFs e outros formatos) o anexo fica sem miniatura. A
+imagem que o worker não consegue ler fica marcada (``miniatura_falhou``) e a
+rota responde com um 404 definitivo, como para um PDF.
+
+Configuração por ambiente:
+
+    MINIATURA_PX  lado maior da miniatura em pixels (padrão: 160)
+"""
+import hashlib
+import io
+import logging
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import BinaryIO, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+
+from . import models, storage
+from .database import SessionLocal
+
+MINIATURA_PX = int(os.environ.get("MINIATURA_PX", "160"))
+MINIATURA_MIMETYPE = "image/jpeg"
+
+logger = logging.getLogger("uvicorn.error")
+_miniaturas = ThreadPoolExecutor(max_workers=1, thread_name_prefix="miniatura")
+
+
+def digerir(arquivo: BinaryIO) -> tuple[str, int]:
+    """SHA-256 (hex) e tamanho do arquivo, lido em pedaços; volta ao início."""
+    arquivo.seek(0)
+    h, tamanho = hashlib.sha256(), 0
+    while pedaco := arquivo.read(storage.UPLOAD_CHUNK):
+        h.update(pedaco)
+        tamanho += len(pedaco)
+    arquivo.seek(0)
+    return h.hexdigest(), tamanho
+
+
+def tem_miniatura(mimetype: Optional[str]) -> bool:
+    return bool(mimetype) and mimetype.startswith("image/")
+
+
+def url_miniatura(anexo_id: int) -> str:
+    return f"/api/anexos/{anexo_id}/miniatura"
+
+
+def resposta(anexo: models.Anexo, duplicado: bool) -> dict:
+    return {
+        "id": anexo.id,
+        "sha256": anexo.sha256,
+        "name": anexo.nome,
+        "url": anexo.url,
+        "mimetype": anexo.mimetype,
+        "tamanho": anexo.tamanho,
+        "miniatura": url_miniatura(anexo.id) if tem_miniatura(anexo.mimetype) else None,
+        "duplicado": duplicado,
+    }
+
+
+def receber(credentials, arquivo: BinaryIO, nome: str, mimetype: Optional[str]) -> dict:
+    """Anexo com o conteúdo do arquivo: o existente ou um novo, enviado ao storage."""
+    sha, tamanho = digerir(arquivo)
+    db = SessionLocal()
+    try:
+        existente = db.scalar(select(models.Anexo).where(models.Anexo.sha256 == sha))
+        if existente:
+            return resposta(existente, duplicado=True)
+
+        salvo = storage.salvar(credentials, arquivo, nome, mimetype)
+        anexo = models.Anexo(
+            sha256=sha, nome=nome or salvo["name"], mimetype=mimetype, tamanho=tamanho,
+            storage_id=salvo["id"], url=salvo["url"],
+            criado_em=datetime.now(timezone.utc).replace(tzinfo=None),
+        )
+        db.add(anexo)
+        try:
+            db.commit()
+        except IntegrityError:
+            # o mesmo arquivo chegou por outro upload ao mesmo tempo: fica o que gravou primeiro
+            db.rollback()
+            return resposta(db.scalar(select(models.Anexo).where(models.Anexo.sha256 == sha)), duplicado=True)
+        if tem_miniatura(mimetype):
+            agendar_miniatura(anexo.id, arquivo)
+        return resposta(anexo, duplicado=False)
+    finally:
+        db.close()
+
+
+async def enviar(credentials, arquivo: BinaryIO, nome: str, mimetype: Optional[str]) -> dict:
+    """``receber`` no pool de upload, sem bloquear o event loop."""
+    return await storage.no_pool(receber, credentials, arquivo, nome, mimetype)
+
+
+# ---- Miniaturas ----
+
+def agendar_miniatura(anexo_id: int, arquivo: BinaryIO) -> None:
+    """Copia o arquivo para um temporário (o do upload some com a requisição) e enfileira."""
+    arquivo.seek(0)
+    with tempfile.NamedTemporaryFile(prefix="anexo_", delete=False) as copia:
+        shutil.copyfileobj(arquivo, copia, storage.UPLOAD_CHUNK)
+    _miniaturas.submit(_gerar_e_gravar, anexo_id, copia.name)
+
+
+def gerar_miniatura(arquivo) -> Optional[bytes]:
+    """JPEG com lado maior de MINIATURA_PX, ou None se não for uma imagem legível."""
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return None
+    try:
+        with Image.open(arquivo) as img:
+            img.draft("RGB", (MINIATURA_PX, MINIATURA_PX))  # JPEG: decodifica já reduzido
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((MINIATURA_PX, MINIATURA_PX))
+            saida = io.BytesIO()
+            img.convert("RGB").save(saida, "JPEG", quality=80, optimize=True)
+            return saida.getvalue()
+    except Exception:
+        return None
+
+
+def _gerar_e_gravar(anexo_id: int, caminho: str) -> None:
+    try:
+        miniatura = gerar_miniatura(caminho)
+        if miniatura is None:
+            logger.warning("miniatura do anexo %s: imagem ilegível ou Pillow ausente", anexo_id)
+            valores = {"miniatura_falhou": True}
+        else:
+            valores = {"miniatura": miniatura}
+        db = SessionLocal()
+        try:
+            db.execute(update(models.Anexo).where(models.Anexo.id == anexo_id).values(**valores))
+            db.commit()
+        finally:
+            db.close()
+    except Exception:
+        logger.exception("miniatura do anexo %s", anexo_id)
+    finally:
+        os.unlink(caminho)
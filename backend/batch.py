@@ -0,0 +1,150 @@
+"""Aplicação de um lote de criações, alterações parciais e exclusões de lançamentos.
+
+Tudo numa transação: as exclusões viram um único DELETE, as alterações são
+agrupadas por conjunto de campos/valores (re-marcar a DRE de um mês inteiro é
+um UPDATE só) e as criações vão num INSERT com RETURNING
+(``inserir_lancamentos``). Os valores antigos dos lançamentos
+alterados/excluídos são lidos antes, para atualizar o resumo mensal
+(``rollup.py``) na mesma transação. As marcações de IR
+(``ir_socios``) são trocadas inteiras em ``lancamento_ir``: um DELETE e um
+INSERT para todos os lançamentos do lote que as mudaram.
+"""
+from collections import defaultdict
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from . import models, rollup, schemas
+
+OBRIGATORIOS = {"data", "natureza_code", "valor"}
+
+
+def inserir_lancamentos(db: Session, linhas: list[dict]) -> list[int]:
+    """Insere as linhas num único ``INSERT ... RETURNING`` e devolve os ids na ordem delas.
+
+    O insert em massa do ORM separa as linhas por conjunto de chaves e omite
+    as que valem None, então centro/pagamento/descrição nulos em parte do lote
+    o quebrariam em vários INSERTs: as linhas vão com as mesmas chaves e
+    ``render_nulls`` grava o NULL explícito.
+
+    No SQLite o ``sort_by_parameter_order`` vira um INSERT por linha. Lá a
+    ordem sai do próprio rowid: sem id informado, cada linha nova recebe o
+    maior rowid da tabela + 1, na ordem do VALUES (o lote de ``executemany``
+    é paginado e as páginas rodam em sequência), e a transação tem a escrita
+    exclusiva do banco — os ids devolvidos, em ordem crescente, são os das
+    linhas na ordem em que vieram. No Postgres a ordem fica com o SQLAlchemy.
+    """
+    L = models.Lancamento
+    colunas = set().union(*linhas)
+    linhas = [{c: linha.get(c) for c in colunas} for linha in linhas]
+    opcoes = {"render_nulls": True}
+    if db.get_bind().dialect.name == "sqlite":
+        return sorted(db.scalars(insert(L).returning(L.id), linhas, execution_options=opcoes).all())
+    return db.scalars(
+        insert(L).returning(L.id, sort_by_parameter_order=True), linhas, execution_options=opcoes
+    ).all()
+
+
+def aplicar_lote(db: Session, lote: schemas.LancamentoBatch) -> list[dict]:
+    """Aplica o lote e devolve o resultado por item; não faz commit."""
+    L, LI = models.Lancamento, models.LancamentoIR
+    resultados = []
+
+    deltas = rollup.Deltas()
+
+    citados = {s for item in (*lote.create, *lote.update) for s in item.ir_socios or ()}
+    socios = set(db.scalars(select(models.Socio.id).where(models.Socio.id.in_(citados)))) if citados else set()
+    citados = {item.anexo_id for item in (*lote.create, *lote.update)} - {None}
+    anexos = set(db.scalars(select(models.Anexo.id).where(models.Anexo.id.in_(citados)))) if citados else set()
+
+    alvos = {u.id for u in lote.update} | set(lote.delete)
+    atuais = {}
+    if alvos:
+        colunas = [getattr(L, c) for c in ("data", "valor") + rollup.CAMPOS]
+        for row in db.execute(select(L.id, *colunas).where(L.id.in_(alvos))):
+            atuais[row.id] = rollup.valores(dict(row._mapping))
+    existentes = set(atuais)
+
+    # exclusões
+    excluir = set()
+    for i, lanc_id in enumerate(lote.delete):
+        if lanc_id not in existentes:
+            resultados.append({"op": "delete", "index": i, "id": lanc_id, "status": 404,
+                               "detail": "Lançamento não encontrado"})
+            continue
+        if lanc_id not in excluir:
+            excluir.add(lanc_id)
+            deltas.adicionar(atuais[lanc_id], -1)
+        resultados.append({"op": "delete", "index": i, "id": lanc_id, "status": 200})
+    if excluir:
+        db.execute(delete(LI).where(LI.lancamento_id.in_(excluir)))
+        db.execute(delete(L).where(L.id.in_(excluir)).execution_options(synchronize_session=False))
+
+    # alterações: o mesmo id repetido acumula os campos, na ordem do lote
+    alteracoes, marcacoes = {}, {}
+    for i, item in enumerate(lote.update):
+        campos = item.dict(exclude_unset=True)
+        campos.pop("id", None)
+        ir = campos.pop("ir_socios", None)
+        erro = None
+        if item.id not in existentes:
+            erro = (404, "Lançamento não encontrado")
+        elif item.id in excluir:
+            erro = (409, "Lançamento excluído no mesmo lote")
+        elif any(campos.get(c, True) is None for c in OBRIGATORIOS):
+            erro = (422, "data, natureza_code e valor não podem ser nulos")
+        elif ir and not set(ir) <= socios:
+            erro = (422, "Sócio não encontrado em ir_socios")
+        elif campos.get("anexo_id") not in anexos | {None}:
+            erro = (422, "Anexo não encontrado")
+        if erro:
+            resultados.append({"op": "update", "index": i, "id": item.id, "status": erro[0], "detail": erro[1]})
+            continue
+        resultados.append({"op": "update", "index": i, "id": item.id, "status": 200})
+        if campos:
+            alteracoes.setdefault(item.id, {}).update(campos)
+        if "ir_socios" in item.__fields_set__:
+            marcacoes[item.id] = set(ir or ())
+
+    # agrupadas pelos mesmos campos/valores
+    grupos = defaultdict(list)
+    for lanc_id, campos in alteracoes.items():
+        deltas.trocar(atuais[lanc_id], {**atuais[lanc_id], **campos})
+        grupos[tuple(sorted(campos.items()))].append(lanc_id)
+    for campos, ids in grupos.items():
+        db.execute(
+            update(L).where(L.id.in_(ids)).values(**dict(campos))
+            .execution_options(synchronize_session=False)
+        )
+
+    if marcacoes:
+        ids = list(marcacoes)
+        db.execute(delete(LI).where(LI.lancamento_id.in_(ids)))
+        # só a marcação mudou: o lançamento volta a contar como alterado no delta
+        db.execute(update(L).where(L.id.in_(ids)).values(seq=None).execution_options(synchronize_session=False))
+
+    # criações
+    criar = []
+    for i, c in enumerate(lote.create):
+        if not set(c.ir_socios) <= socios:
+            resultados.append({"op": "create", "index": i, "status": 422,
+                               "detail": "Sócio não encontrado em ir_socios"})
+            continue
+        if c.anexo_id not in anexos | {None}:
+            resultados.append({"op": "create", "index": i, "status": 422, "detail": "Anexo não encontrado"})
+            continue
+        criar.append((i, c.dict()))
+    if criar:
+        ir_criados = [campos.pop("ir_socios") for _, campos in criar]
+        novos = inserir_lancamentos(db, [campos for _, campos in criar])
+        for (i, campos), lanc_id, socio_ids in zip(criar, novos, ir_criados):
+            resultados.append({"op": "create", "index": i, "id": lanc_id, "status": 201})
+            deltas.adicionar(campos)
+            marcacoes[lanc_id] = set(socio_ids)
+
+    linhas_ir = [{"lancamento_id": lanc_id, "socio_id": s} for lanc_id, ids in marcacoes.items() for s in sorted(ids)]
+    if linhas_ir:
+        db.execute(insert(LI), linhas_ir)
+
+    deltas.aplicar(db)
+    return resultados
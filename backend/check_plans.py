@@ -0,0 +1,173 @@
+"""Verifica os planos de execução das consultas principais do extrato.
+
+Popula lançamentos sintéticos dentro de uma transação, roda ANALYZE e EXPLAIN
+nas mesmas consultas que as rotas montam (``select_lancamentos``,
+``series_stmt``, ``extrato_socio_stmt``, ``ir.relatorio_stmt``) e falha se
+alguma delas fizer varredura sequencial em ``lancamento``, no resumo
+``lancamento_mensal`` ou em ``lancamento_ir`` quando o extrato já passou de
+``--min-rows``.
+Tudo é desfeito com rollback no final, então pode rodar contra uma cópia do
+banco de produção (Postgres) ou um SQLite vazio:
+
+    DATABASE_URL=sqlite:///planos.db python -m backend.check_plans --rows 20000
+"""
+import argparse
+import random
+import re
+import sys
+from datetime import date, timedelta
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from . import ir, models, rollup, schemas
+from .database import Base, engine
+from .queries import extrato_socio_stmt, filtrar_lancamentos, paginar_lancamentos, series_stmt
+from .seed import seed_taxonomy
+from .serializacao import select_lancamentos
+
+# tabelas que não podem ser varridas inteiras depois de --min-rows linhas
+TABELAS = {
+    "lancamento": models.Lancamento,
+    "lancamento_mensal": models.LancamentoMensal,
+    "lancamento_ir": models.LancamentoIR,
+}
+_SEQ_PG = re.compile(r"Seq Scan on (\w+)")
+_SEQ_SQLITE = re.compile(r"^SCAN (\w+)(?!.*INDEX)")
+
+
+def popular(db: Session, n: int, seed: int = 42) -> None:
+    rnd = random.Random(seed)
+    contas = db.execute(select(models.Conta.id, models.Conta.natureza_code)).all()
+    cats = {}
+    for cat_id, conta_id in db.execute(select(models.Categoria.id, models.Categoria.conta_id)):
+        cats.setdefault(conta_id, []).append(cat_id)
+    centros = db.scalars(select(models.Centro.id)).all()
+    socios = db.scalars(select(models.Socio.id)).all()
+    inicio = date(2015, 1, 1)
+    lote = []
+    for i in range(n):
+        conta_id, nat = rnd.choice(contas)
+        lote.append({
+            "data": inicio + timedelta(days=rnd.randrange(3650)),
+            "natureza_code": nat,
+            "conta_id": conta_id,
+            "categoria_id": rnd.choice(cats.get(conta_id) or [None]),
+            "centro_id": rnd.choice(centros),
+            "descricao": "lançamento sintético",
+            "valor": rnd.randrange(100, 1_000_000) / 100,
+            "seq": i + 1,  # o carimbo normal só acontece no commit, que aqui não há
+        })
+        if len(lote) == 5000:
+            db.execute(insert(models.Lancamento), lote)
+            lote = []
+    if lote:
+        db.execute(insert(models.Lancamento), lote)
+    # ~5% dos lançamentos marcados para o IR de um sócio
+    L = models.Lancamento
+    for socio_id in socios:
+        db.execute(insert(models.LancamentoIR).from_select(
+            ["lancamento_id", "socio_id"],
+            select(L.id, socio_id).where(L.id % (20 * len(socios)) == socio_id % (20 * len(socios))),
+        ))
+
+
+def consultas(db: Session) -> dict:
+    """As consultas das rotas com filtros típicos (um mês, uma dimensão)."""
+    L = models.Lancamento
+    mes = dict(start=date(2020, 3, 1), end=date(2020, 3, 31))
+    categoria_id = db.scalar(select(func.min(models.Categoria.id)))
+    centro_id = db.scalar(select(func.min(models.Centro.id)))
+    conta_id = db.scalar(select(func.min(models.Conta.id)))
+    socio_id = db.scalar(select(func.min(models.Socio.id))) or 0
+    seq = db.scalar(select(func.max(L.seq))) or 0
+
+    def pagina(nomes=False, **filtros):
+        stmt = filtrar_lancamentos(select_lancamentos(nomes), schemas.LancamentoFiltro(**filtros))
+        return paginar_lancamentos(stmt, None, 200)
+
+    return {
+        "primeira página": pagina(),
+        "primeira página (expand=names)": pagina(nomes=True),
+        "período": pagina(**mes),
+        "natureza + período": pagina(natureza_code="DO", **mes),
+        "conta + período": pagina(conta_id=conta_id, **mes),
+        "categoria + período (expand=names)": pagina(nomes=True, categoria_id=categoria_id, **mes),
+        "centro + período": pagina(centro_id=centro_id, **mes),
+        "alterações (expand=names)": (
+            select_lancamentos(True).where(L.seq > seq // 2, L.seq <= seq).order_by(L.seq, L.id).limit(1001)
+        ),
+        "extrato do sócio": extrato_socio_stmt(categoria_id, categoria_id + 1, date(2019, 1, 1), date(2020, 1, 1)),
+        "série mensal por conta": series_stmt("mes", "conta", date(2019, 1, 1), date(2020, 1, 1)),
+        "série por safra de uma conta": series_stmt("safra", "categoria", date(2019, 7, 1), date(2020, 7, 1),
+                                                    conta_id=conta_id),
+        "relatório de IR": ir.relatorio_stmt(socio_id, 2019),
+    }
+
+
+def explain(db: Session, stmt) -> list[str]:
+    dialect = db.get_bind().dialect
+    # parâmetros ligados, como na rota (o separador do aggregate_strings não vira literal)
+    compilado = stmt.compile(dialect=dialect, compile_kwargs={"render_postcompile": True})
+    params = compilado.params
+    if compilado.positional:
+        params = tuple(params[nome] for nome in compilado.positiontup)
+    conn = db.connection()
+    if dialect.name == "sqlite":
+        return [row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + str(compilado), params)]
+    return [row[0] for row in conn.exec_driver_sql("EXPLAIN " + str(compilado), params)]
+
+
+def varreduras_sequenciais(plano: list[str]) -> set[str]:
+    """Quais das TABELAS o plano lê inteiras."""
+    tabelas = set()
+    for linha in plano:
+        achou = _SEQ_PG.search(linha) or _SEQ_SQLITE.match(linha)
+        if achou and achou.group(1) in TABELAS:
+            tabelas.add(achou.group(1))
+    return tabelas
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000, help="lançamentos sintéticos a inserir")
+    parser.add_argument("--min-rows", type=int, default=10000,
+                        help="a partir de quantas linhas (da tabela varrida) uma varredura sequencial é falha")
+    args = parser.parse_args(argv)
+
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            Base.metadata.create_all(conn)
+            db = Session(bind=conn, join_transaction_mode="create_savepoint")
+            seed_taxonomy(db)
+            popular(db, args.rows)
+            rollup.reconstruir(db)
+            db.flush()
+            conn.exec_driver_sql("ANALYZE")
+            linhas = {t: db.scalar(select(func.count()).select_from(m)) for t, m in TABELAS.items()}
+            total = linhas["lancamento"]
+
+            falhas = []
+            for nome, stmt in consultas(db).items():
+                plano = explain(db, stmt)
+                seq = varreduras_sequenciais(plano)
+                print(f"{'SEQ ' if seq else 'ok  '} {nome}")
+                for linha in plano:
+                    print(f"       {linha}")
+                # numa tabela pequena (o IR de poucos lançamentos) varrer tudo é o plano certo
+                if any(linhas[t] >= args.min_rows for t in seq):
+                    falhas.append(nome)
+            db.close()
+        finally:
+            trans.rollback()
+
+    print(f"\n{total} lançamentos; {len(falhas)} consulta(s) com varredura sequencial")
+    if falhas:
+        print("Falharam: " + ", ".join(falhas))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""Cubo de resultado por centro: receita, custo operacional, margem e valores por hectare.
+
+O cubo (centro × mês → receita RO, custo DO) sai de uma consulta agrupada
+sobre o resumo mensal e fica em memória junto com nome e área de cada centro.
+A chave do cache é a versão de ``lancamento``, ``lancamento_mensal`` e
+``centro`` em ``tabela_versao``: um lançamento gravado, o resumo
+reconstruído ou uma área alterada, neste ou em outro processo, faz o próximo
+pedido remontá-lo. Fora isso, comparar centros
+e períodos não consulta o banco além da checagem de versão.
+"""
+import threading
+from datetime import date
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from . import models
+from .queries import periodo_de, rotulo_periodo
+from .versoes import versoes_async
+
+TABELAS = ("lancamento", "lancamento_mensal", "centro")
+_cache = {"versao": None, "cubo": None}
+_lock = threading.Lock()
+
+
+def montar(db: Session) -> dict:
+    """{"fatos": {(centro_id, mes): [receita, custo]}, "centros": {id: (nome, area)}}"""
+    M = models.LancamentoMensal
+    fatos = {}
+    for centro_id, mes, natureza, total in db.execute(
+        select(M.centro_id, M.mes, M.natureza_code, func.sum(M.valor))
+        .where(M.natureza_code.in_(("RO", "DO")))
+        .group_by(M.centro_id, M.mes, M.natureza_code)
+    ):
+        celula = fatos.setdefault((centro_id, mes), [Decimal(0), Decimal(0)])
+        celula[0 if natureza == "RO" else 1] += Decimal(total or 0)
+    centros = {
+        centro_id: (nome, Decimal(area) if area else None)
+        for centro_id, nome, area in db.execute(select(models.Centro.id, models.Centro.nome, models.Centro.area))
+    }
+    return {"fatos": fatos, "centros": centros}
+
+
+async def obter(db: AsyncSession) -> dict:
+    """Cubo da versão atual; remonta só se lançamentos ou centros mudaram."""
+    versao, _ = await versoes_async(db, TABELAS)
+    with _lock:
+        if _cache["versao"] == versao:
+            return _cache["cubo"]
+    cubo = await db.run_sync(montar)
+    with _lock:
+        _cache["versao"], _cache["cubo"] = versao, cubo
+    return cubo
+
+
+def _valores(receita: Decimal, custo: Decimal, area: Optional[Decimal]) -> dict:
+    margem = receita - custo
+    por_ha = lambda v: round(v / area, 2) if area else None
+    return {
+        "receita": receita,
+        "custo": custo,
+        "margem": margem,
+        "receita_ha": por_ha(receita),
+        "custo_ha": por_ha(custo),
+        "margem_ha": por_ha(margem),
+    }
+
+
+def resultado(cubo: dict, granularidade: str, de: Optional[date], ate: Optional[date]) -> list[dict]:
+    """Uma entrada por centro, com o total do intervalo e os valores por período."""
+    somas = {}  # centro_id -> {periodo: [receita, custo]}
+    for (centro_id, mes), (receita, custo) in cubo["fatos"].items():
+        if (de and mes < de) or (ate and mes >= ate):
+            continue
+        celula = somas.setdefault(centro_id, {}).setdefault(periodo_de(granularidade, mes), [Decimal(0), Decimal(0)])
+        celula[0] += receita
+        celula[1] += custo
+
+    centros = dict(cubo["centros"])
+    if None in somas:
+        centros[None] = ("(sem centro)", None)
+    saida = []
+    for centro_id, (nome, area) in sorted(centros.items(), key=lambda c: (c[0] is None, c[1][0])):
+        periodos = somas.get(centro_id, {})
+        receita = sum((v[0] for v in periodos.values()), Decimal(0))
+        custo = sum((v[1] for v in periodos.values()), Decimal(0))
+        saida.append({
+            "id": centro_id,
+            "nome": nome,
+            "area": area,
+            "total": _valores(receita, custo, area),
+            "periodos": [
+                {"periodo": rotulo_periodo(granularidade, p), **_valores(r, c, area)}
+                for p, (r, c) in sorted(periodos.items())
+            ],
+        })
+    return saida
@@ -1,14 +1,49 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 import os
 
 DATABASE_URL = os.environ.get("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL não definido")
 
-engine = create_engine(DATABASE_URL, echo=False, future=True, pool_pre_ping=True)
+def opcoes_pool(url: URL) -> dict:
+    """Pool ajustável por ambiente (DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE).
+
+    O recycle padrão fica abaixo do tempo em que o Postgres do fly derruba
+    conexões ociosas; SQLite em memória usa um pool próprio, sem tamanho.
+    """
+    opcoes = {"pool_pre_ping": True, "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", "1800"))}
+    if url.get_backend_name() != "sqlite" or url.database not in (None, "", ":memory:"):
+        opcoes.update(
+            pool_size=int(os.environ.get("DB_POOL_SIZE", "5")),
+            max_overflow=int(os.environ.get("DB_MAX_OVERFLOW", "10")),
+            pool_timeout=float(os.environ.get("DB_POOL_TIMEOUT", "30")),
+        )
+        if url.drivername == "sqlite+aiosqlite":
+            # o padrão do aiosqlite é NullPool (uma conexão nova por sessão)
+            opcoes["poolclass"] = AsyncAdaptedQueuePool
+    return opcoes
+
+def url_async(url: URL) -> URL:
+    """Mesma base com o driver assíncrono: aiosqlite ou psycopg (modo async)."""
+    if url.get_backend_name() == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    if url.get_backend_name() == "postgresql":
+        return url.set(drivername="postgresql+psycopg")
+    return url
+
+_url = make_url(DATABASE_URL)
+engine = create_engine(_url, echo=False, future=True, **opcoes_pool(_url))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# leituras das rotas async: a conexão só fica presa enquanto a consulta roda
+_url_async = url_async(_url)
+async_engine = create_async_engine(_url_async, echo=False, **opcoes_pool(_url_async))
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -16,4 +51,8 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,208 @@
+"""Exportação do extrato em CSV e XLSX, gerada em streaming.
+
+As linhas vêm do banco com ``yield_per`` (cursor no servidor no Postgres) e
+são escritas em pedaços, então a memória não cresce com o tamanho do extrato.
+O CSV tem o mesmo formato aceito por ``importer.py``; a coluna ``ir`` traz os
+nomes dos sócios que declaram o lançamento, separados por vírgula.
+"""
+import csv
+import io
+import re
+import zipfile
+from datetime import date
+from decimal import Decimal
+from typing import Iterator
+from xml.sax.saxutils import escape
+
+from sqlalchemy import func, select
+
+from . import models, schemas
+from .database import SessionLocal
+from .queries import filtrar_lancamentos
+
+CABECALHO = [
+    "id", "data", "natureza", "conta", "categoria", "descricao", "fornecedor_cliente",
+    "centro", "pagamento", "dre", "ir", "valor",
+]
+SEPARADOR_IR = ", "
+MIMETYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+LINHAS_POR_LOTE = 1000
+BYTES_POR_PEDACO = 64 * 1024
+
+
+def _linhas(filtros: schemas.LancamentoFiltro) -> Iterator[tuple]:
+    """Linhas do extrato na ordem de CABECALHO, da mais antiga para a mais recente."""
+    L, LI = models.Lancamento, models.LancamentoIR
+    ir = (
+        select(func.aggregate_strings(models.Socio.nome, SEPARADOR_IR))
+        .select_from(LI)
+        .join(models.Socio, models.Socio.id == LI.socio_id)
+        .where(LI.lancamento_id == L.id)
+        .scalar_subquery()
+    )
+    stmt = (
+        select(
+            L.id, L.data, L.natureza_code, models.Conta.nome, models.Categoria.nome,
+            L.descricao, L.fornecedor_cliente, models.Centro.nome, L.pagamento,
+            L.dre, ir, L.valor,
+        )
+        .select_from(L)
+        .outerjoin(models.Conta, models.Conta.id == L.conta_id)
+        .outerjoin(models.Categoria, models.Categoria.id == L.categoria_id)
+        .outerjoin(models.Centro, models.Centro.id == L.centro_id)
+    )
+    stmt = filtrar_lancamentos(stmt, filtros).order_by(L.data, L.id)
+    # a sessão é do gerador: a do Depends(get_db) já fecha antes do streaming
+    db = SessionLocal()
+    try:
+        for row in db.execute(stmt.execution_options(yield_per=LINHAS_POR_LOTE)):
+            if row[10] and SEPARADOR_IR in row[10]:
+                # a ordem do string_agg/group_concat não é garantida
+                row = (*row[:10], SEPARADOR_IR.join(sorted(row[10].split(SEPARADOR_IR))), row[11])
+            yield row
+    finally:
+        db.close()
+
+
+def _valor_br(valor) -> str:
+    return f"{Decimal(valor):.2f}".replace(".", ",")
+
+
+def exportar_csv(filtros: schemas.LancamentoFiltro) -> Iterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf, delimiter=";", lineterminator="\n")
+    writer.writerow(CABECALHO)
+    yield buf.getvalue().encode("utf-8")
+    buf.seek(0)
+    buf.truncate()
+
+    for row in _linhas(filtros):
+        (lanc_id, data, natureza, conta, categoria, descricao, fornecedor, centro,
+         pagamento, dre, ir, valor) = row
+        writer.writerow([
+            lanc_id, data.isoformat(), natureza, conta or "", categoria or "", descricao or "",
+            fornecedor or "", centro or "", pagamento or "",
+            "true" if dre else "false", ir or "", _valor_br(valor),
+        ])
+        if buf.tell() >= BYTES_POR_PEDACO:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+# ---- XLSX mínimo (uma planilha, strings inline) escrito direto no zip ----
+
+class _Saida(io.RawIOBase):
+    """Destino do zip sem seek: acumula os bytes até o próximo yield."""
+
+    def __init__(self):
+        self.pedacos = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.pedacos.append(bytes(b))
+        return len(b)
+
+    def esvaziar(self) -> bytes:
+        dados = b"".join(self.pedacos)
+        self.pedacos.clear()
+        return dados
+
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="Lancamentos" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+    '</Relationships>'
+)
+# estilo 1 = data (numFmt 14), estilo 2 = moeda com duas casas (numFmt 4)
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="3">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="4" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '</cellXfs>'
+    '</styleSheet>'
+)
+_EPOCA_EXCEL = date(1899, 12, 30)
+_CONTROLE = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def _celula(valor) -> str:
+    if valor is None or valor == "":
+        return "<c/>"
+    if isinstance(valor, bool):
+        return f'<c t="b"><v>{int(valor)}</v></c>'
+    if isinstance(valor, date):
+        return f'<c s="1"><v>{(valor - _EPOCA_EXCEL).days}</v></c>'
+    if isinstance(valor, Decimal):
+        return f'<c s="2"><v>{valor:f}</v></c>'
+    if isinstance(valor, int):
+        return f"<c><v>{valor}</v></c>"
+    texto = escape(_CONTROLE.sub("", str(valor)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def _linha_xml(valores) -> bytes:
+    return ("<row>" + "".join(_celula(v) for v in valores) + "</row>").encode("utf-8")
+
+
+def exportar_xlsx(filtros: schemas.LancamentoFiltro) -> Iterator[bytes]:
+    saida = _Saida()
+    with zipfile.ZipFile(saida, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        zf.writestr("_rels/.rels", _RELS)
+        zf.writestr("xl/workbook.xml", _WORKBOOK)
+        zf.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+        zf.writestr("xl/styles.xml", _STYLES)
+        yield saida.esvaziar()
+
+        with zf.open("xl/worksheets/sheet1.xml", "w") as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            sheet.write(_linha_xml(CABECALHO))
+            for row in _linhas(filtros):
+                sheet.write(_linha_xml(row))
+                if sum(map(len, saida.pedacos)) >= BYTES_POR_PEDACO:
+                    yield saida.esvaziar()
+            sheet.write(b"</sheetData></worksheet>")
+    yield saida.esvaziar()
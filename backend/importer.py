@@ -0,0 +1,248 @@
+"""Importação em lote de lançamentos a partir do CSV exportado pelo app.
+
+O arquivo é lido linha a linha (``;`` como separador, decimal com vírgula) e
+gravado em lotes com ``executemany`` dentro de uma única transação, junto com
+o resumo mensal (``rollup.py``). A coluna ``ir`` lista os sócios que declaram o
+lançamento (nomes separados por vírgula); colunas antigas ``ir_<nome>`` com
+marcação verdadeira valem para o sócio com esse primeiro nome.
+"""
+import csv
+import io
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import BinaryIO, Callable, Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from . import models, rollup
+from .batch import inserir_lancamentos
+
+TAMANHO_LOTE = 1000
+VERDADEIRO = {"1", "true", "sim", "s", "x", "verdadeiro"}
+
+
+def parse_valor(texto: str) -> Decimal:
+    """'1.234,56' → Decimal('1234.56'); aceita também '1234.56'."""
+    s = texto.strip().replace("R$", "").replace(" ", "")
+    if "," in s:
+        s = s.replace(".", "").replace(",", ".")
+    try:
+        return Decimal(s)
+    except InvalidOperation:
+        raise ValueError(f"valor inválido: {texto!r}")
+
+
+def parse_data(texto: str) -> date:
+    s = texto.strip()
+    for fmt in ("%Y-%m-%d", "%d/%m/%Y"):
+        try:
+            return datetime.strptime(s, fmt).date()
+        except ValueError:
+            pass
+    raise ValueError(f"data inválida: {texto!r}")
+
+
+def parse_flag(texto: Optional[str]) -> bool:
+    return (texto or "").strip().lower() in VERDADEIRO
+
+
+class Taxonomia:
+    """Resolve nomes de natureza/conta/categoria/centro/sócio em ids (carregada uma vez)."""
+
+    def __init__(self, db: Session):
+        self.naturezas = {}
+        self.contas = {}
+        self.categorias = {}
+        linhas = db.execute(
+            select(
+                models.Natureza.code, models.Natureza.nome,
+                models.Conta.id, models.Conta.nome,
+                models.Categoria.id, models.Categoria.nome,
+            )
+            .select_from(models.Natureza)
+            .outerjoin(models.Conta, models.Conta.natureza_code == models.Natureza.code)
+            .outerjoin(models.Categoria, models.Categoria.conta_id == models.Conta.id)
+        )
+        for nat_code, nat_nome, conta_id, conta_nome, cat_id, cat_nome in linhas:
+            self.naturezas[nat_code.upper()] = nat_code
+            self.naturezas[nat_nome.upper()] = nat_code
+            if conta_id is not None:
+                self.contas.setdefault((nat_code, conta_nome.strip().upper()), conta_id)
+            if cat_id is not None:
+                self.categorias.setdefault((conta_id, cat_nome.strip().upper()), cat_id)
+        self.centros = {
+            nome.strip().upper(): centro_id
+            for centro_id, nome in db.execute(select(models.Centro.id, models.Centro.nome))
+        }
+        self.socios, self.primeiros_nomes = {}, {}
+        for socio_id, nome in db.execute(select(models.Socio.id, models.Socio.nome).order_by(models.Socio.id)):
+            self.socios.setdefault(nome.strip().upper(), socio_id)
+            self.primeiros_nomes.setdefault(nome.split()[0].upper() if nome.strip() else "", socio_id)
+
+    def resolver(self, natureza: str, conta: str, categoria: str, centro: str) -> dict:
+        nat_code = self.naturezas.get(natureza.strip().upper())
+        if not nat_code:
+            raise ValueError(f"natureza não encontrada: {natureza!r}")
+        conta_id = categoria_id = centro_id = None
+        if conta.strip():
+            conta_id = self.contas.get((nat_code, conta.strip().upper()))
+            if conta_id is None:
+                raise ValueError(f"conta não encontrada em {nat_code}: {conta!r}")
+        if categoria.strip():
+            if conta_id is None:
+                raise ValueError("categoria informada sem conta")
+            categoria_id = self.categorias.get((conta_id, categoria.strip().upper()))
+            if categoria_id is None:
+                raise ValueError(f"categoria não encontrada na conta: {categoria!r}")
+        if centro.strip():
+            centro_id = self.centros.get(centro.strip().upper())
+            if centro_id is None:
+                raise ValueError(f"centro não encontrado: {centro!r}")
+        return {
+            "natureza_code": nat_code,
+            "conta_id": conta_id,
+            "categoria_id": categoria_id,
+            "centro_id": centro_id,
+        }
+
+
+    def resolver_ir(self, registro: dict) -> list[int]:
+        """Ids dos sócios marcados na coluna ``ir`` e nas colunas antigas ``ir_<nome>``."""
+        ids = set()
+        for nome in (registro.get("ir") or "").split(","):
+            if nome.strip():
+                socio_id = self.socios.get(nome.strip().upper())
+                if socio_id is None:
+                    raise ValueError(f"sócio não encontrado: {nome.strip()!r}")
+                ids.add(socio_id)
+        for coluna, texto in registro.items():
+            if coluna.startswith("ir_") and parse_flag(texto):
+                socio_id = self.primeiros_nomes.get(coluna[3:].upper())
+                if socio_id is None:
+                    raise ValueError(f"sócio não encontrado para a coluna {coluna!r}")
+                ids.add(socio_id)
+        return sorted(ids)
+
+
+def chave(row: dict) -> tuple:
+    """Campos que identificam um lançamento repetido."""
+    return (
+        row["data"], row["natureza_code"], row["conta_id"], row["categoria_id"],
+        row["centro_id"], Decimal(row["valor"]), row["descricao"] or "", row["fornecedor_cliente"] or "",
+    )
+
+
+class Importacao:
+    def __init__(self, db: Session, permitir_duplicados: bool = False,
+                 progresso: Optional[Callable[[int], None]] = None):
+        self.db = db
+        self.permitir_duplicados = permitir_duplicados
+        self.progresso = progresso
+        self.taxonomia = Taxonomia(db)
+        self.vistos = set()
+        self.lote = []
+        self.linhas = 0
+        self.inseridos = 0
+        self.erros = []
+        self.duplicados = []
+
+    def processar(self, arquivo: BinaryIO) -> dict:
+        texto = io.TextIOWrapper(arquivo, encoding="utf-8-sig", newline="")
+        leitor = csv.reader(texto, delimiter=";")
+        cabecalho = [c.strip().lower() for c in next(leitor, [])]
+        if "natureza" not in cabecalho and "tipo" in cabecalho:
+            cabecalho[cabecalho.index("tipo")] = "natureza"
+        faltando = {"data", "natureza", "valor"} - set(cabecalho)
+        if faltando:
+            raise ValueError("colunas obrigatórias ausentes: " + ", ".join(sorted(faltando)))
+
+        for numero, campos in enumerate(leitor, start=2):
+            if not any(c.strip() for c in campos):
+                continue
+            self.linhas += 1
+            registro = dict(zip(cabecalho, campos))
+            try:
+                row = self.converter(registro)
+            except ValueError as exc:
+                self.erros.append({"linha": numero, "erro": str(exc)})
+                continue
+            self.lote.append((numero, row))
+            if len(self.lote) >= TAMANHO_LOTE:
+                self.gravar_lote()
+        self.gravar_lote()
+        texto.detach()
+
+        return {
+            "linhas": self.linhas,
+            "inseridos": self.inseridos,
+            "duplicados": self.duplicados,
+            "erros": self.erros,
+        }
+
+    def converter(self, r: dict) -> dict:
+        row = self.taxonomia.resolver(
+            r.get("natureza", ""), r.get("conta", ""), r.get("categoria", ""), r.get("centro", "")
+        )
+        row.update(
+            data=parse_data(r.get("data", "")),
+            valor=parse_valor(r.get("valor", "")),
+            pagamento=r.get("pagamento") or None,
+            descricao=r.get("descricao") or None,
+            fornecedor_cliente=r.get("fornecedor_cliente") or None,
+            dre=parse_flag(r.get("dre")),
+            ir_socios=self.taxonomia.resolver_ir(r),
+        )
+        return row
+
+    def existentes(self) -> dict:
+        """Chaves já gravadas nas datas do lote (usa o índice por data)."""
+        L = models.Lancamento
+        datas = {row["data"] for _, row in self.lote}
+        encontrados = {}
+        for lanc in self.db.execute(
+            select(
+                L.id, L.data, L.natureza_code, L.conta_id, L.categoria_id, L.centro_id,
+                L.valor, L.descricao, L.fornecedor_cliente,
+            ).where(L.data.in_(datas))
+        ):
+            encontrados.setdefault(chave(lanc._mapping), lanc.id)
+        return encontrados
+
+    def gravar_lote(self):
+        if not self.lote:
+            return
+        existentes = {} if self.permitir_duplicados else self.existentes()
+        novos = []
+        for numero, row in self.lote:
+            k = chave(row)
+            if not self.permitir_duplicados and (k in existentes or k in self.vistos):
+                self.duplicados.append({"linha": numero, "id_existente": existentes.get(k)})
+                continue
+            self.vistos.add(k)
+            novos.append(row)
+        if novos:
+            ir = [row.pop("ir_socios") for row in novos]
+            ids = inserir_lancamentos(self.db, novos)
+            marcacoes = [
+                {"lancamento_id": lanc_id, "socio_id": s} for lanc_id, socios in zip(ids, ir) for s in socios
+            ]
+            if marcacoes:
+                self.db.execute(insert(models.LancamentoIR), marcacoes)
+            self.inseridos += len(novos)
+            deltas = rollup.Deltas()
+            for row in novos:
+                deltas.adicionar(row)
+            deltas.aplicar(self.db)
+        self.lote = []
+        if self.progresso:
+            self.progresso(self.linhas)
+
+
+def importar_csv(db: Session, arquivo: BinaryIO, permitir_duplicados: bool = False,
+                 progresso: Optional[Callable[[int], None]] = None) -> dict:
+    """Importa o CSV e devolve o relatório por linha; não faz commit.
+
+    ``progresso`` recebe o número de linhas lidas a cada lote gravado.
+    """
+    return Importacao(db, permitir_duplicados, progresso).processar(arquivo)
@@ -0,0 +1,74 @@
+"""Relatório de IR de um sócio: receitas e despesas declaradas no ano.
+
+Os lançamentos entram no relatório do sócio pela marcação em
+``lancamento_ir`` (qualquer número de sócios por lançamento). Os totais por
+natureza, conta, categoria e mês saem de uma única consulta agrupada; a
+árvore receitas/despesas → conta → categoria × 12 meses é montada em memória.
+Naturezas com código iniciado em "R" (RO, RNO) são receitas, as demais
+despesas.
+"""
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import Integer, Select, cast, extract, func, select
+
+from . import models
+
+GRUPOS = ("receitas", "despesas")
+
+
+def relatorio_stmt(socio_id: int, ano: int) -> Select:
+    """Linhas: natureza_code, conta_id, conta, categoria_id, categoria, mes (1–12), total."""
+    L, LI = models.Lancamento, models.LancamentoIR
+    mes = cast(extract("month", L.data), Integer).label("mes")
+    return (
+        select(
+            L.natureza_code,
+            L.conta_id, models.Conta.nome.label("conta"),
+            L.categoria_id, models.Categoria.nome.label("categoria"),
+            mes,
+            func.sum(L.valor).label("total"),
+        )
+        .select_from(LI)
+        .join(L, L.id == LI.lancamento_id)
+        .outerjoin(models.Conta, models.Conta.id == L.conta_id)
+        .outerjoin(models.Categoria, models.Categoria.id == L.categoria_id)
+        .where(LI.socio_id == socio_id, L.data >= date(ano, 1, 1), L.data < date(ano + 1, 1, 1))
+        .group_by(L.natureza_code, L.conta_id, models.Conta.nome, L.categoria_id, models.Categoria.nome, mes)
+    )
+
+
+def _zeros() -> list:
+    return [Decimal(0)] * 12
+
+
+def montar(rows) -> dict:
+    """Agrupa as linhas de ``relatorio_stmt`` em receitas/despesas, conta e categoria."""
+    grupos = {g: {"total": Decimal(0), "meses": _zeros(), "contas": {}} for g in GRUPOS}
+    for natureza, conta_id, conta_nome, cat_id, cat_nome, mes, total in rows:
+        valor = Decimal(total or 0)
+        grupo = grupos["receitas" if natureza.startswith("R") else "despesas"]
+        conta = grupo["contas"].setdefault(conta_id, {
+            "conta_id": conta_id, "conta": conta_nome or "(sem conta)",
+            "total": Decimal(0), "meses": _zeros(), "categorias": {},
+        })
+        categoria = conta["categorias"].setdefault(cat_id, {
+            "categoria_id": cat_id, "categoria": cat_nome or "(sem categoria)",
+            "total": Decimal(0), "meses": _zeros(),
+        })
+        for no in (grupo, conta, categoria):
+            no["total"] += valor
+            no["meses"][mes - 1] += valor
+
+    saida = {}
+    for nome, grupo in grupos.items():
+        contas = sorted(grupo["contas"].values(), key=lambda c: c["conta"])
+        for conta in contas:
+            conta["categorias"] = sorted(conta["categorias"].values(), key=lambda c: c["categoria"])
+        saida[nome] = {"total": grupo["total"], "meses": grupo["meses"], "contas": contas}
+    receitas, despesas = saida["receitas"], saida["despesas"]
+    saida["resultado"] = {
+        "total": receitas["total"] - despesas["total"],
+        "meses": [r - d for r, d in zip(receitas["meses"], despesas["meses"])],
+    }
+    return saida
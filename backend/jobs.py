@@ -0,0 +1,380 @@
+"""Tarefas em segundo plano: importação, exportação, upload e reconstruções.
+
+As operações pesadas viram uma linha em ``job``, no mesmo banco do app
+(SQLite ou Postgres), e rodam num pool de threads limitado (``JOB_WORKERS``):
+a rota responde na hora com o id e o cliente acompanha por
+``GET /api/jobs/{id}`` até buscar o resultado. Cada tipo registra sua função
+com ``@tarefa``; ela recebe um ``Contexto`` com os parâmetros já validados, o
+caminho do arquivo enviado, ``progresso(feito, total)`` e ``arquivo(...)``
+para uma saída de download, e o que ela devolve vira o ``resultado`` (JSON).
+
+Os arquivos nunca passam pela memória nem pelo banco: o upload é copiado em
+pedaços para ``JOB_DIR/<id>.entrada`` e a saída é escrita em
+``JOB_DIR/<id>.saida`` e servida de lá; os dois somem com a tarefa.
+
+Cada tarefa tem um dono (``WORKER_ID``, um por processo) e um lease
+(``lease_ate``) que uma thread do dono renova a cada ``JOB_LEASE_S / 3``. Só
+tarefas com o lease vencido — o dono parou — são assumidas por outro processo,
+ao subir ou na ronda periódica, então várias instâncias do app podem dividir o
+mesmo banco. As tarefas que gravam confirmam o lease na própria transação
+(``Contexto.confirmar``): se outro processo assumiu nesse meio tempo, a
+transação é desfeita e nada entra duas vezes. Com várias máquinas, ``JOB_DIR``
+precisa ser um volume compartilhado para que a tarefa possa continuar em outra.
+No fly.io um volume só monta numa máquina, então o ``fly.toml`` põe ``JOB_DIR``
+num volume e o app roda numa máquina só; os arquivos também sobrevivem ao
+desligamento por ociosidade.
+
+O progresso fica em memória enquanto a tarefa roda (no SQLite, gravar em
+paralelo esperaria a transação da importação) e vai para o banco no fim.
+Tarefas terminadas há mais de ``JOB_RETENCAO_H`` horas são apagadas.
+
+Configuração por ambiente:
+
+    JOB_WORKERS     tarefas rodando ao mesmo tempo (padrão: 2)
+    JOB_RETENCAO_H  horas que uma tarefa terminada fica guardada (padrão: 24)
+    JOB_LEASE_S     segundos sem renovação até outro processo assumir (padrão: 120)
+    JOB_DIR         pasta dos arquivos de entrada e saída (padrão: jobs)
+"""
+import logging
+import os
+import pathlib
+import shutil
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import BinaryIO, Callable, NamedTuple, Optional
+
+from pydantic import BaseModel
+from sqlalchemy import Select, and_, delete, or_, select, update
+from sqlalchemy.orm import Session
+
+from . import models, rollup, schemas, storage
+from .database import SessionLocal
+from .exporter import MIMETYPES, exportar_csv, exportar_xlsx
+from .importer import importar_csv
+
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+JOB_RETENCAO_H = float(os.environ.get("JOB_RETENCAO_H", "24"))
+JOB_LEASE_S = float(os.environ.get("JOB_LEASE_S", "120"))
+JOB_DIR = pathlib.Path(os.environ.get("JOB_DIR", "jobs")).resolve()
+
+PENDENTE, EXECUTANDO, CONCLUIDO, ERRO = "pendente", "executando", "concluido", "erro"
+ATIVOS = (PENDENTE, EXECUTANDO)
+
+# um por processo: dois workers do uvicorn na mesma máquina são donos diferentes
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+logger = logging.getLogger("uvicorn.error")
+_pool = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+_progresso: dict[str, tuple[Optional[int], Optional[int]]] = {}
+_lock = threading.Lock()
+_vigia: Optional[threading.Thread] = None
+
+
+class Tipo(NamedTuple):
+    funcao: Callable
+    parametros: type[BaseModel]
+    precisa_arquivo: bool
+
+
+TIPOS: dict[str, Tipo] = {}
+
+
+def tarefa(nome: str, parametros: type[BaseModel] = schemas.JobSemParametros, precisa_arquivo: bool = False):
+    """Registra a função que executa as tarefas do tipo ``nome``."""
+    def registrar(funcao):
+        TIPOS[nome] = Tipo(funcao, parametros, precisa_arquivo)
+        return funcao
+    return registrar
+
+
+class LeasePerdido(Exception):
+    """Outro processo assumiu a tarefa: o que esta execução fez é descartado."""
+
+
+class Contexto:
+    """O que a função da tarefa recebe: parâmetros, entrada e onde pôr progresso e saída."""
+
+    def __init__(self, job_id: str, parametros: BaseModel, entrada: Optional[pathlib.Path]):
+        self.id = job_id
+        self.parametros = parametros
+        self.entrada = entrada  # caminho do arquivo enviado
+        self.saida: Optional[tuple[str, str]] = None
+
+    def progresso(self, feito: Optional[int], total: Optional[int] = None) -> None:
+        with _lock:
+            _progresso[self.id] = (feito, total)
+
+    def arquivo(self, nome: str, mimetype: str) -> pathlib.Path:
+        """Caminho onde escrever a saída para download, com o nome e o tipo dela."""
+        self.saida = (nome, mimetype)
+        JOB_DIR.mkdir(parents=True, exist_ok=True)  # máquina nova: a pasta ainda não existe
+        return caminho(self.id, "saida")
+
+    def confirmar(self, db: Session) -> None:
+        """Renova o lease dentro da transação da tarefa, antes do commit.
+
+        Lança LeasePerdido se outro processo assumiu a tarefa; no Postgres a
+        linha fica travada até o commit, então ninguém assume no meio dele.
+        """
+        J = models.Job
+        renovou = db.execute(
+            update(J).where(J.id == self.id, J.dono == WORKER_ID, J.status == EXECUTANDO)
+            .values(lease_ate=_agora() + timedelta(seconds=JOB_LEASE_S))
+        ).rowcount
+        if not renovou:
+            raise LeasePerdido(self.id)
+
+
+def _agora() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def caminho(job_id: str, tipo: str) -> pathlib.Path:
+    """Arquivo de entrada ou de saída da tarefa em JOB_DIR."""
+    return JOB_DIR / f"{job_id}.{tipo}"
+
+
+def _apagar_arquivos(job_id: str, *tipos: str) -> None:
+    for tipo in tipos or ("entrada", "saida"):
+        caminho(job_id, tipo).unlink(missing_ok=True)
+
+
+def enviar(db: Session, tipo: str, parametros: dict, entrada: Optional[BinaryIO] = None) -> str:
+    """Grava a tarefa (e o arquivo, em pedaços, em JOB_DIR), põe na fila e devolve o id.
+
+    Lança ValueError se o tipo, os parâmetros ou o arquivo não servirem.
+    """
+    t = TIPOS.get(tipo)
+    if t is None:
+        raise ValueError(f"tipo de tarefa desconhecido: {tipo}")
+    if t.precisa_arquivo and entrada is None:
+        raise ValueError(f"a tarefa {tipo} precisa de um arquivo")
+    validados = t.parametros(**parametros)  # ValidationError também é ValueError
+    job_id = uuid.uuid4().hex
+    if entrada is not None:
+        JOB_DIR.mkdir(parents=True, exist_ok=True)
+        entrada.seek(0)
+        with open(caminho(job_id, "entrada"), "wb") as destino:
+            shutil.copyfileobj(entrada, destino, storage.UPLOAD_CHUNK)
+    agora = _agora()
+    db.add(models.Job(
+        id=job_id, tipo=tipo, status=PENDENTE, parametros=validados.model_dump(mode="json"),
+        dono=WORKER_ID, lease_ate=agora + timedelta(seconds=JOB_LEASE_S), criado_em=agora,
+    ))
+    limpar(db)
+    try:
+        db.commit()
+    except Exception:
+        _apagar_arquivos(job_id)
+        raise
+    _pool.submit(executar, job_id)
+    return job_id
+
+
+def executar(job_id: str) -> None:
+    """Roda a tarefa no worker e grava o resultado (ou o erro)."""
+    J = models.Job
+    db = SessionLocal()
+    try:
+        agora = _agora()
+        # pega a tarefa própria que está na fila ou qualquer uma cujo dono parou de renovar
+        pegou = db.execute(
+            update(J).where(
+                J.id == job_id,
+                or_(and_(J.status == PENDENTE, J.dono == WORKER_ID), and_(J.status.in_(ATIVOS), J.lease_ate < agora)),
+            )
+            .values(status=EXECUTANDO, dono=WORKER_ID, lease_ate=agora + timedelta(seconds=JOB_LEASE_S),
+                    iniciado_em=agora)
+        ).rowcount
+        db.commit()
+        if not pegou:
+            return
+        job = db.get(J, job_id)
+        tipo = TIPOS.get(job.tipo)
+        entrada = caminho(job_id, "entrada") if tipo and tipo.precisa_arquivo else None
+        ctx = Contexto(job.id, tipo.parametros(**job.parametros), entrada) if tipo else None
+    finally:
+        db.close()
+
+    campos = {}
+    try:
+        if ctx is None:
+            raise ValueError("tipo de tarefa desconhecido")
+        if entrada is not None and not entrada.exists():
+            raise ValueError("o arquivo da tarefa não está neste servidor (JOB_DIR precisa ser compartilhado)")
+        campos.update(status=CONCLUIDO, resultado=tipo.funcao(ctx))
+        if ctx.saida:
+            campos.update(arquivo_nome=ctx.saida[0], arquivo_mimetype=ctx.saida[1])
+    except LeasePerdido:
+        logger.warning("tarefa %s: assumida por outro processo, resultado descartado", job_id)
+        with _lock:
+            _progresso.pop(job_id, None)
+        return
+    except ValueError as exc:  # entrada inválida: o erro vai para o cliente
+        logger.warning("tarefa %s: %s", job_id, exc)
+        campos.update(status=ERRO, erro=str(exc))
+    except Exception as exc:
+        logger.exception("tarefa %s", job_id)
+        campos.update(status=ERRO, erro=str(exc) or type(exc).__name__)
+    with _lock:
+        campos["feito"], campos["total"] = _progresso.pop(job_id, (None, None))
+
+    db = SessionLocal()
+    try:
+        gravou = db.execute(
+            update(J).where(J.id == job_id, J.dono == WORKER_ID, J.status == EXECUTANDO)
+            .values(concluido_em=_agora(), lease_ate=None, **campos)
+        ).rowcount
+        db.commit()
+    finally:
+        db.close()
+    if gravou:
+        _apagar_arquivos(job_id, "entrada")
+        if campos.get("status") != CONCLUIDO:
+            _apagar_arquivos(job_id, "saida")
+    else:
+        logger.warning("tarefa %s: assumida por outro processo, resultado descartado", job_id)
+
+
+def _renovar_e_assumir() -> list[str]:
+    """Renova o lease das tarefas deste processo e devolve as de lease vencido."""
+    J = models.Job
+    db = SessionLocal()
+    try:
+        agora = _agora()
+        renovou = db.execute(
+            update(J).where(J.dono == WORKER_ID, J.status.in_(ATIVOS))
+            .values(lease_ate=agora + timedelta(seconds=JOB_LEASE_S))
+        ).rowcount
+        # sem tarefa própria, nada a gravar: o commit incrementaria a versão de ``job`` a cada volta
+        if renovou:
+            db.commit()
+        else:
+            db.rollback()
+        return db.scalars(
+            select(J.id).where(J.status.in_(ATIVOS), J.lease_ate < agora).order_by(J.criado_em)
+        ).all()
+    finally:
+        db.close()
+
+
+def _ronda() -> None:
+    while True:
+        time.sleep(JOB_LEASE_S / 3)
+        try:
+            for job_id in _renovar_e_assumir():
+                _pool.submit(executar, job_id)
+        except Exception as exc:
+            # SQLite ocupado por uma importação longa, queda do banco: tenta na próxima volta
+            logger.warning("renovação das tarefas falhou: %s", exc)
+
+
+def retomar() -> int:
+    """Limpa as antigas, assume as tarefas de processos que pararam e liga a ronda do lease.
+
+    Retorna quantas tarefas foram postas na fila.
+    """
+    global _vigia
+    db = SessionLocal()
+    try:
+        limpar(db)
+        db.commit()
+    finally:
+        db.close()
+    ids = _renovar_e_assumir()
+    for job_id in ids:
+        _pool.submit(executar, job_id)
+    if _vigia is None:
+        _vigia = threading.Thread(target=_ronda, name="job-lease", daemon=True)
+        _vigia.start()
+    return len(ids)
+
+
+def limpar(db: Session) -> None:
+    """Apaga as tarefas terminadas há mais de JOB_RETENCAO_H horas, com os arquivos."""
+    J = models.Job
+    velhas = and_(J.status.in_([CONCLUIDO, ERRO]), J.concluido_em < _agora() - timedelta(hours=JOB_RETENCAO_H))
+    for job_id in db.scalars(select(J.id).where(velhas)):
+        _apagar_arquivos(job_id)
+    db.execute(delete(J).where(velhas))
+
+
+# ---- Leitura do estado (sem os arquivos) ----
+
+COLUNAS = (
+    "id", "tipo", "status", "parametros", "feito", "total", "resultado", "erro",
+    "criado_em", "iniciado_em", "concluido_em",
+)
+
+
+def status_stmt(job_id: str) -> Select:
+    J = models.Job
+    return select(*(getattr(J, c) for c in COLUNAS)).where(J.id == job_id)
+
+
+def descrever(row) -> dict:
+    """Estado no formato de schemas.JobOut; o progresso de quem está rodando vem da memória."""
+    job = dict(row._mapping)
+    if job["status"] == EXECUTANDO:
+        with _lock:
+            job["feito"], job["total"] = _progresso.get(job["id"], (None, None))
+    job["resultado_url"] = f"/api/jobs/{job['id']}/resultado" if job["status"] == CONCLUIDO else None
+    return job
+
+
+# ---- Tipos ----
+
+def _contar_linhas(arquivo: pathlib.Path) -> int:
+    with open(arquivo, "rb") as f:
+        return sum(pedaco.count(b"\n") for pedaco in iter(lambda: f.read(storage.UPLOAD_CHUNK), b""))
+
+
+@tarefa("importar", schemas.JobImportar, precisa_arquivo=True)
+def _importar(ctx: Contexto) -> dict:
+    total = max(_contar_linhas(ctx.entrada) - 1, 0)  # aproximado: sem o cabeçalho
+    ctx.progresso(0, total)
+    db = SessionLocal()
+    try:
+        with open(ctx.entrada, "rb") as arquivo:
+            relatorio = importar_csv(
+                db, arquivo, ctx.parametros.permitir_duplicados,
+                progresso=lambda linhas: ctx.progresso(linhas, total),
+            )
+        ctx.confirmar(db)
+        db.commit()
+    except ValueError as exc:  # inclui UnicodeDecodeError
+        db.rollback()
+        raise ValueError(f"CSV inválido: {exc}") from exc
+    finally:
+        db.close()
+    ctx.progresso(relatorio["linhas"], relatorio["linhas"])
+    return relatorio
+
+
+@tarefa("exportar", schemas.JobExportar)
+def _exportar(ctx: Contexto) -> dict:
+    formato = ctx.parametros.formato
+    filtros = schemas.LancamentoFiltro(**ctx.parametros.model_dump(exclude={"formato"}))
+    gerador = exportar_xlsx(filtros) if formato == "xlsx" else exportar_csv(filtros)
+    # direto para o disco, pedaço a pedaço: a memória fica plana como na rota de exportação
+    with open(ctx.arquivo(f"sinuelo_finance.{formato}", MIMETYPES[formato]), "wb") as saida:
+        for pedaco in gerador:
+            saida.write(pedaco)
+            ctx.progresso(saida.tell())  # bytes gerados; o total só se sabe no fim
+        return {"bytes": saida.tell()}
+
+
+@tarefa("resumo_mensal")
+def _resumo_mensal(ctx: Contexto) -> dict:
+    db = SessionLocal()
+    try:
+        linhas = rollup.reconstruir(db)
+        ctx.confirmar(db)
+        db.commit()
+    finally:
+        db.close()
+    return {"linhas": linhas}
@@ -1,21 +1,40 @@
-from fastapi import Query, FastAPI, Depends, HTTPException, UploadFile, File
-from fastapi.responses import FileResponse, HTMLResponse
+from .startup import fase, desde_inicio, PrimeiraResposta  # primeiro: marca o início do import
+from fastapi import Query, FastAPI, Depends, HTTPException, UploadFile, File, Form, Path
+from fastapi.responses import FileResponse, HTMLResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from sqlalchemy.orm import Session
-import pathlib, os, io, base64
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseUpload
+from fastapi.middleware.gzip import GZipMiddleware
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+import pathlib, os, base64, json, threading
 from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import RedirectResponse
-from google_auth_oauthlib.flow import Flow
-from google.oauth2.credentials import Credentials
-from . import models, schemas
-from .database import SessionLocal, engine, get_db
+from . import models, schemas, rollup, storage, metricas, cubo, ir, anexos, jobs
+from .database import SessionLocal, async_engine, engine, get_async_db, get_db
 from .seed import seed_taxonomy
-from sqlalchemy import extract, func
-from datetime import datetime, date
+from .importer import importar_csv
+from .exporter import MIMETYPES, exportar_csv, exportar_xlsx
+from .batch import aplicar_lote
+from .search import buscar
+from .versoes import validar_cache_async, versoes_async
+from .serializacao import TABELAS_NOMES, alteracoes_json, json_resposta, lista_json, pagina_json, select_lancamentos
+from .queries import (
+    filtrar_lancamentos, paginar_lancamentos, encode_cursor,
+    intervalo_periodo, safra_label, proximo_mes, extrato_socio_stmt,
+    GRANULARIDADES, DIMENSOES, series_stmt, rotulo_periodo, indice_periodo,
+)
+from sqlalchemy import and_, extract, func, or_, select, case
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, date, timedelta
+from decimal import Decimal
+from typing import Optional, Union
 
 app = FastAPI(title="Sinuelo Finance API")
+app.add_middleware(PrimeiraResposta)
+# listas grandes (extrato, demonstrativo) comprimidas; respostas pequenas não compensam
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+# por fora do gzip: mede o tempo total e o tamanho que vai para a rede
+app.add_middleware(metricas.Metricas)
 
 # monta estáticos em /static
 
@@ -32,6 +51,7 @@ SCOPES = ["https://www.googleapis.com/auth/drive.file"]
 REDIRECT_URI = "https://sinuelo-finance-api.fly.dev/oauth2callback"
 TOKEN_FILE = "token.json"
 
+# bibliotecas do Google só são importadas no primeiro /authorize ou upload
 user_credentials = None
 
 creds_b64 = os.environ.get("GOOGLE_OAUTH_CREDENTIALS_BASE64")
@@ -41,26 +61,48 @@ if creds_b64:
         f.write(creds_json)
 
 def load_credentials():
+    """Credenciais salvas em TOKEN_FILE, carregadas sob demanda."""
     global user_credentials
-    if os.path.exists(TOKEN_FILE):
+    if user_credentials is None and os.path.exists(TOKEN_FILE):
+        from google.oauth2.credentials import Credentials
         user_credentials = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
-        
+    return user_credentials
+
+def oauth_flow(**kwargs):
+    from google_auth_oauthlib.flow import Flow
+    return Flow.from_client_secrets_file(
+        CLIENT_SECRETS_FILE,
+        scopes=SCOPES,
+        redirect_uri=REDIRECT_URI,
+        **kwargs
+    )
+
 @app.on_event("startup")
 def startup_event():
+    desde_inicio("import")
+    with fase("conexão com o banco"):
+        with engine.connect():
+            pass
     # insere naturezas/contas/categorias se não existir
-    db = SessionLocal()
-    seed_taxonomy(db)
-    db.close()
-    # tenta carregar credenciais salvas
-    load_credentials() 
+    with fase("seed"):
+        db = SessionLocal()
+        seed_taxonomy(db)
+        db.close()
+    # o que ficou na fila quando o processo anterior parou
+    with fase("tarefas pendentes"):
+        jobs.retomar()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await async_engine.dispose()
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(metricas.exportar(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 @app.get("/authorize")
 def authorize():
-    flow = Flow.from_client_secrets_file(
-        CLIENT_SECRETS_FILE,
-        scopes=SCOPES,
-        redirect_uri=REDIRECT_URI
-    )
+    flow = oauth_flow()
     authorization_url, state = flow.authorization_url(
         access_type="offline",
         include_granted_scopes="true"
@@ -71,12 +113,7 @@ def authorize():
 def oauth2callback(request: Request):
     global user_credentials
     state = request.query_params.get("state")
-    flow = Flow.from_client_secrets_file(
-        CLIENT_SECRETS_FILE,
-        scopes=SCOPES,
-        redirect_uri=REDIRECT_URI,
-        state=state
-    )
+    flow = oauth_flow(state=state)
     auth_response = str(request.url).replace("http://", "https://")
     flow.fetch_token(authorization_response=auth_response)
     user_credentials = flow.credentials
@@ -86,8 +123,11 @@ def oauth2callback(request: Request):
     return {"status": "Autenticado com sucesso!"}
 
 @app.get("/api/naturezas", response_model=list[schemas.NaturezaOut])
-def list_naturezas(db: Session = Depends(get_db)):
-    return db.query(models.Natureza).all()
+async def list_naturezas(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    nao_modificado = await validar_cache_async(request, response, db, "natureza")
+    if nao_modificado:
+        return nao_modificado
+    return (await db.scalars(select(models.Natureza))).all()
 
 @app.get("/api/naturezas/{code}/contas", response_model=list[schemas.ContaOut])
 def list_contas(code: str, db: Session = Depends(get_db)):
@@ -96,25 +136,164 @@ def list_contas(code: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Natureza não encontrada")
     return [c for c in nat.contas if c.ativo]
 
+# ---- Taxonomia (natureza → conta → categoria numa única chamada) ----
+ORDEM_NATUREZA = ["RO", "RNO", "DO", "DNO"]
+
+TABELAS_TAXONOMIA = ("natureza", "conta", "categoria")
+
+# corpo pronto da última versão montada; a chave é a versão das tabelas,
+# então qualquer processo enxerga as alterações feitas pelos outros
+_taxonomia_cache = {"versao": None, "body": None}
+_taxonomia_lock = threading.Lock()
+
+def montar_taxonomia(db: Session) -> list[dict]:
+    naturezas = db.scalars(
+        select(models.Natureza).options(
+            selectinload(models.Natureza.contas).selectinload(models.Conta.categorias)
+        )
+    ).all()
+    ordem = {code: i for i, code in enumerate(ORDEM_NATUREZA)}
+    naturezas = sorted(naturezas, key=lambda n: (ordem.get(n.code, len(ordem)), n.code))
+    return [
+        {
+            "code": nat.code,
+            "nome": nat.nome,
+            "contas": [
+                {
+                    "id": conta.id,
+                    "nome": conta.nome,
+                    "ativo": conta.ativo is not False,
+                    "categorias": [
+                        {"id": cat.id, "nome": cat.nome, "ativo": cat.ativo is not False}
+                        for cat in sorted(conta.categorias, key=lambda c: c.id)
+                    ],
+                }
+                for conta in sorted(nat.contas, key=lambda c: c.id)
+            ],
+        }
+        for nat in naturezas
+    ]
+
+@app.get("/api/taxonomia", response_model=list[schemas.TaxonomiaNatureza])
+async def taxonomia(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    nao_modificado = await validar_cache_async(request, response, db, *TABELAS_TAXONOMIA)
+    if nao_modificado:
+        return nao_modificado
+    versao, _ = await versoes_async(db, TABELAS_TAXONOMIA)
+    with _taxonomia_lock:
+        body = _taxonomia_cache["body"] if _taxonomia_cache["versao"] == versao else None
+    if body is None:
+        arvore = await db.run_sync(montar_taxonomia)
+        body = json.dumps(arvore, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        with _taxonomia_lock:
+            _taxonomia_cache["versao"], _taxonomia_cache["body"] = versao, body
+    return Response(content=body, media_type="application/json", headers=dict(response.headers))
+
 # ---- Upload de arquivo ----
 @app.post("/api/upload")
 async def upload_file(file: UploadFile = File(...)):
-    global user_credentials
-    if not user_credentials:
-        raise HTTPException(status_code=401, detail="Usuário não autenticado. Acesse /authorize primeiro.")
-
-    contents = await file.read()
-    media = MediaIoBaseUpload(io.BytesIO(contents), mimetype=file.content_type)
-    file_metadata = {"name": file.filename,  "parents": ["1DyLOUlFknjZszui8sy5mb8tSvsXO0SlT"]}
-
-    service = build("drive", "v3", credentials=user_credentials)
-    f = service.files().create(
-        body=file_metadata,
-        media_body=media,
-        fields="id, name, webViewLink"
-    ).execute()
+    credentials = None
+    if storage.precisa_credenciais():
+        credentials = await run_in_threadpool(load_credentials)
+        if not credentials:
+            raise HTTPException(status_code=401, detail="Usuário não autenticado. Acesse /authorize primeiro.")
+    # hash e envio em streaming no pool de upload: não segura o event loop;
+    # arquivo já anexado antes (mesmo SHA-256) não vai de novo ao Drive
+    return await anexos.enviar(credentials, file.file, file.filename, file.content_type)
+
+@jobs.tarefa("upload", schemas.JobUpload, precisa_arquivo=True)
+def tarefa_upload(ctx: jobs.Contexto) -> dict:
+    credentials = None
+    if storage.precisa_credenciais():
+        credentials = load_credentials()
+        if not credentials:
+            raise ValueError("Usuário não autenticado. Acesse /authorize primeiro.")
+    with open(ctx.entrada, "rb") as arquivo:
+        return anexos.receber(credentials, arquivo, ctx.parametros.nome, ctx.parametros.mimetype)
+
+# miniatura de um anexo: o conteúdo nunca muda, o navegador guarda de vez
+@app.get("/api/anexos/{anexo_id}/miniatura")
+async def miniatura_anexo(anexo_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    A = models.Anexo
+    # o ETag sai do hash: a imagem só é lida do banco quando o corpo vai na resposta
+    row = (await db.execute(
+        select(A.sha256, A.mimetype, A.miniatura_falhou, A.miniatura.is_not(None).label("pronta"))
+        .where(A.id == anexo_id)
+    )).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Anexo não encontrado")
+    imutavel = "public, max-age=31536000, immutable"
+    if not row.pronta:
+        # PDF e afins, ou imagem que o worker não leu, nunca terão prévia;
+        # imagem ainda na fila do worker: tenta de novo depois
+        pendente = anexos.tem_miniatura(row.mimetype) and not row.miniatura_falhou
+        raise HTTPException(status_code=404, detail="Miniatura indisponível",
+                            headers={"Cache-Control": "no-store" if pendente else imutavel})
+    headers = {"ETag": f'"{row.sha256}"', "Cache-Control": imutavel}
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    miniatura = await db.scalar(select(A.miniatura).where(A.id == anexo_id))
+    return Response(content=miniatura, media_type=anexos.MINIATURA_MIMETYPE, headers=headers)
+
+# ---- Tarefas em segundo plano (importar, exportar, upload, resumo_mensal) ----
+@app.post("/api/jobs", response_model=schemas.JobOut, status_code=202)
+def create_job(
+    response: Response,
+    tipo: str = Form(...),
+    parametros: str = Form("{}", description="Parâmetros da tarefa, objeto JSON"),
+    file: Optional[UploadFile] = File(None),
+    db: Session = Depends(get_db),
+):
+    """Enfileira a tarefa e responde na hora; o andamento sai em GET /api/jobs/{id}.
 
-    return {"id": f["id"], "name": f["name"], "url": f["webViewLink"]}
+    O arquivo vai do upload (já em disco pelo Starlette) para JOB_DIR em pedaços.
+    """
+    try:
+        params = json.loads(parametros)
+    except ValueError:
+        params = None
+    if not isinstance(params, dict):
+        raise HTTPException(status_code=422, detail="parametros deve ser um objeto JSON")
+    if file:
+        params.setdefault("nome", file.filename)
+        params.setdefault("mimetype", file.content_type)
+    if tipo == "upload" and storage.precisa_credenciais() and not load_credentials():
+        raise HTTPException(status_code=401, detail="Usuário não autenticado. Acesse /authorize primeiro.")
+    try:
+        job_id = jobs.enviar(db, tipo, params, file.file if file else None)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    response.headers["Location"] = f"/api/jobs/{job_id}"
+    return jobs.descrever(db.execute(jobs.status_stmt(job_id)).one())
+
+@app.get("/api/jobs/{job_id}", response_model=schemas.JobOut)
+async def get_job(job_id: str, response: Response, db: AsyncSession = Depends(get_async_db)):
+    row = (await db.execute(jobs.status_stmt(job_id))).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Tarefa não encontrada")
+    response.headers["Cache-Control"] = "no-store"
+    return jobs.descrever(row)
+
+@app.get("/api/jobs/{job_id}/resultado")
+async def get_job_resultado(job_id: str, db: AsyncSession = Depends(get_async_db)):
+    """Arquivo gerado (exportações) ou o resultado em JSON."""
+    J = models.Job
+    row = (await db.execute(
+        select(J.status, J.resultado, J.arquivo_nome, J.arquivo_mimetype, J.erro).where(J.id == job_id)
+    )).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Tarefa não encontrada")
+    if row.status == jobs.ERRO:
+        raise HTTPException(status_code=409, detail=f"Tarefa terminou com erro: {row.erro}")
+    if row.status != jobs.CONCLUIDO:
+        raise HTTPException(status_code=409, detail="Tarefa ainda não concluída")
+    if row.arquivo_nome is not None:
+        # servido do disco em pedaços, sem passar pela memória
+        arquivo = jobs.caminho(job_id, "saida")
+        if not arquivo.exists():
+            raise HTTPException(status_code=404, detail="Arquivo da tarefa não está neste servidor")
+        return FileResponse(arquivo, media_type=row.arquivo_mimetype, filename=row.arquivo_nome)
+    return json_resposta(row.resultado)
 
 # ---- Contas → Categorias ----
 @app.get("/api/contas/{conta_id}/categorias", response_model=list[schemas.CategoriaOut])
@@ -127,8 +306,11 @@ def list_categorias(conta_id: int, db: Session = Depends(get_db)):
 
 # ---- Centros ----
 @app.get("/api/centros", response_model=list[schemas.CentroOut])
-def list_centros(db: Session = Depends(get_db)):
-    return db.query(models.Centro).all()
+async def list_centros(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    nao_modificado = await validar_cache_async(request, response, db, "centro")
+    if nao_modificado:
+        return nao_modificado
+    return (await db.scalars(select(models.Centro))).all()
 
 @app.post("/api/centros", response_model=schemas.CentroOut)
 def create_centro(centro: schemas.CentroCreate, db: Session = Depends(get_db)):
@@ -138,6 +320,51 @@ def create_centro(centro: schemas.CentroCreate, db: Session = Depends(get_db)):
     db.refresh(obj)
     return obj
 
+@app.put("/api/centros/{centro_id}", response_model=schemas.CentroOut)
+def update_centro(centro_id: int, dados: schemas.CentroUpdate, db: Session = Depends(get_db)):
+    centro = db.get(models.Centro, centro_id)
+    if not centro:
+        raise HTTPException(status_code=404, detail="Centro não encontrado")
+    for field, value in dados.dict(exclude_unset=True).items():
+        setattr(centro, field, value)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Já existe um centro com esse nome")
+    db.refresh(centro)
+    return centro
+
+@app.get("/api/centros/resultado")
+async def resultado_centros(
+    request: Request,
+    response: Response,
+    granularidade: str = Query("ano", pattern="^(" + "|".join(GRANULARIDADES) + ")$",
+                               description="mes, trimestre, safra (julho–junho) ou ano"),
+    ano: Optional[int] = Query(None, description="Ano civil"),
+    inicio: Optional[str] = Query(None, description="Mês inicial no formato YYYY-MM"),
+    fim: Optional[str] = Query(None, description="Mês final no formato YYYY-MM"),
+    safra: Optional[str] = Query(None, description="Safra julho–junho, ex.: 24-25"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Receita (RO), custo operacional (DO), margem e os mesmos valores por hectare, por centro e período."""
+    nao_modificado = await validar_cache_async(request, response, db, *cubo.TABELAS)
+    if nao_modificado:
+        return nao_modificado
+    try:
+        de, ate = intervalo_periodo(ano, inicio, fim, safra)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Período inválido, use ano, YYYY-MM ou safra AA-AA")
+    centros = cubo.resultado(await cubo.obter(db), granularidade, de, ate)
+    return {
+        "granularidade": granularidade,
+        "periodo": {
+            "inicio": str(de) if de else None,
+            "fim": str(ate - timedelta(days=1)) if ate else None,
+        },
+        "centros": centros,
+    }
+
 @app.delete("/api/centros/{centro_id}")
 def delete_centro(centro_id: int, db: Session = Depends(get_db)):
     centro = db.query(models.Centro).filter_by(id=centro_id).first()
@@ -149,14 +376,190 @@ def delete_centro(centro_id: int, db: Session = Depends(get_db)):
 
 
 # ---- Lançamentos ----
-@app.get("/api/lancamentos", response_model=list[schemas.LancamentoOut])
-def list_lancamentos(db: Session = Depends(get_db)):
-    return db.query(models.Lancamento).all()
+def filtros_lancamento(
+    start: Optional[date] = Query(None, description="Data inicial (YYYY-MM-DD)"),
+    end: Optional[date] = Query(None, description="Data final (YYYY-MM-DD)"),
+    natureza_code: Optional[str] = Query(None),
+    conta_id: Optional[int] = Query(None),
+    categoria_id: Optional[int] = Query(None),
+    centro_id: Optional[int] = Query(None),
+    ir_socio: Optional[int] = Query(None, description="Somente lançamentos declarados no IR do sócio"),
+    q: Optional[str] = Query(None, description="Busca em descrição, fornecedor, pagamento, conta, categoria e centro"),
+) -> schemas.LancamentoFiltro:
+    return schemas.LancamentoFiltro(
+        start=start, end=end, natureza_code=natureza_code, conta_id=conta_id,
+        categoria_id=categoria_id, centro_id=centro_id, ir_socio=ir_socio, q=q,
+    )
+
+def expandir_nomes(
+    expand: Optional[str] = Query(None, pattern="^names$",
+                                  description="names: inclui os nomes de natureza, conta, categoria e centro"),
+) -> bool:
+    return expand == "names"
+
+@app.get("/api/lancamentos", response_model=Union[schemas.LancamentoPage, list[schemas.LancamentoExpandido]])
+async def list_lancamentos(
+    request: Request,
+    response: Response,
+    filtros: schemas.LancamentoFiltro = Depends(filtros_lancamento),
+    cursor: Optional[str] = Query(None, description="Valor de next_cursor da página anterior"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Tamanho da página (padrão 200 com cursor)"),
+    nomes: bool = Depends(expandir_nomes),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Lançamentos filtrados, do mais recente para o mais antigo.
+
+    Com ``limit`` ou ``cursor`` a resposta é uma página ``{items, next_cursor}``;
+    sem eles, a lista inteira, como antes da paginação (clientes antigos).
+    """
+    tabelas = ("lancamento", *TABELAS_NOMES) if nomes else ("lancamento", "conta", "categoria", "centro")
+    nao_modificado = await validar_cache_async(request, response, db, *tabelas)
+    if nao_modificado:
+        return nao_modificado
+    # caminho rápido: tuplas de colunas direto para orjson, sem ORM/Pydantic por linha
+    stmt = filtrar_lancamentos(select_lancamentos(nomes), filtros)
+    if limit is None and cursor is None:
+        L = models.Lancamento
+        rows = await db.execute(stmt.order_by(L.data.desc(), L.id.desc()))
+        return lista_json(rows, dict(response.headers), nomes)
+    limit = limit or 200
+    try:
+        stmt = paginar_lancamentos(stmt, cursor, limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    rows = (await db.execute(stmt)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].data, rows[-1].id)
+    return pagina_json(rows, next_cursor, dict(response.headers), nomes)
+
+@app.get("/api/lancamentos/busca", response_model=schemas.LancamentoPage)
+async def search_lancamentos(
+    filtros: schemas.LancamentoFiltro = Depends(filtros_lancamento),
+    cursor: Optional[str] = Query(None, description="Valor de next_cursor da página anterior"),
+    limit: int = Query(50, ge=1, le=500),
+    nomes: bool = Depends(expandir_nomes),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Busca textual em descrição e fornecedor/cliente, por relevância.
+
+    O termo vem em ``q``; os demais filtros do extrato também valem.
+    """
+    termo = (filtros.q or "").strip()
+    if not termo:
+        raise HTTPException(status_code=400, detail="Informe o termo de busca em q")
+    try:
+        offset = int(cursor) if cursor else 0
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    base = filtrar_lancamentos(select_lancamentos(nomes), schemas.LancamentoFiltro(**{**filtros.dict(), "q": None}))
+    try:
+        stmt = buscar(db, base, termo, offset, limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Informe o termo de busca em q")
+    rows = (await db.execute(stmt)).all()
+
+    # a ordem é por relevância: o cursor é só o deslocamento
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = str(offset + limit)
+    return pagina_json(rows, next_cursor, nomes=nomes)
+
+@app.get("/api/lancamentos/changes")
+async def lancamentos_changes(
+    since: int = Query(0, ge=0, description="seq da última sincronização (0: tudo)"),
+    after: Optional[int] = Query(None, description="Valor de after da página anterior"),
+    limit: int = Query(1000, ge=1, le=5000),
+    nomes: bool = Depends(expandir_nomes),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Lançamentos alterados e excluídos depois de ``since``, em ordem de (seq, id).
+
+    Com ``more`` verdadeiro, repita com ``since=seq&after=after``; no fim,
+    ``seq`` é o cursor da próxima sincronização. Um item e uma lápide com o
+    mesmo id valem pelo de maior ``seq``. Com ``expand=names``, ``nomes`` é a
+    versão da taxonomia: se mudar, sincronize desde 0 para renovar os nomes.
+    """
+    L, X, V = models.Lancamento, models.LancamentoExcluido, models.TabelaVersao
+    atual = await db.scalar(select(V.versao).where(V.tabela == L.__tablename__)) or 0
+    if since > atual:
+        raise HTTPException(status_code=410, detail="Cursor à frente do servidor, sincronize desde 0")
+
+    versao_nomes = (await versoes_async(db, TABELAS_NOMES))[0] if nomes else None
+
+    depois = L.seq > since if after is None else or_(L.seq > since, and_(L.seq == since, L.id > after))
+    rows = (await db.execute(
+        select_lancamentos(nomes).where(depois, L.seq <= atual).order_by(L.seq, L.id).limit(limit + 1)
+    )).all()
+    excluidos = []
+    if since:
+        excluidos = (await db.execute(
+            select(X.lancamento_id, X.seq).where(X.seq > since, X.seq <= atual).order_by(X.seq, X.id)
+        )).all()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return alteracoes_json(rows, excluidos, rows[-1].seq, rows[-1].id, True, versao_nomes)
+    return alteracoes_json(rows, excluidos, atual, None, False, versao_nomes)
+
+@app.get("/api/lancamentos/export")
+def export_lancamentos(
+    filtros: schemas.LancamentoFiltro = Depends(filtros_lancamento),
+    formato: str = Query("csv", pattern="^(csv|xlsx)$"),
+):
+    gerador = exportar_xlsx(filtros) if formato == "xlsx" else exportar_csv(filtros)
+    return StreamingResponse(
+        gerador,
+        media_type=MIMETYPES[formato],
+        headers={"Content-Disposition": f'attachment; filename="sinuelo_finance.{formato}"'},
+    )
+
+@app.post("/api/lancamentos/import")
+def import_lancamentos(
+    file: UploadFile = File(...),
+    permitir_duplicados: bool = Query(False, description="Grava mesmo linhas iguais a lançamentos existentes"),
+    db: Session = Depends(get_db)
+):
+    try:
+        relatorio = importar_csv(db, file.file, permitir_duplicados)
+    except (ValueError, UnicodeDecodeError) as exc:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"CSV inválido: {exc}")
+    db.commit()
+    return relatorio
+
+@app.post("/api/lancamentos/batch", response_model=schemas.LancamentoBatchResult)
+def batch_lancamentos(lote: schemas.LancamentoBatch, db: Session = Depends(get_db)):
+    try:
+        items = aplicar_lote(db, lote)
+        db.commit()
+    except IntegrityError as exc:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Lote rejeitado: {exc.orig}")
+    return {"items": items}
+
+def checar_socios_ir(db: Session, socio_ids) -> None:
+    ids = set(socio_ids or ())
+    if ids and db.scalar(select(func.count()).where(models.Socio.id.in_(ids))) != len(ids):
+        raise HTTPException(status_code=422, detail="Sócio não encontrado em ir_socios")
+
+def checar_anexo(db: Session, anexo_id) -> None:
+    if anexo_id is not None and db.get(models.Anexo, anexo_id) is None:
+        raise HTTPException(status_code=422, detail="Anexo não encontrado")
 
 @app.post("/api/lancamentos", response_model=schemas.LancamentoOut)
 def create_lancamento(l: schemas.LancamentoCreate, db: Session = Depends(get_db)):
+    checar_socios_ir(db, l.ir_socios)
+    checar_anexo(db, l.anexo_id)
     obj = models.Lancamento(**l.dict())
     db.add(obj)
+    db.flush()
+    deltas = rollup.Deltas()
+    deltas.adicionar(obj)
+    deltas.aplicar(db)
     db.commit()
     db.refresh(obj)
     return obj
@@ -166,8 +569,14 @@ def update_lancamento(lanc_id: int, l: schemas.LancamentoUpdate, db: Session = D
     obj = db.query(models.Lancamento).filter_by(id=lanc_id).first()
     if not obj:
         raise HTTPException(status_code=404, detail="Lançamento não encontrado")
+    checar_socios_ir(db, l.ir_socios)
+    checar_anexo(db, l.anexo_id)
+    antes = rollup.valores(obj)
     for field, value in l.dict(exclude_unset=True).items():
         setattr(obj, field, value)
+    deltas = rollup.Deltas()
+    deltas.trocar(antes, obj)
+    deltas.aplicar(db)
     db.commit()
     db.refresh(obj)
     return obj
@@ -177,6 +586,9 @@ def delete_lancamento(lanc_id: int, db: Session = Depends(get_db)):
     obj = db.query(models.Lancamento).filter_by(id=lanc_id).first()
     if not obj:
         raise HTTPException(status_code=404, detail="Lançamento não encontrado")
+    deltas = rollup.Deltas()
+    deltas.adicionar(obj, -1)
+    deltas.aplicar(db)
     db.delete(obj)
     db.commit()
     return {"detail": "Lançamento removido"}
@@ -245,8 +657,11 @@ def create_socio(socio: schemas.SocioCreate, db: Session = Depends(get_db)):
     return db_socio
 
 @app.get("/api/socios/", response_model=list[schemas.SocioResponse])
-def list_socios(db: Session = Depends(get_db)):
-    return db.query(models.Socio).all()
+async def list_socios(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    nao_modificado = await validar_cache_async(request, response, db, "socio")
+    if nao_modificado:
+        return nao_modificado
+    return (await db.scalars(select(models.Socio))).all()
 
 @app.put("/api/socios/{socio_id}/saldo_inicial", response_model=schemas.SocioResponse)
 def update_saldo_inicial(socio_id: int, saldo: schemas.SocioUpdateSaldo, db: Session = Depends(get_db)):
@@ -258,65 +673,59 @@ def update_saldo_inicial(socio_id: int, saldo: schemas.SocioUpdateSaldo, db: Ses
     db.refresh(socio)
     return socio
 
+@app.put("/api/socios/{socio_id}/categorias", response_model=schemas.SocioResponse)
+def update_categorias_socio(socio_id: int, cats: schemas.SocioUpdateCategorias, db: Session = Depends(get_db)):
+    socio = db.query(models.Socio).filter(models.Socio.id == socio_id).first()
+    if not socio:
+        raise HTTPException(status_code=404, detail="Sócio não encontrado")
+    for field, value in cats.dict(exclude_unset=True).items():
+        if value is not None and not db.query(models.Categoria).filter(models.Categoria.id == value).first():
+            raise HTTPException(status_code=404, detail="Categoria não encontrada")
+        setattr(socio, field, value)
+    db.commit()
+    db.refresh(socio)
+    return socio
+
 @app.get("/api/socios/{socio_id}/extrato")
-def extrato_socio(
+async def extrato_socio(
+    request: Request,
+    response: Response,
     socio_id: int,
     start: str = Query(None, description="Data inicial no formato YYYY-MM"),
     end: str = Query(None, description="Data final no formato YYYY-MM"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    socio = db.query(models.Socio).filter(models.Socio.id == socio_id).first()
+    nao_modificado = await validar_cache_async(
+        request, response, db, "lancamento", "lancamento_mensal", "socio", extra=date.today().strftime("%Y-%m")
+    )
+    if nao_modificado:
+        return nao_modificado
+    socio = await db.get(models.Socio, socio_id)
     if not socio:
         raise HTTPException(status_code=404, detail="Sócio não encontrado")
 
     # converter strings YYYY-MM em datas
     try:
         start_date = datetime.strptime(start, "%Y-%m").date() if start else date(2000, 1, 1)
-        end_date = datetime.strptime(end, "%Y-%m").date() if end else date.today()
+        # fim exclusivo: o mês final entra inteiro
+        end_date = proximo_mes(datetime.strptime(end, "%Y-%m").date() if end else date.today().replace(day=1))
     except ValueError:
         raise HTTPException(status_code=400, detail="Formato inválido, use YYYY-MM")
 
-    # mapeamento simples pelo nome do sócio
-    if "EDUARDO" in socio.nome.upper():
-        categoria_aporte = "APORTE EDUARDO PAIM"
-        categoria_retirada = "RETIRADAS EDUARDO PAIM"
-    elif "ROBERTO" in socio.nome.upper():
-        categoria_aporte = "APORTE ROBERTO PAIM"
-        categoria_retirada = "RETIRADAS ROBERTO PAIM"
-    else:
+    if not socio.categoria_aporte_id or not socio.categoria_retirada_id:
         raise HTTPException(status_code=400, detail="Sócio sem mapeamento de aportes/retiradas")
 
-    # buscar lançamentos no período
-    lancs = (
-        db.query(models.Lancamento)
-        .filter(models.Lancamento.data >= start_date, models.Lancamento.data <= end_date)
-        .all()
-    )
-
-    from collections import defaultdict
-    resumo = defaultdict(lambda: {"entradas": 0, "saidas": 0})
-    
-    for l in lancs:
-        mes = l.data.strftime("%m/%Y")
-
-        cat = None
-        if l.categoria_id:
-            cat = db.query(models.Categoria).filter(models.Categoria.id == l.categoria_id).first()
-
-        if cat and cat.nome.upper() == categoria_aporte:
-            resumo[mes]["entradas"] += float(l.valor)
-        elif cat and cat.nome.upper() == categoria_retirada:
-            resumo[mes]["saidas"] += float(l.valor)
+    # entradas/saídas por mês do resumo mensal, em Numeric
+    stmt = extrato_socio_stmt(socio.categoria_aporte_id, socio.categoria_retirada_id, start_date, end_date)
 
-    # ordenar meses
-    saldo = float(socio.saldo_inicial or 0)
+    saldo = Decimal(socio.saldo_inicial or 0)
     resultado = []
-    for mes in sorted(resumo.keys(), key=lambda m: datetime.strptime(m, "%m/%Y")):
-        entradas = resumo[mes]["entradas"]
-        saidas = resumo[mes]["saidas"]
+    for mes, entradas, saidas in await db.execute(stmt):
+        entradas = Decimal(entradas or 0)
+        saidas = Decimal(saidas or 0)
         saldo += entradas - saidas
         resultado.append({
-            "mes": mes,
+            "mes": f"{mes.month:02d}/{mes.year}",
             "entradas": entradas,
             "saidas": saidas,
             "saldo": saldo
@@ -324,7 +733,270 @@ def extrato_socio(
 
     return {
         "socio": socio.nome,
-        "saldo_inicial": float(socio.saldo_inicial or 0),
-        "periodo": {"inicio": str(start_date), "fim": str(end_date)},
+        "saldo_inicial": Decimal(socio.saldo_inicial or 0),
+        "periodo": {"inicio": str(start_date), "fim": str(end_date - timedelta(days=1))},
         "extrato": resultado
-    }
\ No newline at end of file
+    }
+
+# ---------- IR por sócio ---------- #
+
+@app.get("/api/ir/{socio_id}/{ano}")
+async def relatorio_ir(
+    request: Request,
+    response: Response,
+    socio_id: int,
+    ano: int = Path(..., ge=1900, le=2999),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Receitas e despesas declaradas pelo sócio no ano, por conta/categoria e mês."""
+    nao_modificado = await validar_cache_async(
+        request, response, db, "lancamento", "lancamento_ir", "conta", "categoria", "socio"
+    )
+    if nao_modificado:
+        return nao_modificado
+    socio = await db.get(models.Socio, socio_id)
+    if not socio:
+        raise HTTPException(status_code=404, detail="Sócio não encontrado")
+    rows = (await db.execute(ir.relatorio_stmt(socio_id, ano))).all()
+    return json_resposta({
+        "socio": {"id": socio.id, "nome": socio.nome},
+        "ano": ano,
+        **ir.montar(rows),
+    }, dict(response.headers))
+
+@app.get("/api/ir/{socio_id}/{ano}/csv")
+def relatorio_ir_csv(socio_id: int, ano: int = Path(..., ge=1900, le=2999), db: Session = Depends(get_db)):
+    """Lançamentos do relatório de IR, um por linha, no formato do export do extrato."""
+    if not db.get(models.Socio, socio_id):
+        raise HTTPException(status_code=404, detail="Sócio não encontrado")
+    filtros = schemas.LancamentoFiltro(start=date(ano, 1, 1), end=date(ano, 12, 31), ir_socio=socio_id)
+    return StreamingResponse(
+        exportar_csv(filtros),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="ir_{socio_id}_{ano}.csv"'},
+    )
+
+# ---------- KPIs ---------- #
+
+@app.get("/api/kpis")
+async def kpis(
+    request: Request,
+    response: Response,
+    mes: Optional[str] = Query(None, description="Mês no formato YYYY-MM (padrão: mês atual)"),
+    inicio: Optional[str] = Query(None, description="Mês inicial no formato YYYY-MM"),
+    fim: Optional[str] = Query(None, description="Mês final no formato YYYY-MM"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Totais por natureza e saldo do período, direto do resumo mensal."""
+    nao_modificado = await validar_cache_async(
+        request, response, db, "lancamento", "lancamento_mensal", extra=date.today().strftime("%Y-%m")
+    )
+    if nao_modificado:
+        return nao_modificado
+    if not (mes or inicio or fim):
+        mes = date.today().strftime("%Y-%m")
+    try:
+        de, ate = intervalo_periodo(inicio=inicio or mes, fim=fim or mes)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Formato inválido, use YYYY-MM")
+
+    M = models.LancamentoMensal
+    stmt = select(M.natureza_code, func.sum(M.valor)).group_by(M.natureza_code)
+    if de:
+        stmt = stmt.where(M.mes >= de)
+    if ate:
+        stmt = stmt.where(M.mes < ate)
+    totais = {code: Decimal(0) for code in ORDEM_NATUREZA}
+    for code, total in await db.execute(stmt):
+        totais[code] = Decimal(total or 0)
+
+    return {
+        "periodo": {
+            "inicio": str(de) if de else None,
+            "fim": str(ate - timedelta(days=1)) if ate else None,
+        },
+        "totais": totais,
+        "saldo": totais["RO"] + totais["RNO"] - totais["DO"] - totais["DNO"],
+    }
+
+# ---------- Séries por período ---------- #
+
+@app.get("/api/series")
+async def series(
+    request: Request,
+    response: Response,
+    granularidade: str = Query("mes", pattern="^(" + "|".join(GRANULARIDADES) + ")$",
+                               description="mes, trimestre, safra (julho–junho) ou ano"),
+    dimensao: str = Query("natureza", pattern="^(" + "|".join(DIMENSOES) + ")$"),
+    ano: Optional[int] = Query(None, description="Ano civil"),
+    inicio: Optional[str] = Query(None, description="Mês inicial no formato YYYY-MM"),
+    fim: Optional[str] = Query(None, description="Mês final no formato YYYY-MM"),
+    safra: Optional[str] = Query(None, description="Safra julho–junho, ex.: 24-25"),
+    natureza_code: Optional[str] = Query(None),
+    conta_id: Optional[int] = Query(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Totais por período e por natureza/conta/categoria, com variação e acumulado.
+
+    Tudo sai de uma consulta com funções de janela sobre o resumo mensal;
+    ``anterior`` é o total do período imediatamente anterior (0 se vazio).
+    """
+    nao_modificado = await validar_cache_async(request, response, db, "lancamento_mensal", "natureza", "conta", "categoria")
+    if nao_modificado:
+        return nao_modificado
+    try:
+        de, ate = intervalo_periodo(ano, inicio, fim, safra)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Período inválido, use ano, YYYY-MM ou safra AA-AA")
+
+    stmt = series_stmt(granularidade, dimensao, de, ate, natureza_code, conta_id)
+    series = {}
+    for chave, nome, periodo, total, anterior, acumulado in await db.execute(stmt):
+        anterior = anterior or 0
+        delta = total - anterior
+        serie = series.setdefault(chave, {"id": chave, "nome": nome or f"(sem {dimensao})", "pontos": []})
+        serie["pontos"].append({
+            "periodo": rotulo_periodo(granularidade, periodo),
+            "total": total,
+            "anterior": anterior,
+            "delta": delta,
+            "variacao": round(delta / anterior, 4) if anterior else None,
+            "acumulado": acumulado,
+        })
+
+    ordem = {code: i for i, code in enumerate(ORDEM_NATUREZA)}
+    chaves = sorted(series, key=lambda c: (ordem.get(c, len(ordem)), str(c)) if dimensao == "natureza" else
+                    (c is None, c or 0))
+    # dez anos mês a mês por categoria são ~15 mil pontos: orjson em vez do jsonable_encoder
+    return json_resposta({
+        "granularidade": granularidade,
+        "dimensao": dimensao,
+        "periodo": {
+            "inicio": str(de) if de else None,
+            "fim": str(ate - timedelta(days=1)) if ate else None,
+        },
+        "series": [series[c] for c in chaves],
+    }, dict(response.headers))
+
+# ---------- Demonstrativo ---------- #
+
+@app.get("/api/demonstrativo")
+async def demonstrativo(
+    request: Request,
+    response: Response,
+    ano: Optional[int] = Query(None, description="Ano civil"),
+    inicio: Optional[str] = Query(None, description="Mês inicial no formato YYYY-MM"),
+    fim: Optional[str] = Query(None, description="Mês final no formato YYYY-MM"),
+    safra: Optional[str] = Query(None, description="Safra julho–junho, ex.: 24-25"),
+    dre: bool = Query(False, description="Somente lançamentos marcados para a DRE"),
+    ir_socio: Optional[int] = Query(None, description="Somente lançamentos declarados no IR do sócio"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Árvore natureza → conta → categoria × centro no formato do widget."""
+    nao_modificado = await validar_cache_async(
+        request, response, db, "lancamento", "lancamento_mensal", "natureza", "conta", "categoria", "centro"
+    )
+    if nao_modificado:
+        return nao_modificado
+    try:
+        de, ate = intervalo_periodo(ano, inicio, fim, safra)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Período inválido, use ano, YYYY-MM ou safra AA-AA")
+
+    L, LI = models.Lancamento, models.LancamentoIR
+    if ir_socio is None:
+        # lê do resumo mensal: uma linha por folha × centro × mês × marcação da DRE
+        M = models.LancamentoMensal
+        fonte, data, mes, grupo_mes = M, M.mes, M.mes, M.mes
+    else:
+        # a marcação de IR não está no resumo: soma os lançamentos do sócio
+        fonte, data = L, L.data
+        mes, grupo_mes = func.min(L.data), indice_periodo("mes", L.data)
+    stmt = (
+        select(
+            models.Natureza.code, models.Natureza.nome,
+            models.Conta.id, models.Conta.nome,
+            models.Categoria.id, models.Categoria.nome,
+            models.Centro.nome,
+            mes,
+            func.sum(fonte.valor),
+            func.max(case((fonte.dre == True, 1), else_=0)),
+        )
+        .select_from(fonte)
+        .join(models.Natureza, models.Natureza.code == fonte.natureza_code)
+        .outerjoin(models.Conta, models.Conta.id == fonte.conta_id)
+        .outerjoin(models.Categoria, models.Categoria.id == fonte.categoria_id)
+        .outerjoin(models.Centro, models.Centro.id == fonte.centro_id)
+        .group_by(
+            models.Natureza.code, models.Natureza.nome,
+            models.Conta.id, models.Conta.nome,
+            models.Categoria.id, models.Categoria.nome,
+            models.Centro.nome, grupo_mes,
+        )
+    )
+    # sócios com IR em cada folha do período: (natureza, conta, categoria) → ids
+    marcacoes = (
+        select(L.natureza_code, L.conta_id, L.categoria_id, LI.socio_id)
+        .select_from(LI)
+        .join(L, L.id == LI.lancamento_id)
+        .distinct()
+    )
+    if ir_socio is not None:
+        stmt = stmt.where(L.id.in_(select(LI.lancamento_id).where(LI.socio_id == ir_socio)))
+
+    def no_periodo(consulta, coluna_data, coluna_dre):
+        if de:
+            consulta = consulta.where(coluna_data >= de)
+        if ate:
+            consulta = consulta.where(coluna_data < ate)
+        if dre:
+            consulta = consulta.where(coluna_dre == True)
+        return consulta
+
+    stmt = no_periodo(stmt, data, fonte.dre)
+    marcacoes = no_periodo(marcacoes, L.data, L.dre)
+
+    rows = (await db.execute(stmt)).all()
+    socios_ir = {}
+    for nat_code, conta_id, cat_id, socio_id in await db.execute(marcacoes):
+        socios_ir.setdefault((nat_code, conta_id, cat_id), []).append(socio_id)
+    # a árvore de um período longo é CPU pura: fora do event loop
+    return await run_in_threadpool(montar_demonstrativo, rows, socios_ir)
+
+def montar_demonstrativo(rows, socios_ir: dict) -> list[dict]:
+    """Dobra as linhas (uma por folha × centro × mês) na árvore do widget.
+
+    ``socios_ir`` dá, por (natureza, conta, categoria), os sócios que declaram
+    algum lançamento da folha no período (``flags.ir``).
+    """
+    naturezas = {}
+    for (nat_code, nat_nome, conta_id, conta_nome, cat_id, cat_nome, centro,
+         mes, total, f_dre) in rows:
+        a, m = mes.year, mes.month
+        nat = naturezas.setdefault(nat_code, {"natureza": nat_nome, "contas": {}})
+        conta = nat["contas"].setdefault(conta_id, {"categoria": conta_nome or "(sem conta)", "folhas": {}})
+        folha = conta["folhas"].setdefault(cat_id, {
+            "conta": cat_nome or "(sem categoria)",
+            "ccValues": {},
+            "flags": {"dre": False, "ir": sorted(socios_ir.get((nat_code, conta_id, cat_id), ()))},
+            "periodo": {"safra": set(), "ano": set(), "mes": set()},
+        })
+        cc = centro or "Geral"
+        folha["ccValues"][cc] = folha["ccValues"].get(cc, 0) + total
+        folha["flags"]["dre"] |= bool(f_dre)
+        folha["periodo"]["safra"].add(safra_label(a, m))
+        folha["periodo"]["ano"].add(str(a))
+        folha["periodo"]["mes"].add(f"{a:04d}-{m:02d}")
+
+    ordem = {code: i for i, code in enumerate(ORDEM_NATUREZA)}
+    resultado = []
+    for nat_code in sorted(naturezas, key=lambda c: (ordem.get(c, len(ordem)), c)):
+        nat = naturezas[nat_code]
+        items = []
+        for conta in sorted(nat["contas"].values(), key=lambda c: c["categoria"]):
+            folhas = sorted(conta["folhas"].values(), key=lambda f: f["conta"])
+            for f in folhas:
+                f["periodo"] = {k: sorted(v) for k, v in f["periodo"].items()}
+            items.append({"categoria": conta["categoria"], "items": folhas})
+        resultado.append({"natureza": nat["natureza"], "items": items})
+    return resultado
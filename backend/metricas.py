@@ -0,0 +1,184 @@
+"""Métricas por requisição (latência, status, tamanho, SQL) no formato do Prometheus.
+
+O middleware mede cada requisição HTTP e, pelos eventos do ``engine``, conta
+as consultas SQL e o tempo gasto no banco durante ela (o contador vai num
+``ContextVar``, que o threadpool das rotas síncronas herda). Requisições com
+mais de ``METRICAS_LIMITE_CONSULTAS`` consultas geram um aviso no log — o
+sintoma típico de N+1. ``exportar()`` gera o texto servido em ``/metrics``.
+
+Os valores ficam na memória do processo: com vários workers, cada um
+responde pelos seus.
+"""
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+from .database import async_engine, engine
+
+LIMITE_CONSULTAS = int(os.environ.get("METRICAS_LIMITE_CONSULTAS", "25"))
+logger = logging.getLogger("uvicorn.error")
+
+# limites superiores dos buckets de cada histograma
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+BUCKETS_CONSULTAS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histograma:
+    def __init__(self, nome: str, ajuda: str, buckets: tuple):
+        self.nome, self.ajuda, self.buckets = nome, ajuda, buckets
+        self.series: dict[tuple, list] = {}  # rótulos -> [contagens por bucket..., soma, total]
+
+    def observar(self, rotulos: tuple, valor: float) -> None:
+        serie = self.series.setdefault(rotulos, [0] * (len(self.buckets) + 2))
+        i = bisect_left(self.buckets, valor)
+        if i < len(self.buckets):  # acima do último limite só entra no +Inf (total)
+            serie[i] += 1
+        serie[-2] += valor
+        serie[-1] += 1
+
+    def linhas(self, nomes: tuple) -> list[str]:
+        saida = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} histogram"]
+        for rotulos, serie in sorted(self.series.items()):
+            base = _rotulos(nomes, rotulos)
+            acumulado = 0
+            for limite, qtd in zip(self.buckets, serie):
+                acumulado += qtd
+                saida.append(f'{self.nome}_bucket{{{base},le="{limite}"}} {acumulado}')
+            saida.append(f'{self.nome}_bucket{{{base},le="+Inf"}} {serie[-1]}')
+            saida.append(f"{self.nome}_sum{{{base}}} {serie[-2]:.6f}")
+            saida.append(f"{self.nome}_count{{{base}}} {serie[-1]}")
+        return saida
+
+
+class Contador:
+    def __init__(self, nome: str, ajuda: str):
+        self.nome, self.ajuda = nome, ajuda
+        self.series: dict[tuple, float] = {}
+
+    def somar(self, rotulos: tuple, valor: float = 1) -> None:
+        self.series[rotulos] = self.series.get(rotulos, 0) + valor
+
+    def linhas(self, nomes: tuple) -> list[str]:
+        saida = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} counter"]
+        for rotulos, valor in sorted(self.series.items()):
+            saida.append(f"{self.nome}{{{_rotulos(nomes, rotulos)}}} {valor:g}")
+        return saida
+
+
+def _rotulos(nomes: tuple, valores: tuple) -> str:
+    escapar = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return ",".join(f'{n}="{escapar(v)}"' for n, v in zip(nomes, valores))
+
+
+# (métrica, nomes dos rótulos)
+REQUISICOES = (Contador("http_requests_total", "Requisições por rota e status."), ("method", "route", "status"))
+LATENCIA = (Histograma("http_request_duration_seconds", "Latência das requisições.", BUCKETS_SEGUNDOS),
+            ("method", "route"))
+TAMANHO = (Histograma("http_response_size_bytes", "Tamanho do corpo das respostas.", BUCKETS_BYTES),
+           ("method", "route"))
+CONSULTAS = (Histograma("db_queries_per_request", "Consultas SQL por requisição.", BUCKETS_CONSULTAS),
+             ("method", "route"))
+TEMPO_BANCO = (Contador("db_time_seconds_total", "Tempo gasto no banco pelas requisições."), ("method", "route"))
+METRICAS = (REQUISICOES, LATENCIA, TAMANHO, CONSULTAS, TEMPO_BANCO)
+_lock = threading.Lock()
+
+
+# ---- SQL por requisição ----
+
+class Consultas:
+    __slots__ = ("quantidade", "segundos")
+
+    def __init__(self):
+        self.quantidade = 0
+        self.segundos = 0.0
+
+
+_atual: ContextVar[Optional[Consultas]] = ContextVar("consultas_sql", default=None)
+
+
+def _antes(conn, cursor, statement, parameters, context, executemany):
+    context._metricas_inicio = time.perf_counter()
+
+
+def _depois(conn, cursor, statement, parameters, context, executemany):
+    consultas = _atual.get()
+    if consultas is not None:
+        consultas.quantidade += 1
+        consultas.segundos += time.perf_counter() - context._metricas_inicio
+
+
+# rotas síncronas usam o engine; as async, o sync_engine por baixo do async_engine
+for _engine in (engine, async_engine.sync_engine):
+    event.listen(_engine, "before_cursor_execute", _antes)
+    event.listen(_engine, "after_cursor_execute", _depois)
+
+
+# ---- Middleware ----
+
+class Metricas:
+    """Middleware ASGI: uma observação por requisição HTTP, rotulada pelo template da rota."""
+
+    def __init__(self, app):
+        self.app = app
+        self.rotas: dict = {}
+
+    def rota(self, scope) -> str:
+        # o roteador põe o endpoint no scope; o template ("/api/lancamentos/{lanc_id}")
+        # mantém a cardinalidade baixa, ao contrário do path
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "(sem rota)"
+        if endpoint not in self.rotas:
+            for r in scope["app"].routes:
+                self.rotas.setdefault(getattr(r, "endpoint", getattr(r, "app", None)), r.path)
+        return self.rotas.get(endpoint, "(sem rota)")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        inicio = time.perf_counter()
+        consultas = Consultas()
+        token = _atual.set(consultas)
+        status, tamanho = 500, 0
+
+        async def enviar(message):
+            nonlocal status, tamanho
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                tamanho += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _atual.reset(token)
+            self.registrar(scope, status, tamanho, time.perf_counter() - inicio, consultas)
+
+    def registrar(self, scope, status: int, tamanho: int, segundos: float, consultas: Consultas) -> None:
+        rotulos = (scope["method"], self.rota(scope))
+        with _lock:
+            REQUISICOES[0].somar((*rotulos, status))
+            LATENCIA[0].observar(rotulos, segundos)
+            TAMANHO[0].observar(rotulos, tamanho)
+            CONSULTAS[0].observar(rotulos, consultas.quantidade)
+            TEMPO_BANCO[0].somar(rotulos, consultas.segundos)
+        if consultas.quantidade > LIMITE_CONSULTAS:
+            logger.warning(
+                "%s %s: %d consultas SQL (%.0f ms no banco) — possível N+1",
+                scope["method"], scope["path"], consultas.quantidade, consultas.segundos * 1000,
+            )
+
+
+def exportar() -> str:
+    """Todas as métricas no formato texto do Prometheus (version 0.0.4)."""
+    with _lock:
+        linhas = [linha for metrica, nomes in METRICAS for linha in metrica.linhas(nomes)]
+    return "\n".join(linhas) + "\n"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, Numeric, Date
+from sqlalchemy import Column, Integer, BigInteger, String, ForeignKey, Boolean, Numeric, Date, DateTime, Index, JSON, LargeBinary, func, null
 from sqlalchemy.orm import relationship
 from .database import Base
 
@@ -33,6 +33,15 @@ class Centro(Base):
 
 class Lancamento(Base):
     __tablename__ = "lancamento"
+    # índices pelos caminhos de acesso do extrato, relatórios e paginação (data, id)
+    __table_args__ = (
+        Index("ix_lancamento_data_id", "data", "id"),
+        Index("ix_lancamento_natureza_data", "natureza_code", "data"),
+        Index("ix_lancamento_conta_data", "conta_id", "data"),
+        Index("ix_lancamento_categoria_data", "categoria_id", "data"),
+        Index("ix_lancamento_centro_data", "centro_id", "data"),
+        Index("ix_lancamento_seq_id", "seq", "id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     data = Column(Date, nullable=False)
     natureza_code = Column(String, ForeignKey("natureza.code"), nullable=False)
@@ -43,10 +52,91 @@ class Lancamento(Base):
     descricao = Column(String)
     fornecedor_cliente = Column(String)
     dre = Column(Boolean, default=False)
-    ir_eduardo = Column(Boolean, default=False)
-    ir_roberto = Column(Boolean, default=False)
     valor = Column(Numeric, nullable=False)
     anexo_nome = Column(String, nullable=True)
+    anexo_id = Column(Integer, ForeignKey("anexo.id"), nullable=True)
+    # sequência de alteração (sincronizacao.py): nula até o commit, que a carimba
+    seq = Column(Integer, nullable=True, onupdate=null())
+    # sócios em cuja declaração de IR o lançamento entra
+    ir = relationship("LancamentoIR", cascade="all, delete-orphan", lazy="selectin")
+
+    @property
+    def ir_socios(self) -> list[int]:
+        return sorted(x.socio_id for x in self.ir)
+
+    @ir_socios.setter
+    def ir_socios(self, socio_ids) -> None:
+        novos = set(socio_ids or ())
+        atuais = {x.socio_id for x in self.ir}
+        if novos == atuais:
+            return
+        self.ir = [x for x in self.ir if x.socio_id in novos] + [LancamentoIR(socio_id=s) for s in sorted(novos - atuais)]
+        self.seq = None  # só a marcação mudou: o lançamento ainda conta como alterado
+
+class LancamentoIR(Base):
+    """Marcação de IR: o lançamento entra no relatório do sócio (uma linha por par)."""
+    __tablename__ = "lancamento_ir"
+    lancamento_id = Column(Integer, ForeignKey("lancamento.id", ondelete="CASCADE"), primary_key=True)
+    socio_id = Column(Integer, ForeignKey("socio.id", ondelete="CASCADE"), primary_key=True)
+    __table_args__ = (
+        # relatório de IR: lançamentos de um sócio
+        Index("ix_lancamento_ir_socio", "socio_id", "lancamento_id"),
+    )
+
+class Anexo(Base):
+    """Arquivo anexado, identificado pelo SHA-256 do conteúdo (um por arquivo distinto)."""
+    __tablename__ = "anexo"
+    id = Column(Integer, primary_key=True)
+    sha256 = Column(String(64), unique=True, nullable=False)
+    nome = Column(String, nullable=False)
+    mimetype = Column(String)
+    tamanho = Column(BigInteger, nullable=False)
+    storage_id = Column(String, nullable=False)  # id no Drive (ou na pasta local)
+    url = Column(String, nullable=False)
+    # JPEG pequeno gerado em segundo plano (anexos.py); nulo até ficar pronto ou sem prévia
+    miniatura = Column(LargeBinary, nullable=True)
+    miniatura_falhou = Column(Boolean, nullable=False, default=False)  # imagem que o worker não leu
+    criado_em = Column(DateTime, nullable=False)  # UTC
+
+class LancamentoExcluido(Base):
+    """Lápide de um lançamento excluído, para a sincronização incremental."""
+    __tablename__ = "lancamento_excluido"
+    id = Column(Integer, primary_key=True)
+    lancamento_id = Column(Integer, nullable=False)
+    seq = Column(Integer, nullable=False, index=True)
+
+class LancamentoMensal(Base):
+    """Resumo mensal dos lançamentos, mantido na mesma transação das gravações."""
+    __tablename__ = "lancamento_mensal"
+    id = Column(Integer, primary_key=True)
+    mes = Column(Date, nullable=False)  # primeiro dia do mês
+    natureza_code = Column(String, ForeignKey("natureza.code"), nullable=False)
+    conta_id = Column(Integer, ForeignKey("conta.id"))
+    categoria_id = Column(Integer, ForeignKey("categoria.id"))
+    centro_id = Column(Integer, ForeignKey("centro.id"))
+    dre = Column(Boolean, nullable=False, default=False)
+    valor = Column(Numeric, nullable=False, default=0)
+    quantidade = Column(Integer, nullable=False, default=0)
+    __table_args__ = (
+        Index("ix_lancamento_mensal_categoria_mes", "categoria_id", "mes"),
+    )
+
+# só as linhas ainda sem seq (à espera do carimbo no commit): fica minúsculo
+Index(
+    "ix_lancamento_seq_pendente", Lancamento.id,
+    sqlite_where=Lancamento.seq.is_(None), postgresql_where=Lancamento.seq.is_(None),
+)
+
+# uma linha por chave; COALESCE porque NULLs não colidem em índice único
+Index(
+    "ux_lancamento_mensal_chave",
+    LancamentoMensal.mes, LancamentoMensal.natureza_code,
+    func.coalesce(LancamentoMensal.conta_id, 0),
+    func.coalesce(LancamentoMensal.categoria_id, 0),
+    func.coalesce(LancamentoMensal.centro_id, 0),
+    LancamentoMensal.dre,
+    unique=True,
+)
 
 class Socio(Base):
     __tablename__ = "socio"
@@ -54,4 +144,36 @@ class Socio(Base):
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String(100), unique=True, nullable=False)
     saldo_inicial = Column(Numeric(12, 2), default=0)
-    
\ No newline at end of file
+    # categorias usadas no extrato do sócio
+    categoria_aporte_id = Column(Integer, ForeignKey("categoria.id"), nullable=True)
+    categoria_retirada_id = Column(Integer, ForeignKey("categoria.id"), nullable=True)
+
+class TabelaVersao(Base):
+    """Versão de cada tabela, incrementada a cada commit que a altera (ETag das leituras)."""
+    __tablename__ = "tabela_versao"
+    tabela = Column(String, primary_key=True)
+    versao = Column(Integer, nullable=False, default=1)
+    atualizado_em = Column(DateTime, nullable=False)  # UTC
+
+class Job(Base):
+    """Tarefa em segundo plano (jobs.py): importação, exportação, upload, reconstrução."""
+    __tablename__ = "job"
+    id = Column(String(32), primary_key=True)  # uuid hex: o link do resultado não é adivinhável
+    tipo = Column(String, nullable=False)
+    status = Column(String, nullable=False)  # pendente, executando, concluido, erro
+    parametros = Column(JSON, nullable=False)
+    dono = Column(String, nullable=True)  # jobs.WORKER_ID do processo que tem a tarefa
+    lease_ate = Column(DateTime, nullable=True)  # UTC; vencido, outro processo pode assumir
+    feito = Column(Integer, nullable=True)
+    total = Column(Integer, nullable=True)
+    resultado = Column(JSON, nullable=True)
+    # saída para download (exportações) em jobs.caminho(id, "saida"); o arquivo fica em disco
+    arquivo_nome = Column(String, nullable=True)
+    arquivo_mimetype = Column(String, nullable=True)
+    erro = Column(String, nullable=True)
+    criado_em = Column(DateTime, nullable=False)  # UTC
+    iniciado_em = Column(DateTime, nullable=True)
+    concluido_em = Column(DateTime, nullable=True)
+    __table_args__ = (
+        Index("ix_job_status_criado", "status", "criado_em"),
+    )
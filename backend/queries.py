@@ -0,0 +1,261 @@
+import base64
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import Integer, Select, and_, case, cast, extract, func, or_, select, type_coerce
+
+from . import models, schemas
+
+
+def filtrar_lancamentos(stmt: Select, filtros: schemas.LancamentoFiltro) -> Select:
+    """Aplica os filtros opcionais do extrato a um SELECT sobre Lancamento."""
+    L = models.Lancamento
+    if filtros.start:
+        stmt = stmt.where(L.data >= filtros.start)
+    if filtros.end:
+        stmt = stmt.where(L.data <= filtros.end)
+    if filtros.natureza_code:
+        stmt = stmt.where(L.natureza_code == filtros.natureza_code)
+    if filtros.conta_id is not None:
+        stmt = stmt.where(L.conta_id == filtros.conta_id)
+    if filtros.categoria_id is not None:
+        stmt = stmt.where(L.categoria_id == filtros.categoria_id)
+    if filtros.centro_id is not None:
+        stmt = stmt.where(L.centro_id == filtros.centro_id)
+    if filtros.ir_socio is not None:
+        LI = models.LancamentoIR
+        stmt = stmt.where(L.id.in_(select(LI.lancamento_id).where(LI.socio_id == filtros.ir_socio)))
+    if filtros.q:
+        # mesma busca do extrato no navegador: texto livre + nomes da taxonomia
+        termo = f"%{filtros.q.strip()}%"
+        stmt = stmt.where(or_(
+            L.descricao.ilike(termo),
+            L.fornecedor_cliente.ilike(termo),
+            L.pagamento.ilike(termo),
+            L.conta_id.in_(select(models.Conta.id).where(models.Conta.nome.ilike(termo))),
+            L.categoria_id.in_(select(models.Categoria.id).where(models.Categoria.nome.ilike(termo))),
+            L.centro_id.in_(select(models.Centro.id).where(models.Centro.nome.ilike(termo))),
+        ))
+    return stmt
+
+
+# ---- Paginação por cursor (keyset em data, id) ----
+
+def encode_cursor(data: date, lanc_id: int) -> str:
+    raw = f"{data.isoformat()}:{lanc_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[date, int]:
+    """Lança ValueError se o cursor não for válido."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        data_str, id_str = raw.split(":")
+        return date.fromisoformat(data_str), int(id_str)
+    except Exception as exc:
+        raise ValueError("cursor inválido") from exc
+
+
+def paginar_lancamentos(stmt: Select, cursor: Optional[str], limit: int) -> Select:
+    """Ordena do mais recente para o mais antigo e aplica o cursor.
+
+    Busca ``limit + 1`` linhas: a linha extra só indica que há próxima página.
+    """
+    L = models.Lancamento
+    if cursor:
+        c_data, c_id = decode_cursor(cursor)
+        stmt = stmt.where(or_(L.data < c_data, and_(L.data == c_data, L.id < c_id)))
+    return stmt.order_by(L.data.desc(), L.id.desc()).limit(limit + 1)
+
+
+# ---- Períodos (ano civil, intervalo de meses, safra julho–junho) ----
+
+def primeiro_dia(ano_mes: str) -> date:
+    """Converte 'YYYY-MM' no primeiro dia do mês (ValueError se inválido)."""
+    ano, mes = ano_mes.split("-")
+    return date(int(ano), int(mes), 1)
+
+
+def proximo_mes(d: date) -> date:
+    return date(d.year + 1, 1, 1) if d.month == 12 else date(d.year, d.month + 1, 1)
+
+
+def safra_label(ano: int, mes: int) -> str:
+    """Rótulo da safra (julho–junho) que contém o mês, ex.: '24-25'."""
+    inicio = ano if mes >= 7 else ano - 1
+    return f"{inicio % 100:02d}-{(inicio + 1) % 100:02d}"
+
+
+def intervalo_periodo(
+    ano: Optional[int] = None,
+    inicio: Optional[str] = None,
+    fim: Optional[str] = None,
+    safra: Optional[str] = None,
+) -> tuple[Optional[date], Optional[date]]:
+    """Retorna o intervalo semiaberto [de, ate) do período pedido.
+
+    ``ano`` é o ano civil, ``inicio``/``fim`` são meses YYYY-MM (inclusivos) e
+    ``safra`` segue o rótulo 'AA-AA'. Lança ValueError em formato inválido.
+    """
+    if safra:
+        ini, fim_safra = (int(p) for p in safra.split("-"))
+        if (ini + 1) % 100 != fim_safra % 100:
+            raise ValueError("safra inválida")
+        return date(2000 + ini, 7, 1), date(2001 + ini, 7, 1)
+    if ano:
+        return date(ano, 1, 1), date(ano + 1, 1, 1)
+    de = primeiro_dia(inicio) if inicio else None
+    ate = proximo_mes(primeiro_dia(fim)) if fim else None
+    return de, ate
+
+
+def extrato_socio_stmt(categoria_aporte_id: int, categoria_retirada_id: int, de: date, ate: date) -> Select:
+    """Entradas e saídas do sócio por mês (mês, entradas, saídas) em [de, ate).
+
+    Lê o resumo mensal, então ``de`` e ``ate`` devem ser primeiros dias de mês.
+    """
+    M = models.LancamentoMensal
+    return (
+        select(
+            M.mes,
+            func.sum(case((M.categoria_id == categoria_aporte_id, M.valor), else_=0)),
+            func.sum(case((M.categoria_id == categoria_retirada_id, M.valor), else_=0)),
+        )
+        .where(
+            M.categoria_id.in_([categoria_aporte_id, categoria_retirada_id]),
+            M.mes >= de,
+            M.mes < ate,
+        )
+        .group_by(M.mes)
+        .order_by(M.mes)
+    )
+
+
+# ---- Séries por período (mês, trimestre, safra, ano) ----
+
+GRANULARIDADES = ("mes", "trimestre", "safra", "ano")
+DIMENSOES = {
+    "natureza": (lambda M: M.natureza_code, models.Natureza, models.Natureza.code),
+    "conta": (lambda M: M.conta_id, models.Conta, models.Conta.id),
+    "categoria": (lambda M: M.categoria_id, models.Categoria, models.Categoria.id),
+}
+
+
+def indice_periodo(granularidade: str, mes):
+    """Número sequencial do período que contém ``mes``: períodos vizinhos diferem de 1."""
+    ano = cast(extract("year", mes), Integer)
+    m = cast(extract("month", mes), Integer)
+    if granularidade == "mes":
+        return ano * 12 + m - 1
+    if granularidade == "trimestre":
+        return ano * 4 + (m - 1) // 3
+    if granularidade == "safra":
+        return ano - case((m < 7, 1), else_=0)
+    return ano
+
+
+def periodo_de(granularidade: str, mes: date) -> int:
+    """``indice_periodo`` em Python, para agregar o que já está em memória."""
+    if granularidade == "mes":
+        return mes.year * 12 + mes.month - 1
+    if granularidade == "trimestre":
+        return mes.year * 4 + (mes.month - 1) // 3
+    if granularidade == "safra":
+        return mes.year - (mes.month < 7)
+    return mes.year
+
+
+def inicio_periodo(granularidade: str, indice: int) -> date:
+    """Primeiro dia do período ``indice`` (inverso de ``periodo_de``)."""
+    if granularidade == "mes":
+        ano, m = divmod(indice, 12)
+        return date(ano, m + 1, 1)
+    if granularidade == "trimestre":
+        ano, t = divmod(indice, 4)
+        return date(ano, 3 * t + 1, 1)
+    if granularidade == "safra":
+        return date(indice, 7, 1)
+    return date(indice, 1, 1)
+
+
+def rotulo_periodo(granularidade: str, indice: int) -> str:
+    """'2024-03', '2024-T1', '24-25' ou '2024' a partir de ``indice_periodo``."""
+    if granularidade == "mes":
+        ano, m = divmod(indice, 12)
+        return f"{ano:04d}-{m + 1:02d}"
+    if granularidade == "trimestre":
+        ano, t = divmod(indice, 4)
+        return f"{ano:04d}-T{t + 1}"
+    if granularidade == "safra":
+        return safra_label(indice, 7)
+    return str(indice)
+
+
+def series_stmt(
+    granularidade: str,
+    dimensao: str,
+    de: Optional[date] = None,
+    ate: Optional[date] = None,
+    natureza_code: Optional[str] = None,
+    conta_id: Optional[int] = None,
+) -> Select:
+    """Total por (dimensão, período) com o período anterior e o acumulado, numa consulta.
+
+    Linhas: chave, nome, periodo (índice de ``indice_periodo``), total,
+    anterior e acumulado dentro de [de, ate). ``anterior`` é o total do
+    período imediatamente anterior, mesmo que ele caia antes de ``de`` (a
+    primeira safra filtrada compara com a safra de antes); 0 se esse período
+    não teve lançamentos. Lê o resumo mensal.
+    """
+    M = models.LancamentoMensal
+    coluna, tabela, chave_tabela = DIMENSOES[dimensao]
+    linhas = select(
+        coluna(M).label("chave"), indice_periodo(granularidade, M.mes).label("periodo"), M.valor,
+    )
+    primeiro = None
+    if de:
+        # o período antes do primeiro entra só para o LAG; o SELECT de fora o descarta
+        primeiro = periodo_de(granularidade, de)
+        inicio = inicio_periodo(granularidade, primeiro)
+        linhas = linhas.where(M.mes >= inicio_periodo(granularidade, primeiro - 1))
+        if de > inicio:  # ``de`` no meio do período: o começo dele fica de fora
+            linhas = linhas.where(or_(M.mes < inicio, M.mes >= de))
+    if ate:
+        linhas = linhas.where(M.mes < ate)
+    if natureza_code:
+        linhas = linhas.where(M.natureza_code == natureza_code)
+    if conta_id is not None:
+        linhas = linhas.where(M.conta_id == conta_id)
+    linhas = linhas.subquery()
+
+    totais = (
+        select(linhas.c.chave, linhas.c.periodo, func.sum(linhas.c.valor).label("total"))
+        .group_by(linhas.c.chave, linhas.c.periodo)
+        .subquery()
+    )
+    janela = {"partition_by": totais.c.chave, "order_by": totais.c.periodo}
+    # LAG pega a linha anterior da série; só vale se for o período imediatamente anterior
+    anterior = type_coerce(case(
+        (func.lag(totais.c.periodo).over(**janela) == totais.c.periodo - 1, func.lag(totais.c.total).over(**janela)),
+        else_=0,
+    ), M.valor.type)
+    serie = select(totais.c.chave, totais.c.periodo, totais.c.total, anterior.label("anterior")).subquery()
+
+    # a janela de fora roda depois do WHERE: o acumulado começa em ``de``
+    janela = {"partition_by": serie.c.chave, "order_by": serie.c.periodo}
+    stmt = (
+        select(
+            serie.c.chave,
+            tabela.nome,
+            serie.c.periodo,
+            serie.c.total,
+            serie.c.anterior,
+            func.sum(serie.c.total).over(**janela).label("acumulado"),
+        )
+        .select_from(serie)
+        .outerjoin(tabela, chave_tabela == serie.c.chave)
+        .order_by(serie.c.chave, serie.c.periodo)
+    )
+    if primeiro is not None:
+        stmt = stmt.where(serie.c.periodo >= primeiro)
+    return stmt
@@ -0,0 +1,158 @@
+"""Resumo mensal dos lançamentos (tabela ``lancamento_mensal``).
+
+Cada linha soma ``valor`` e conta os lançamentos de um mês com a mesma
+natureza, conta, categoria, centro e marcação da DRE. As rotas que gravam
+lançamentos acumulam as diferenças num ``Deltas`` e aplicam antes do commit,
+então o resumo anda junto com os dados. A aplicação é um upsert (``INSERT ...
+ON CONFLICT DO UPDATE`` somando no valor gravado): dois lançamentos novos na
+mesma chave, em transações simultâneas, não disputam a mesma inserção. Para
+reconstruir do zero ou conferir contra os lançamentos:
+
+    python -m backend.rollup reconstruir
+    python -m backend.rollup conferir
+"""
+import argparse
+import sys
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import delete, extract, false, func, insert, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from . import models
+
+CAMPOS = ("natureza_code", "conta_id", "categoria_id", "centro_id", "dre")
+FLAGS = ("dre",)
+
+# colunas do índice ux_lancamento_mensal_chave, alvo do ON CONFLICT (o 0 literal, como no índice)
+CHAVE_UNICA = [
+    "mes", "natureza_code",
+    text("coalesce(conta_id, 0)"), text("coalesce(categoria_id, 0)"), text("coalesce(centro_id, 0)"),
+    "dre",
+]
+
+
+def valores(lanc) -> dict:
+    """Campos do lançamento que importam para o resumo (objeto ORM ou mapping)."""
+    get = lanc.get if isinstance(lanc, dict) else lambda c: getattr(lanc, c)
+    return {c: get(c) for c in ("data", "valor") + CAMPOS}
+
+
+def chave(mes: date, campos) -> tuple:
+    return (mes,) + tuple(
+        bool(campos[c]) if c in FLAGS else campos[c] for c in CAMPOS
+    )
+
+
+class Deltas:
+    """Diferenças acumuladas por chave do resumo, aplicadas de uma vez."""
+
+    def __init__(self):
+        self.itens = defaultdict(lambda: [Decimal(0), 0])
+
+    def adicionar(self, lanc, sinal: int = 1) -> None:
+        v = valores(lanc)
+        d = v["data"]
+        item = self.itens[chave(date(d.year, d.month, 1), v)]
+        item[0] += sinal * Decimal(v["valor"])
+        item[1] += sinal
+
+    def trocar(self, antes, depois) -> None:
+        self.adicionar(antes, -1)
+        self.adicionar(depois, +1)
+
+    def aplicar(self, db: Session) -> None:
+        itens = {k: v for k, v in self.itens.items() if v[0] or v[1]}
+        self.itens.clear()
+        if not itens:
+            return
+        M = models.LancamentoMensal
+        linhas = [
+            {"mes": k[0], **dict(zip(CAMPOS, k[1:])), "valor": dv, "quantidade": dq}
+            for k, (dv, dq) in itens.items()
+        ]
+        dialeto = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+        stmt = dialeto.insert(M)
+        # incremento no próprio upsert: transações concorrentes não se sobrescrevem;
+        # render_nulls: chaves com conta/categoria/centro nulos não quebram o lote em vários INSERTs
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=CHAVE_UNICA,
+                set_={"valor": M.valor + stmt.excluded.valor, "quantidade": M.quantidade + stmt.excluded.quantidade},
+            ),
+            linhas,
+            execution_options={"render_nulls": True},
+        )
+        db.execute(delete(M).where(M.mes.in_({k[0] for k in itens}), M.quantidade <= 0))
+
+
+def agregado(db: Session) -> dict:
+    """Resumo calculado direto dos lançamentos: chave → (valor, quantidade)."""
+    L = models.Lancamento
+    ano, mes = extract("year", L.data), extract("month", L.data)
+    flags = [func.coalesce(getattr(L, c), false()) for c in FLAGS]
+    stmt = (
+        select(ano, mes, L.natureza_code, L.conta_id, L.categoria_id, L.centro_id,
+               *flags, func.sum(L.valor), func.count())
+        .group_by(ano, mes, L.natureza_code, L.conta_id, L.categoria_id, L.centro_id, *flags)
+    )
+    resultado = {}
+    for a, m, *campos, total, qtd in db.execute(stmt):
+        k = chave(date(int(a), int(m), 1), dict(zip(CAMPOS, campos)))
+        valor, n = resultado.get(k, (Decimal(0), 0))
+        resultado[k] = (valor + Decimal(total), n + qtd)
+    return resultado
+
+
+def reconstruir(db: Session) -> int:
+    """Apaga e recalcula o resumo inteiro; não faz commit. Retorna o nº de linhas."""
+    db.execute(delete(models.LancamentoMensal))
+    linhas = [
+        {"mes": k[0], **dict(zip(CAMPOS, k[1:])), "valor": valor, "quantidade": qtd}
+        for k, (valor, qtd) in agregado(db).items()
+    ]
+    if linhas:
+        db.execute(insert(models.LancamentoMensal), linhas, execution_options={"render_nulls": True})
+    return len(linhas)
+
+
+def conferir(db: Session) -> list[str]:
+    """Diferenças entre o resumo gravado e o calculado dos lançamentos."""
+    M = models.LancamentoMensal
+    gravado = {}
+    for row in db.execute(select(M.mes, *(getattr(M, c) for c in CAMPOS), M.valor, M.quantidade)):
+        gravado[chave(row.mes, row._mapping)] = (Decimal(row.valor), row.quantidade)
+    esperado = agregado(db)
+    problemas = []
+    for k in sorted(set(gravado) | set(esperado), key=repr):
+        if gravado.get(k) != esperado.get(k):
+            problemas.append(f"{k}: resumo={gravado.get(k)} lançamentos={esperado.get(k)}")
+    return problemas
+
+
+def main(argv=None) -> int:
+    from .database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Resumo mensal dos lançamentos")
+    parser.add_argument("acao", choices=["reconstruir", "conferir"])
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        if args.acao == "reconstruir":
+            n = reconstruir(db)
+            db.commit()
+            print(f"{n} linhas no resumo mensal")
+        problemas = conferir(db)
+    finally:
+        db.close()
+    for p in problemas[:50]:
+        print(p)
+    print(f"{len(problemas)} diferença(s) entre o resumo e os lançamentos")
+    return 1 if problemas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
-from typing import Optional
-from datetime import date
+from pydantic import BaseModel, Field
+from typing import Any, Optional
+from datetime import date, datetime
 from decimal import Decimal
 
 
@@ -68,6 +68,26 @@ class CategoriaOut(CategoriaBase):
         orm_mode = True
 
 
+# -----------------------------
+# Taxonomia (árvore completa)
+# -----------------------------
+class TaxonomiaCategoria(BaseModel):
+    id: int
+    nome: str
+    ativo: bool
+
+class TaxonomiaConta(BaseModel):
+    id: int
+    nome: str
+    ativo: bool
+    categorias: list[TaxonomiaCategoria]
+
+class TaxonomiaNatureza(BaseModel):
+    code: str
+    nome: str
+    contas: list[TaxonomiaConta]
+
+
 # -----------------------------
 # Centro
 # -----------------------------
@@ -105,10 +125,10 @@ class LancamentoBase(BaseModel):
     descricao: Optional[str] = None
     fornecedor_cliente: Optional[str] = None
     dre: bool = False
-    ir_eduardo: bool = False   
-    ir_roberto: bool = False 
+    ir_socios: list[int] = []  # sócios que declaram o lançamento no IR
     valor: Decimal
     anexo_nome: Optional[str] = None
+    anexo_id: Optional[int] = None
 
 
 class LancamentoCreate(LancamentoBase):
@@ -125,17 +145,64 @@ class LancamentoUpdate(BaseModel):
     descricao: Optional[str] = None
     fornecedor_cliente: Optional[str] = None
     dre: Optional[bool] = None
-    ir_eduardo: Optional[bool] = None  
-    ir_roberto: Optional[bool] = None
+    ir_socios: Optional[list[int]] = None
     valor: Optional[Decimal] = None
     anexo_nome: Optional[str] = None
+    anexo_id: Optional[int] = None
 
 class LancamentoOut(LancamentoBase):
     id: int
+    seq: Optional[int] = None
 
     class Config:
         orm_mode = True
 
+
+class LancamentoBatchUpdate(LancamentoUpdate):
+    id: int
+
+
+class LancamentoBatch(BaseModel):
+    create: list[LancamentoCreate] = []
+    update: list[LancamentoBatchUpdate] = []
+    delete: list[int] = []
+
+
+class LancamentoBatchItem(BaseModel):
+    op: str
+    index: int
+    id: Optional[int] = None
+    status: int
+    detail: Optional[str] = None
+
+
+class LancamentoBatchResult(BaseModel):
+    items: list[LancamentoBatchItem]
+
+
+class LancamentoFiltro(BaseModel):
+    start: Optional[date] = None
+    end: Optional[date] = None
+    natureza_code: Optional[str] = None
+    conta_id: Optional[int] = None
+    categoria_id: Optional[int] = None
+    centro_id: Optional[int] = None
+    ir_socio: Optional[int] = None
+    q: Optional[str] = None
+
+
+class LancamentoExpandido(LancamentoOut):
+    # só com expand=names
+    natureza_nome: Optional[str] = None
+    conta_nome: Optional[str] = None
+    categoria_nome: Optional[str] = None
+    centro_nome: Optional[str] = None
+
+
+class LancamentoPage(BaseModel):
+    items: list[LancamentoExpandido]
+    next_cursor: Optional[str] = None
+
 class SocioBase(BaseModel):
     nome: str
 
@@ -145,9 +212,49 @@ class SocioCreate(SocioBase):
 class SocioUpdateSaldo(BaseModel):
     saldo_inicial: Decimal
 
+class SocioUpdateCategorias(BaseModel):
+    categoria_aporte_id: Optional[int] = None
+    categoria_retirada_id: Optional[int] = None
+
 class SocioResponse(SocioBase):
     id: int
     saldo_inicial: Decimal
+    categoria_aporte_id: Optional[int] = None
+    categoria_retirada_id: Optional[int] = None
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+# -----------------------------
+# Tarefas em segundo plano (jobs.py)
+# -----------------------------
+class JobSemParametros(BaseModel):
+    pass
+
+
+class JobImportar(BaseModel):
+    permitir_duplicados: bool = False
+
+
+class JobUpload(BaseModel):
+    nome: str
+    mimetype: Optional[str] = None
+
+
+class JobExportar(LancamentoFiltro):
+    formato: str = Field("csv", pattern="^(csv|xlsx)$")
+
+
+class JobOut(BaseModel):
+    id: str
+    tipo: str
+    status: str  # pendente, executando, concluido, erro
+    parametros: dict
+    feito: Optional[int] = None
+    total: Optional[int] = None
+    resultado: Optional[Any] = None
+    resultado_url: Optional[str] = None
+    erro: Optional[str] = None
+    criado_em: datetime
+    iniciado_em: Optional[datetime] = None
+    concluido_em: Optional[datetime] = None
@@ -0,0 +1,107 @@
+"""Busca textual indexada em descrição e fornecedor/cliente.
+
+Postgres: ``to_tsvector('portuguese', ...)`` e trigramas (``pg_trgm``) sobre o
+texto sem acentos (``f_unaccent``, wrapper IMMUTABLE de ``unaccent`` criado
+na migração), os dois com índice GIN. A consulta casa palavras inteiras pelo
+tsvector e trechos ("raç") pelo ILIKE que o índice de trigramas atende, e
+ordena por ``ts_rank + similarity``.
+
+SQLite: tabela FTS5 ``lancamento_fts`` (external content sobre
+``lancamento``, mantida por triggers) com ``remove_diacritics``; cada termo
+vira busca por prefixo e a ordem é pelo ``bm25``.
+"""
+import re
+
+from sqlalchemy import DDL, Select, event, func, literal_column, or_, select, text
+from sqlalchemy.orm import Session
+
+from . import models
+
+# ---- SQLite: FTS5 ----
+
+# mesmo DDL da migração b7e1c5d93f20
+SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS lancamento_fts USING fts5(
+        descricao, fornecedor_cliente,
+        content='lancamento', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS lancamento_fts_ai AFTER INSERT ON lancamento BEGIN
+        INSERT INTO lancamento_fts(rowid, descricao, fornecedor_cliente)
+        VALUES (new.id, new.descricao, new.fornecedor_cliente);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS lancamento_fts_ad AFTER DELETE ON lancamento BEGIN
+        INSERT INTO lancamento_fts(lancamento_fts, rowid, descricao, fornecedor_cliente)
+        VALUES ('delete', old.id, old.descricao, old.fornecedor_cliente);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS lancamento_fts_au AFTER UPDATE OF descricao, fornecedor_cliente ON lancamento BEGIN
+        INSERT INTO lancamento_fts(lancamento_fts, rowid, descricao, fornecedor_cliente)
+        VALUES ('delete', old.id, old.descricao, old.fornecedor_cliente);
+        INSERT INTO lancamento_fts(rowid, descricao, fornecedor_cliente)
+        VALUES (new.id, new.descricao, new.fornecedor_cliente);
+    END""",
+]
+
+# create_all (testes, bancos novos em SQLite) também cria o índice de busca
+for _sql in SQLITE_DDL:
+    event.listen(models.Lancamento.__table__, "after_create", DDL(_sql).execute_if(dialect="sqlite"))
+
+
+def _expressao_fts(termo: str) -> str:
+    """'ração bovinos' → '"ração"* "bovinos"*' (todos os termos, por prefixo)."""
+    palavras = re.findall(r"\w+", termo)
+    return " ".join(f'"{p}"*' for p in palavras)
+
+
+def _buscar_sqlite(stmt: Select, termo: str) -> Select:
+    L = models.Lancamento
+    expr = _expressao_fts(termo)
+    hits = (
+        select(literal_column("rowid").label("id"), literal_column("bm25(lancamento_fts)").label("rank"))
+        .select_from(text("lancamento_fts"))
+        .where(text("lancamento_fts MATCH :expr").bindparams(expr=expr))
+        .subquery()
+    )
+    return stmt.join(hits, hits.c.id == L.id).order_by(hits.c.rank, L.data.desc(), L.id.desc())
+
+
+# ---- Postgres: tsvector + pg_trgm ----
+
+# as expressões precisam ser idênticas às dos índices da migração (sem parâmetros)
+PG_DOCUMENTO = (
+    "f_unaccent(coalesce(lancamento.descricao, '') || ' ' || coalesce(lancamento.fornecedor_cliente, ''))"
+)
+PG_TSVECTOR = f"to_tsvector('portuguese'::regconfig, {PG_DOCUMENTO})"
+
+
+def _escapar_like(termo: str) -> str:
+    return termo.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _buscar_postgres(stmt: Select, termo: str) -> Select:
+    L = models.Lancamento
+    termo = termo.strip()
+    documento = literal_column(PG_DOCUMENTO)
+    tsvector = literal_column(PG_TSVECTOR)
+    consulta = func.plainto_tsquery(literal_column("'portuguese'::regconfig"), func.f_unaccent(termo))
+    padrao = func.f_unaccent(f"%{_escapar_like(termo)}%")
+    rank = func.ts_rank(tsvector, consulta) + func.similarity(documento, func.f_unaccent(termo))
+    return (
+        stmt.where(or_(tsvector.op("@@")(consulta), documento.ilike(padrao, escape="\\")))
+        .order_by(rank.desc(), L.data.desc(), L.id.desc())
+    )
+
+
+def buscar(db: Session, stmt: Select, termo: str, offset: int, limit: int) -> Select:
+    """Restringe ``stmt`` (SELECT sobre Lancamento) à busca, em ordem de relevância.
+
+    Busca ``limit + 1`` linhas a partir de ``offset``; lança ValueError se o
+    termo não tiver nenhuma palavra.
+    """
+    if not re.search(r"\w", termo):
+        raise ValueError("busca vazia")
+    if db.get_bind().dialect.name == "postgresql":
+        stmt = _buscar_postgres(stmt, termo)
+    else:
+        stmt = _buscar_sqlite(stmt, termo)
+    return stmt.offset(offset).limit(limit + 1)
@@ -1,7 +1,27 @@
+from sqlalchemy import exists, func, select
 from sqlalchemy.orm import Session
 from . import models
 
+CENTROS_PADRAO = ["Geral", "Soja", "Bovinos", "Ovinos"]
+SOCIOS_PADRAO = ["Eduardo Paim", "Roberto Paim"]
+
+def seed_completo(db: Session) -> bool:
+    """Uma consulta só: plano de contas, centros e sócios padrão já existem?"""
+    contar = lambda modelo, nomes: (
+        select(func.count(modelo.nome.distinct())).where(modelo.nome.in_(nomes)).scalar_subquery()
+    )
+    tem_natureza, centros, socios = db.execute(select(
+        exists().where(models.Natureza.code.isnot(None)),
+        contar(models.Centro, CENTROS_PADRAO),
+        contar(models.Socio, SOCIOS_PADRAO),
+    )).one()
+    return bool(tem_natureza) and centros == len(CENTROS_PADRAO) and socios == len(SOCIOS_PADRAO)
+
 def seed_taxonomy(db: Session):
+    # caminho comum no boot: tudo já semeado
+    if seed_completo(db):
+        return
+
     if not db.query(models.Natureza).first():
         taxonomy = [
             {
@@ -92,13 +112,24 @@ def seed_taxonomy(db: Session):
                     db.add(models.Categoria(nome=cat, conta=c))
 
     # centros default
-    for nome_centro in ["Geral", "Soja", "Bovinos", "Ovinos"]:
-        if not db.query(models.Centro).filter_by(nome=nome_centro).first():
+    existentes = set(db.scalars(select(models.Centro.nome).where(models.Centro.nome.in_(CENTROS_PADRAO))))
+    for nome_centro in CENTROS_PADRAO:
+        if nome_centro not in existentes:
             db.add(models.Centro(nome=nome_centro, area=0))
 
-    # sócios default
-    for nome in ["Eduardo Paim", "Roberto Paim"]:
-        if not db.query(models.Socio).filter_by(nome=nome).first():
-            db.add(models.Socio(nome=nome, saldo_inicial=0))
+    # sócios default, já mapeados às categorias de aporte/retirada
+    existentes = set(db.scalars(select(models.Socio.nome).where(models.Socio.nome.in_(SOCIOS_PADRAO))))
+    for nome in SOCIOS_PADRAO:
+        if nome not in existentes:
+            db.add(models.Socio(nome=nome, saldo_inicial=0, **categorias_socio(db, nome)))
 
     db.commit()
+
+def categorias_socio(db: Session, nome: str) -> dict:
+    """Localiza as categorias "APORTE <NOME>" e "RETIRADAS <NOME>" do plano padrão."""
+    db.flush()
+    ids = {}
+    for campo, prefixo in [("categoria_aporte_id", "APORTE"), ("categoria_retirada_id", "RETIRADAS")]:
+        cat = db.query(models.Categoria).filter(models.Categoria.nome == f"{prefixo} {nome.upper()}").first()
+        ids[campo] = cat.id if cat else None
+    return ids
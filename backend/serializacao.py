@@ -0,0 +1,124 @@
+"""Serialização rápida das listas grandes de lançamentos.
+
+As rotas pesadas selecionam só as colunas (tuplas, sem hidratar objetos do
+ORM nem validar cada linha no Pydantic) e geram o JSON com ``orjson``. A
+saída é a mesma de ``schemas.LancamentoOut``: datas ISO e ``valor`` como
+string decimal. Com ``expand=names`` os nomes de natureza, conta, categoria e
+centro vêm no mesmo SELECT, por LEFT JOIN (``schemas.LancamentoExpandido``).
+"""
+from decimal import Decimal
+from typing import Iterable, Optional
+
+import orjson
+from fastapi import Response
+from fastapi.encoders import decimal_encoder
+from sqlalchemy import Select, String, cast, false, func, select
+
+from . import models
+
+# mesma ordem dos campos de schemas.LancamentoOut
+CAMPOS_LANCAMENTO = (
+    "data", "natureza_code", "conta_id", "categoria_id", "centro_id", "pagamento",
+    "descricao", "fornecedor_cliente", "dre", "ir_socios", "valor",
+    "anexo_nome", "anexo_id", "id", "seq",
+)
+
+# expand=names: colunas a mais, depois de CAMPOS_LANCAMENTO, e as tabelas de onde vêm
+CAMPOS_NOMES = ("natureza_nome", "conta_nome", "categoria_nome", "centro_nome")
+TABELAS_NOMES = ("natureza", "conta", "categoria", "centro")
+
+
+def select_lancamentos(nomes: bool = False) -> Select:
+    """SELECT das colunas de CAMPOS_LANCAMENTO, no lugar de select(Lancamento).
+
+    Com ``nomes``, junta as colunas de CAMPOS_NOMES.
+    """
+    L = models.Lancamento
+    colunas = []
+    LI = models.LancamentoIR
+    for c in CAMPOS_LANCAMENTO:
+        if c == "ir_socios":
+            # ids dos sócios numa string "3,7" (string_agg/group_concat), lida em _item
+            coluna = (
+                select(func.aggregate_strings(cast(LI.socio_id, String), ","))
+                .where(LI.lancamento_id == L.id)
+                .scalar_subquery().label(c)
+            )
+        elif c == "dre":
+            coluna = func.coalesce(L.dre, false()).label(c)  # bool no schema, nunca null
+        else:
+            coluna = getattr(L, c)
+        colunas.append(coluna)
+    if not nomes:
+        return select(*colunas)
+    N, C, K, X = models.Natureza, models.Conta, models.Categoria, models.Centro
+    return (
+        select(*colunas, N.nome.label("natureza_nome"), C.nome.label("conta_nome"),
+               K.nome.label("categoria_nome"), X.nome.label("centro_nome"))
+        .select_from(L)
+        .outerjoin(N, N.code == L.natureza_code)
+        .outerjoin(C, C.id == L.conta_id)
+        .outerjoin(K, K.id == L.categoria_id)
+        .outerjoin(X, X.id == L.centro_id)
+    )
+
+
+def _default(obj):
+    if isinstance(obj, Decimal):
+        return str(obj)
+    raise TypeError
+
+
+def _campos(nomes: bool) -> tuple:
+    return CAMPOS_LANCAMENTO + CAMPOS_NOMES if nomes else CAMPOS_LANCAMENTO
+
+
+def _item(row: tuple, campos: tuple = CAMPOS_LANCAMENTO) -> dict:
+    item = dict(zip(campos, row))
+    ir = item["ir_socios"]
+    item["ir_socios"] = sorted(int(s) for s in ir.split(",")) if ir else []
+    return item
+
+
+def lista_json(rows: Iterable[tuple], headers: Optional[dict] = None, nomes: bool = False) -> Response:
+    """Lista simples de lançamentos (o formato antigo de ``GET /api/lancamentos``)."""
+    campos = _campos(nomes)
+    corpo = orjson.dumps([_item(row, campos) for row in rows], default=_default)
+    return Response(content=corpo, media_type="application/json", headers=headers)
+
+
+def pagina_json(rows: Iterable[tuple], next_cursor: Optional[str], headers: Optional[dict] = None,
+                nomes: bool = False) -> Response:
+    """Resposta no formato de schemas.LancamentoPage a partir das tuplas."""
+    campos = _campos(nomes)
+    items = [_item(row, campos) for row in rows]
+    corpo = orjson.dumps({"items": items, "next_cursor": next_cursor}, default=_default)
+    return Response(content=corpo, media_type="application/json", headers=headers)
+
+
+def alteracoes_json(rows: Iterable[tuple], excluidos: Iterable[tuple], seq: int, after: Optional[int],
+                    mais: bool, versao_nomes: Optional[str] = None) -> Response:
+    """Resposta de ``/api/lancamentos/changes``: alterados, lápides (id, seq) e o cursor seguinte.
+
+    Com ``versao_nomes`` (expand=names), os itens trazem os nomes e a resposta
+    leva a versão da taxonomia em ``nomes``: se ela mudar, os nomes guardados
+    pelo cliente estão velhos.
+    """
+    campos = _campos(versao_nomes is not None)
+    conteudo = {
+        "items": [_item(row, campos) for row in rows],
+        "deleted": [{"id": lanc_id, "seq": s} for lanc_id, s in excluidos],
+        "seq": seq,
+        "after": after,
+        "more": mais,
+    }
+    if versao_nomes is not None:
+        conteudo["nomes"] = versao_nomes
+    corpo = orjson.dumps(conteudo, default=_default)
+    return Response(content=corpo, media_type="application/json")
+
+
+def json_resposta(conteudo, headers: Optional[dict] = None) -> Response:
+    """JSON de uma rota sem response_model, igual ao do jsonable_encoder (Decimal → int/float)."""
+    return Response(content=orjson.dumps(conteudo, default=decimal_encoder), media_type="application/json",
+                    headers=headers)
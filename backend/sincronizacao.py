@@ -0,0 +1,69 @@
+"""Sequência de alteração dos lançamentos, para a sincronização incremental do PWA.
+
+Todo lançamento inserido ou alterado fica com ``seq`` nulo (default e
+``onupdate`` da coluna) e toda exclusão é anotada na sessão. No commit, logo
+depois de ``versoes`` incrementar a versão de ``lancamento`` em
+``tabela_versao``, as linhas com ``seq`` nulo recebem essa versão e as
+exclusões viram lápides em ``lancamento_excluido`` com a mesma ``seq``.
+
+O UPDATE em ``tabela_versao`` trava a linha de ``lancamento`` até o commit,
+então as transações que gravam lançamentos carimbam e confirmam em fila: uma
+``seq`` visível nunca é ultrapassada por um commit mais antigo, e
+``GET /api/lancamentos/changes?since=<seq>`` não perde alterações.
+"""
+from sqlalchemy import Integer, bindparam, event, exists, insert, select, update
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import SessionLocal
+
+_CHAVE = "lancamentos_excluidos"
+
+
+def _excluidos(session: Session) -> set:
+    return session.info.setdefault(_CHAVE, set())
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _registrar_flush(session, flush_context):
+    for obj in session.deleted:
+        if isinstance(obj, models.Lancamento):
+            _excluidos(session).add(obj.id)
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _registrar_execute(state):
+    # DELETE em massa (lote): lê antes os ids que ele vai apagar
+    if state.is_delete and getattr(state.statement.table, "name", None) == models.Lancamento.__tablename__:
+        L = models.Lancamento
+        stmt = select(L.id)
+        if state.statement.whereclause is not None:
+            stmt = stmt.where(state.statement.whereclause)
+        _excluidos(state.session).update(state.session.scalars(stmt))
+
+
+@event.listens_for(SessionLocal, "after_soft_rollback")
+def _descartar(session, previous_transaction):
+    session.info.pop(_CHAVE, None)
+
+
+def carimbar(session: Session) -> None:
+    """Dá a versão atual de ``lancamento`` às linhas pendentes e grava as lápides.
+
+    Chamado por ``versoes`` no before_commit, com a versão já incrementada.
+    Vai pela conexão, fora dos eventos do ORM, para não marcar a tabela de novo.
+    """
+    L, V, X = models.Lancamento, models.TabelaVersao, models.LancamentoExcluido
+    conn = session.connection()
+    seq = select(V.versao).where(V.tabela == L.__tablename__).scalar_subquery()
+    conn.execute(update(L).where(L.seq.is_(None)).values(seq=seq))
+    excluidos = session.info.pop(_CHAVE, set())
+    if excluidos:
+        # id reaproveitado na mesma transação (SQLite): a linha nova já substitui a antiga no cliente
+        lanc_id = bindparam("lancamento_id", type_=Integer)
+        conn.execute(
+            insert(X).from_select(
+                ["lancamento_id", "seq"], select(lanc_id, seq).where(~exists().where(L.id == lanc_id))
+            ),
+            [{"lancamento_id": i} for i in sorted(excluidos)],
+        )
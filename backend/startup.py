@@ -0,0 +1,47 @@
+"""Tempo das fases de inicialização (import, conexão, seed, primeira resposta).
+
+Importado antes de tudo em ``main.py``; o relatório sai no log do uvicorn,
+útil para acompanhar o cold start das máquinas que o fly.io desliga.
+"""
+import logging
+import time
+from contextlib import contextmanager
+
+INICIO = time.perf_counter()
+fases: dict[str, float] = {}
+logger = logging.getLogger("uvicorn.error")
+
+
+def registrar(nome: str, segundos: float) -> None:
+    fases[nome] = segundos
+    logger.info("startup: %s em %.0f ms", nome, segundos * 1000)
+
+
+@contextmanager
+def fase(nome: str):
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        registrar(nome, time.perf_counter() - t)
+
+
+def desde_inicio(nome: str) -> None:
+    registrar(nome, time.perf_counter() - INICIO)
+
+
+class PrimeiraResposta:
+    """Middleware ASGI que registra o tempo até a primeira resposta e sai do caminho."""
+
+    def __init__(self, app):
+        self.app = app
+        self.pendente = True
+
+    async def __call__(self, scope, receive, send):
+        if not self.pendente or scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        self.pendente = False
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            desde_inicio("primeira resposta")
@@ -0,0 +1,121 @@
+"""Armazenamento dos anexos: Google Drive ou uma pasta local.
+
+O envio roda num pool de threads limitado (``UPLOAD_WORKERS``), fora do event
+loop, e lê o arquivo direto do ``UploadFile`` (que o Starlette já mantém em
+disco acima de 1 MB) em pedaços, sem carregar tudo na memória. No Drive o
+upload é resumable em pedaços de ``UPLOAD_CHUNK_MB``.
+
+Configuração por ambiente:
+
+    STORAGE_BACKEND   drive (padrão) ou local
+    DRIVE_FOLDER_ID   pasta do Drive onde os anexos são criados
+    LOCAL_STORAGE_DIR pasta usada pelo backend local (padrão: anexos)
+"""
+import asyncio
+import os
+import pathlib
+import shutil
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Optional
+
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "drive")
+DRIVE_FOLDER_ID = os.environ.get("DRIVE_FOLDER_ID")
+LOCAL_STORAGE_DIR = os.environ.get("LOCAL_STORAGE_DIR", "anexos")
+UPLOAD_WORKERS = int(os.environ.get("UPLOAD_WORKERS", "2"))
+# o Drive exige pedaços múltiplos de 256 KB
+UPLOAD_CHUNK = int(os.environ.get("UPLOAD_CHUNK_MB", "1")) * 1024 * 1024
+
+_pool = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="upload")
+
+
+class DriveStorage:
+    """Upload resumable para o Drive com um único cliente da API."""
+
+    def __init__(self, credentials, pasta_id: Optional[str] = DRIVE_FOLDER_ID):
+        from googleapiclient.discovery import build
+
+        self.credentials = credentials
+        self.pasta_id = pasta_id
+        self.service = build("drive", "v3", credentials=credentials, cache_discovery=False)
+        self._local = threading.local()
+
+    def _http(self):
+        # httplib2 não é thread-safe: um transporte autorizado por thread do pool
+        if not hasattr(self._local, "http"):
+            import google_auth_httplib2
+            import httplib2
+
+            self._local.http = google_auth_httplib2.AuthorizedHttp(self.credentials, http=httplib2.Http())
+        return self._local.http
+
+    def salvar(self, arquivo: BinaryIO, nome: str, mimetype: Optional[str]) -> dict:
+        from googleapiclient.http import MediaIoBaseUpload
+
+        media = MediaIoBaseUpload(
+            arquivo, mimetype=mimetype or "application/octet-stream",
+            chunksize=UPLOAD_CHUNK, resumable=True,
+        )
+        metadata = {"name": nome}
+        if self.pasta_id:
+            metadata["parents"] = [self.pasta_id]
+        request = self.service.files().create(body=metadata, media_body=media, fields="id, name, webViewLink")
+        resposta = None
+        while resposta is None:
+            _, resposta = request.next_chunk(http=self._http(), num_retries=3)
+        return {"id": resposta["id"], "name": resposta["name"], "url": resposta["webViewLink"]}
+
+
+class LocalStorage:
+    """Grava os anexos numa pasta local (testes e medições de throughput)."""
+
+    def __init__(self, pasta: str = LOCAL_STORAGE_DIR):
+        self.pasta = pathlib.Path(pasta).resolve()
+        self.pasta.mkdir(parents=True, exist_ok=True)
+
+    def salvar(self, arquivo: BinaryIO, nome: str, mimetype: Optional[str]) -> dict:
+        arquivo_id = uuid.uuid4().hex
+        destino = self.pasta / f"{arquivo_id}_{pathlib.Path(nome or 'anexo').name}"
+        with open(destino, "wb") as saida:
+            shutil.copyfileobj(arquivo, saida, UPLOAD_CHUNK)
+        return {"id": arquivo_id, "name": nome, "url": destino.as_uri()}
+
+
+_drive: Optional[DriveStorage] = None
+_local: Optional[LocalStorage] = None
+_lock = threading.Lock()
+
+
+def precisa_credenciais() -> bool:
+    return STORAGE_BACKEND != "local"
+
+
+def obter(credentials=None):
+    """Backend configurado; o do Drive é recriado só quando as credenciais mudam."""
+    global _drive, _local
+    with _lock:
+        if STORAGE_BACKEND == "local":
+            if _local is None:
+                _local = LocalStorage()
+            return _local
+        if _drive is None or _drive.credentials is not credentials:
+            _drive = DriveStorage(credentials)
+        return _drive
+
+
+def salvar(credentials, arquivo: BinaryIO, nome: str, mimetype: Optional[str]) -> dict:
+    """Envia o arquivo ao backend configurado (bloqueante: chamar dentro do pool)."""
+    arquivo.seek(0)
+    return obter(credentials).salvar(arquivo, nome, mimetype)
+
+
+async def no_pool(funcao, *args):
+    """Roda ``funcao`` no pool de upload, sem bloquear o event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_pool, funcao, *args)
+
+
+async def enviar(credentials, arquivo: BinaryIO, nome: str, mimetype: Optional[str]) -> dict:
+    """Salva o arquivo no pool de upload, sem bloquear o event loop."""
+    return await no_pool(salvar, credentials, arquivo, nome, mimetype)
@@ -0,0 +1,127 @@
+"""Versão por tabela (``tabela_versao``) e validadores HTTP das leituras.
+
+Cada commit que insere, altera ou exclui linhas incrementa, na mesma
+transação, a versão das tabelas tocadas: as gravações pelo ORM são vistas no
+flush e as em massa (``insert()``/``update()``/``delete()`` via
+``Session.execute``) no ``do_orm_execute``. As rotas de leitura (async) montam
+o ETag e o Last-Modified a partir dessas versões com ``validar_cache_async`` e
+respondem 304 quando o cliente já tem a versão atual, sem consultar os dados.
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from . import models, sincronizacao
+from .database import SessionLocal
+
+TABELA = models.TabelaVersao.__tablename__
+_CHAVE = "tabelas_alteradas"
+
+
+def _alteradas(session: Session) -> set:
+    return session.info.setdefault(_CHAVE, set())
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _registrar_flush(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        tabela = getattr(obj, "__tablename__", None)
+        if tabela and tabela != TABELA:
+            _alteradas(session).add(tabela)
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _registrar_execute(state):
+    if state.is_insert or state.is_update or state.is_delete:
+        tabela = getattr(state.statement.table, "name", None)
+        if tabela and tabela != TABELA:
+            _alteradas(state.session).add(tabela)
+
+
+@event.listens_for(SessionLocal, "before_commit")
+def _incrementar(session):
+    session.flush()
+    tabelas = session.info.pop(_CHAVE, set())
+    if tabelas:
+        incrementar(session, tabelas)
+    if models.Lancamento.__tablename__ in tabelas:
+        sincronizacao.carimbar(session)
+
+
+@event.listens_for(SessionLocal, "after_soft_rollback")
+def _descartar(session, previous_transaction):
+    session.info.pop(_CHAVE, None)
+
+
+def incrementar(db: Session, tabelas) -> None:
+    """Incrementa a versão das tabelas (cria a linha na primeira vez)."""
+    V = models.TabelaVersao
+    agora = datetime.now(timezone.utc).replace(tzinfo=None)
+    tabelas = sorted(tabelas)
+    db.execute(
+        update(V).where(V.tabela.in_(tabelas))
+        .values(versao=V.versao + 1, atualizado_em=agora)
+        .execution_options(synchronize_session=False)
+    )
+    existentes = set(db.scalars(select(V.tabela).where(V.tabela.in_(tabelas))))
+    novas = [{"tabela": t, "versao": 1, "atualizado_em": agora} for t in tabelas if t not in existentes]
+    if novas:
+        db.execute(insert(V), novas)
+
+
+def _select_versoes(tabelas):
+    V = models.TabelaVersao
+    return select(V.tabela, V.versao, V.atualizado_em).where(V.tabela.in_(tabelas))
+
+
+def _chave(resultado, tabelas) -> tuple[str, Optional[datetime]]:
+    linhas = {t: (v, em) for t, v, em in resultado}
+    chave = ",".join(f"{t}:{linhas.get(t, (0, None))[0]}" for t in tabelas)
+    datas = [em for _, em in linhas.values() if em is not None]
+    return chave, max(datas) if datas else None
+
+
+async def versoes_async(db: AsyncSession, tabelas) -> tuple[str, Optional[datetime]]:
+    """('natureza:3,centro:7', maior atualizado_em) das tabelas pedidas."""
+    return _chave(await db.execute(_select_versoes(tabelas)), tabelas)
+
+
+async def validar_cache_async(
+    request: Request, response: Response, db: AsyncSession, *tabelas: str, extra: str = ""
+) -> Optional[Response]:
+    """Põe ETag/Last-Modified em ``response``; devolve um 304 se o cliente já está atualizado.
+
+    O ETag também depende da query string, então cada combinação de filtros
+    (e cada página) tem o seu; ``extra`` cobre o que não está na URL (ex.: o
+    mês corrente usado como padrão).
+    """
+    return _validar(request, response, *await versoes_async(db, tabelas), extra)
+
+
+def _validar(request: Request, response: Response, chave: str, modificado, extra: str) -> Optional[Response]:
+    digest = hashlib.sha1(f"{chave}?{request.url.query}#{extra}".encode()).hexdigest()[:20]
+    etag = f'W/"{digest}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if modificado is not None:
+        modificado = modificado.replace(tzinfo=timezone.utc, microsecond=0)
+        headers["Last-Modified"] = format_datetime(modificado, usegmt=True)
+    response.headers.update(headers)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+        atual = "*" in tags or etag.removeprefix("W/") in tags
+    elif request.headers.get("if-modified-since") and modificado is not None:
+        try:
+            atual = modificado <= parsedate_to_datetime(request.headers["if-modified-since"])
+        except (TypeError, ValueError):
+            atual = False
+    else:
+        atual = False
+    return Response(status_code=304, headers=headers) if atual else None
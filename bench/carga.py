@@ -0,0 +1,170 @@
+"""Teste de carga das rotas de leitura sob concorrência, num uvicorn de verdade.
+
+Sobe o app (um worker) sobre o razão sintético do benchmark e dispara
+requisições concorrentes com ``httpx`` em níveis crescentes de concorrência,
+medindo vazão e latência p50/p95. Com ``--comparar REF`` a mesma carga roda
+também no código de outra revisão (num ``git worktree`` temporário) — por
+exemplo a anterior às rotas async, para ver o ganho sobre o ``get_db``. Com
+``--por-rota`` cada rota da mistura é medida sozinha, para ver quais ganham:
+
+    python -m bench.carga --linhas 100000 --comparar <revisão>
+    python -m bench.carga --pg postgresql+psycopg://localhost/bench_sinuelo --por-rota
+"""
+import argparse
+import asyncio
+import os
+import pathlib
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from bench.runner import DADOS, RAIZ
+
+REPO = RAIZ.parent
+
+
+def _preparar(url: str, linhas: int, semente: int) -> None:
+    cmd = [sys.executable, "-m", "bench.runner", "--preparar", url, "--linhas", str(linhas), "--semente", str(semente)]
+    subprocess.run(cmd, cwd=REPO, check=True, stdout=subprocess.DEVNULL)
+
+
+class Servidor:
+    """uvicorn num subprocesso, com o código de ``fonte`` e o banco ``url``."""
+
+    def __init__(self, fonte: pathlib.Path, url: str, porta: int):
+        self.fonte, self.url, self.porta = fonte, url, porta
+        self.base = f"http://127.0.0.1:{porta}"
+
+    def __enter__(self):
+        env = {**os.environ, "DATABASE_URL": self.url, "STORAGE_BACKEND": "local"}
+        self.processo = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(self.porta), "--log-level", "warning"],
+            cwd=self.fonte, env=env,
+        )
+        limite = time.monotonic() + 60
+        while time.monotonic() < limite:
+            try:
+                if httpx.get(self.base + "/api/centros").status_code == 200:
+                    return self
+            except httpx.TransportError:
+                pass
+            if self.processo.poll() is not None:
+                raise RuntimeError(f"uvicorn saiu com código {self.processo.returncode}")
+            time.sleep(0.2)
+        raise RuntimeError("uvicorn não respondeu em 60 s")
+
+    def __exit__(self, *exc):
+        self.processo.terminate()
+        self.processo.wait(10)
+
+
+def _rotas(base: str) -> list[str]:
+    """Mistura de leituras quentes, com ids/datas tirados do próprio banco."""
+    socio = httpx.get(base + "/api/socios/").json()[0]["id"]
+    ultima = httpx.get(base + "/api/lancamentos", params={"limit": 1}).json()["items"][0]["data"]
+    ano, mes = ultima[:4], ultima[:7]
+    return [
+        "/api/lancamentos?limit=200",
+        f"/api/lancamentos?start={mes}-01&end={mes}-28&limit=200",
+        f"/api/lancamentos?start={ano}-01-01&end={ano}-12-31&natureza_code=RO&limit=200",
+        f"/api/kpis?inicio={ano}-01&fim={ano}-12",
+        f"/api/socios/{socio}/extrato",
+        "/api/socios/",
+        "/api/centros",
+        "/api/naturezas",
+        f"/api/demonstrativo?inicio={mes}&fim={mes}",
+    ]
+
+
+async def _nivel(base: str, rotas: list[str], concorrencia: int, segundos: float) -> dict:
+    tempos, erros = [], 0
+    fim = time.perf_counter() + segundos
+    limites = httpx.Limits(max_connections=concorrencia, max_keepalive_connections=concorrencia)
+
+    async def cliente(n: int, http: httpx.AsyncClient):
+        nonlocal erros
+        i = n
+        while time.perf_counter() < fim:
+            inicio = time.perf_counter()
+            try:
+                r = await http.get(rotas[i % len(rotas)])
+                if r.status_code != 200:
+                    erros += 1
+            except httpx.HTTPError:
+                erros += 1
+            tempos.append(time.perf_counter() - inicio)
+            i += 1
+
+    inicio = time.perf_counter()
+    async with httpx.AsyncClient(base_url=base, limits=limites, timeout=60) as http:
+        await asyncio.gather(*(cliente(n, http) for n in range(concorrencia)))
+    duracao = time.perf_counter() - inicio
+    tempos.sort()
+    return {
+        "req_s": len(tempos) / duracao,
+        "p50_ms": statistics.median(tempos) * 1000,
+        "p95_ms": tempos[int(0.95 * (len(tempos) - 1))] * 1000,
+        "erros": erros,
+    }
+
+
+def medir(fonte: pathlib.Path, url: str, args) -> dict:
+    """Carga → nível de concorrência → medidas; a carga é a mistura ou, com --por-rota, cada rota."""
+    with Servidor(fonte, url, args.porta) as servidor:
+        rotas = _rotas(servidor.base)
+        asyncio.run(_nivel(servidor.base, rotas, 4, 1))  # aquecimento
+        cargas = {r: [r] for r in rotas} if args.por_rota else {"mistura": rotas}
+        return {
+            nome: {c: asyncio.run(_nivel(servidor.base, carga, c, args.segundos)) for c in args.concorrencia}
+            for nome, carga in cargas.items()
+        }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--linhas", type=int, default=100000)
+    parser.add_argument("--pg", help="URL de um Postgres só para o benchmark (as tabelas são recriadas)")
+    parser.add_argument("--concorrencia", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--segundos", type=float, default=5.0, help="duração de cada nível")
+    parser.add_argument("--comparar", metavar="REF", help="revisão do git para rodar a mesma carga e comparar")
+    parser.add_argument("--por-rota", action="store_true", help="mede cada rota da mistura separadamente")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    DADOS.mkdir(exist_ok=True)
+    url = args.pg or f"sqlite:///{DADOS / f'razao_{args.linhas}_{args.semente}.db'}"
+    _preparar(url, args.linhas, args.semente)
+
+    resultados = {"atual": medir(REPO, url, args)}
+    if args.comparar:
+        with tempfile.TemporaryDirectory() as tmp:
+            arvore = pathlib.Path(tmp) / "ref"
+            subprocess.run(["git", "worktree", "add", "--detach", str(arvore), args.comparar], cwd=REPO, check=True,
+                           stdout=subprocess.DEVNULL)
+            try:
+                resultados[args.comparar] = medir(arvore, url, args)
+            finally:
+                subprocess.run(["git", "worktree", "remove", "--force", str(arvore)], cwd=REPO, check=True)
+
+    print(f"\n{args.linhas} lançamentos, {'postgres' if args.pg else 'sqlite'}, {args.segundos:g}s por nível")
+    print(f"{'código':>12} {'conc.':>6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'erros':>6}  carga")
+    for nome, cargas in resultados.items():
+        for carga, niveis in cargas.items():
+            for c, r in niveis.items():
+                print(f"{nome[:12]:>12} {c:6} {r['req_s']:9.1f} {r['p50_ms']:9.1f} {r['p95_ms']:9.1f} {r['erros']:6}  {carga}")
+    if args.comparar:
+        print("\nganho de vazão (atual / " + args.comparar + "):")
+        for carga, niveis in resultados["atual"].items():
+            ref = resultados[args.comparar][carga]
+            ganhos = "  ".join(f"{c}: {niveis[c]['req_s'] / ref[c]['req_s']:.2f}x" for c in args.concorrencia)
+            print(f"  {ganhos}  {carga}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""Gerador de razões sintéticos sobre o plano de contas real de ``seed.py``.
+
+Os lançamentos se espalham por todas as naturezas, contas, categorias e
+centros ao longo de vários anos, com pesos próximos aos de uma fazenda:
+muito mais despesa operacional que receita, receitas de grãos concentradas
+na colheita, salários todo mês e aportes/retiradas nas categorias mapeadas
+dos sócios. É determinístico para a mesma semente.
+
+    DATABASE_URL=sqlite:///ledger.db python -m bench.gerador --linhas 100000
+"""
+import argparse
+import random
+from datetime import date, timedelta
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from backend import models, rollup
+
+# participação de cada natureza no total de lançamentos
+PESO_NATUREZA = {"DO": 0.72, "RO": 0.12, "DNO": 0.11, "RNO": 0.05}
+# fatia das não operacionais que é aporte/retirada de sócio
+FRACAO_SOCIOS = 0.35
+# valor mediano (R$) e dispersão do log-normal por natureza
+VALOR_NATUREZA = {"DO": (900, 1.1), "RO": (18000, 1.0), "DNO": (6000, 1.2), "RNO": (12000, 1.0)}
+# meses de colheita/venda das contas de receita sazonais
+SAZONAIS = {"AGRICULTURA": (3, 4, 5), "PECUÁRIA": (4, 5, 6, 10, 11)}
+MENSAIS = {"MÃO DE OBRA"}
+PESO_CENTRO = {"Geral": 4, "Soja": 3, "Bovinos": 3, "Ovinos": 1}
+PAGAMENTOS = ["PIX", "Boleto", "Transferência", "Cartão", "Dinheiro", "Cheque"]
+FORNECEDORES = [
+    f"{tipo} {nome}"
+    for tipo in ("Agropecuária", "Cooperativa", "Comercial", "Transportes", "Veterinária", "Posto")
+    for nome in ("Santa Rita", "Pampa", "Coxilha", "São Gabriel", "Três Irmãos", "Alegrete", "Ibirapuitã")
+]
+LOTE = 5000
+
+
+def _taxonomia(db: Session) -> dict:
+    """{natureza: [(conta_id, conta_nome, [categoria_id, ...]), ...]} sem as categorias de sócio."""
+    socios = set()
+    for aporte, retirada in db.execute(select(models.Socio.categoria_aporte_id, models.Socio.categoria_retirada_id)):
+        socios.update(c for c in (aporte, retirada) if c)
+    cats = {}
+    for cat_id, conta_id in db.execute(select(models.Categoria.id, models.Categoria.conta_id)):
+        if cat_id not in socios:
+            cats.setdefault(conta_id, []).append(cat_id)
+    taxonomia = {}
+    for conta_id, nome, nat in db.execute(select(models.Conta.id, models.Conta.nome, models.Conta.natureza_code)):
+        taxonomia.setdefault(nat, []).append((conta_id, nome, cats.get(conta_id) or [None]))
+    return taxonomia
+
+
+def _categorias_socios(db: Session) -> dict:
+    """{"RNO": [(conta_id, aporte_id), ...], "DNO": [(conta_id, retirada_id), ...]}"""
+    conta_de = dict(db.execute(select(models.Categoria.id, models.Categoria.conta_id)).all())
+    socios = {"RNO": [], "DNO": []}
+    for aporte, retirada in db.execute(select(models.Socio.categoria_aporte_id, models.Socio.categoria_retirada_id)):
+        if aporte:
+            socios["RNO"].append((conta_de[aporte], aporte))
+        if retirada:
+            socios["DNO"].append((conta_de[retirada], retirada))
+    return socios
+
+
+def gerar(db: Session, linhas: int, anos: int = 10, fim: date = None, semente: int = 42) -> None:
+    """Insere ``linhas`` lançamentos nos ``anos`` que terminam em ``fim`` e refaz o resumo mensal.
+
+    Espera o plano de contas semeado (``seed_taxonomy``); não faz commit.
+    """
+    rnd = random.Random(semente)
+    fim = fim or date.today()
+    inicio = date(fim.year - anos + 1, 1, 1)
+    dias = (fim - inicio).days + 1
+    taxonomia = _taxonomia(db)
+    socios = _categorias_socios(db)
+    centros = db.execute(select(models.Centro.id, models.Centro.nome)).all()
+    socios_ir = db.scalars(select(models.Socio.id).order_by(models.Socio.id)).all()
+    pesos_centro = [PESO_CENTRO.get(nome, 1) for _, nome in centros]
+    naturezas = list(PESO_NATUREZA)
+    pesos_natureza = list(PESO_NATUREZA.values())
+
+    def data_para(conta_nome: str) -> date:
+        d = inicio + timedelta(days=rnd.randrange(dias))
+        meses = SAZONAIS.get(conta_nome)
+        if meses and d.month not in meses:
+            d = d.replace(month=rnd.choice(meses), day=min(d.day, 28))
+        if conta_nome in MENSAIS:
+            d = d.replace(day=rnd.choice((5, 6, 7)))
+        return min(d, fim)
+
+    L = models.Lancamento
+
+    def gravar(lote, marcacoes):
+        ids = db.scalars(insert(L).returning(L.id, sort_by_parameter_order=True), lote).all()
+        linhas_ir = [{"lancamento_id": i, "socio_id": s} for i, socios in zip(ids, marcacoes) for s in socios]
+        if linhas_ir:
+            db.execute(insert(models.LancamentoIR), linhas_ir)
+
+    lote, marcacoes = [], []
+    for _ in range(linhas):
+        nat = rnd.choices(naturezas, pesos_natureza)[0]
+        if nat in socios and socios[nat] and rnd.random() < FRACAO_SOCIOS:
+            conta_id, categoria_id = rnd.choice(socios[nat])
+            conta_nome = None
+            fornecedor = None
+            descricao = "Aporte de sócio" if nat == "RNO" else "Retirada de sócio"
+        else:
+            conta_id, conta_nome, cats = rnd.choice(taxonomia[nat])
+            categoria_id = rnd.choice(cats)
+            fornecedor = rnd.choice(FORNECEDORES)
+            descricao = f"{conta_nome.capitalize()} NF {rnd.randrange(1, 99999):05d}"
+        mediana, sigma = VALOR_NATUREZA[nat]
+        valor = round(rnd.lognormvariate(0, sigma) * mediana, 2)
+        operacional = nat in ("RO", "DO")
+        lote.append({
+            "data": data_para(conta_nome),
+            "natureza_code": nat,
+            "conta_id": conta_id,
+            "categoria_id": categoria_id,
+            "centro_id": rnd.choices(centros, pesos_centro)[0][0],
+            "pagamento": rnd.choice(PAGAMENTOS),
+            "descricao": descricao,
+            "fornecedor_cliente": fornecedor,
+            "dre": operacional and rnd.random() < 0.8,
+            # marcação de IR dos dois primeiros sócios (vai para lancamento_ir)
+            "ir": [s for s in socios_ir[:2] if operacional and rnd.random() < 0.3],
+            "valor": max(valor, 0.01),
+            "anexo_nome": f"nf_{rnd.randrange(10**6)}.pdf" if rnd.random() < 0.1 else None,
+        })
+        marcacoes.append(lote[-1].pop("ir"))
+        if len(lote) == LOTE:
+            gravar(lote, marcacoes)
+            lote, marcacoes = [], []
+    if lote:
+        gravar(lote, marcacoes)
+    rollup.reconstruir(db)
+
+
+def main(argv=None) -> None:
+    from backend.database import Base, SessionLocal, engine
+    from backend.seed import seed_taxonomy
+    from backend import search  # noqa: F401  (índice FTS5 no create_all do SQLite)
+    from backend import versoes  # noqa: F401  (versões e seq dos lançamentos no commit)
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--linhas", type=int, default=100000)
+    parser.add_argument("--anos", type=int, default=10)
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    try:
+        seed_taxonomy(db)
+        gerar(db, args.linhas, args.anos, semente=args.semente)
+        db.commit()
+    finally:
+        db.close()
+    print(f"{args.linhas} lançamentos gerados")
+
+
+if __name__ == "__main__":
+    main()
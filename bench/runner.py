@@ -0,0 +1,394 @@
+"""Benchmark das rotas da API sobre razões sintéticos de vários tamanhos.
+
+Cada cenário (banco × nº de lançamentos) roda em processos próprios: gera o
+razão com ``bench.gerador`` (no SQLite fica em cache em ``bench/dados``),
+chama todas as rotas pelo ``TestClient`` do FastAPI e mede, por rota, a
+latência p50/p95, linhas por segundo, consultas SQL por requisição e o pico
+de RSS do processo até ali. O resultado pode ser comparado com
+``bench/baseline.json`` (sai com erro se a mediana de alguma rota piorou
+além da tolerância) ou gravado como novo baseline. Lote e importação também
+falham se gravarem uma tabela com mais de um INSERT por requisição:
+
+    python -m bench.runner --linhas 10000 100000
+    python -m bench.runner --pg postgresql+psycopg://localhost/bench_sinuelo
+    python -m bench.runner --linhas 10000 --salvar-baseline
+
+Atenção: ``--pg`` apaga e recria as tabelas do banco indicado; use um banco
+só para isso. A busca no Postgres precisa das extensões da migração
+b7e1c5d93f20 (``unaccent``/``pg_trgm``); sem elas a rota é pulada.
+"""
+import argparse
+import collections
+import json
+import os
+import pathlib
+import resource
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import date
+
+RAIZ = pathlib.Path(__file__).resolve().parent
+BASELINE = RAIZ / "baseline.json"
+DADOS = RAIZ / "dados"
+
+
+# ---- Cenário (processo filho) ----
+
+def _preparar(url: str, linhas: int, semente: int) -> float:
+    """Cria/popula o banco; devolve os segundos gastos gerando (0 se veio do cache)."""
+    from sqlalchemy import func, inspect, select
+    from backend import models, search  # noqa: F401  (índice FTS5 no create_all do SQLite)
+    from backend import versoes  # noqa: F401  (versões e seq dos lançamentos no commit)
+    from backend.database import Base, SessionLocal, engine
+    from backend.seed import seed_taxonomy
+    from bench.gerador import gerar
+
+    if url.startswith("sqlite"):
+        Base.metadata.create_all(engine)
+        # o cache só vale com o schema atual (coluna nova ou removida nos modelos pede gerar de novo)
+        existentes = inspect(engine)
+        atual = all(
+            {c.name for c in tabela.columns} == {c["name"] for c in existentes.get_columns(tabela.name)}
+            for tabela in Base.metadata.sorted_tables
+        )
+        with SessionLocal() as db:
+            if atual and db.scalar(select(func.count()).select_from(models.Lancamento)) == linhas:
+                return 0.0
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    inicio = time.perf_counter()
+    with SessionLocal() as db:
+        seed_taxonomy(db)
+        gerar(db, linhas, semente=semente)
+        db.commit()
+    with engine.connect() as conn:
+        conn.exec_driver_sql("ANALYZE")
+        conn.commit()
+    return time.perf_counter() - inicio
+
+
+def _rotas(db) -> list[tuple]:
+    """(nome, método, url, kwargs, contar linhas da resposta) de cada rota medida."""
+    from sqlalchemy import func, select
+    from backend import models
+    from backend.queries import encode_cursor
+
+    L = models.Lancamento
+    socio = db.scalars(select(models.Socio).order_by(models.Socio.id)).first()
+    conta_id, categoria_id, centro_id = db.execute(
+        select(L.conta_id, L.categoria_id, L.centro_id).where(L.natureza_code == "DO").order_by(L.id).limit(1)
+    ).one()
+    inicio, fim = db.execute(select(func.min(L.data), func.max(L.data))).one()
+    meio = inicio + (fim - inicio) / 2
+    ano = meio.year
+    mes = f"{meio:%Y-%m}"
+    exportado = {"start": f"{meio:%Y-%m}-01", "end": f"{meio:%Y-%m}-28"}
+    busca = db.get_bind().dialect.name != "postgresql" or db.scalar(select(func.to_regproc("f_unaccent"))) is not None
+
+    itens = lambda r: len(r.json()["items"])
+    lista = lambda r: len(r.json())
+    rotas = [
+        ("naturezas", "GET", "/api/naturezas", {}, lista),
+        ("contas da natureza", "GET", "/api/naturezas/DO/contas", {}, lista),
+        ("categorias da conta", "GET", f"/api/contas/{conta_id}/categorias", {}, lista),
+        ("taxonomia", "GET", "/api/taxonomia", {}, lista),
+        ("centros", "GET", "/api/centros", {}, lista),
+        ("sócios", "GET", "/api/socios/", {}, lista),
+        ("lançamentos: 1ª página", "GET", "/api/lancamentos", {"params": {"limit": 200}}, itens),
+        ("lançamentos: 1000 por página", "GET", "/api/lancamentos", {"params": {"limit": 1000}}, itens),
+        ("lançamentos: 1000 por página com nomes", "GET", "/api/lancamentos",
+         {"params": {"limit": 1000, "expand": "names"}}, itens),
+        ("lançamentos: página do meio", "GET", "/api/lancamentos",
+         {"params": {"cursor": encode_cursor(meio, 2**31 - 1), "limit": 200}}, itens),
+        ("lançamentos: ano + categoria", "GET", "/api/lancamentos",
+         {"params": {"start": f"{ano}-01-01", "end": f"{ano}-12-31", "categoria_id": categoria_id, "limit": 200}},
+         itens),
+        ("lançamentos: mês + centro", "GET", "/api/lancamentos",
+         {"params": {"start": exportado["start"], "end": exportado["end"], "centro_id": centro_id, "limit": 200}},
+         itens),
+        ("sincronização: carga inicial (5000)", "GET", "/api/lancamentos/changes",
+         {"params": {"since": 0, "limit": 5000}}, itens),
+        ("sincronização: carga inicial com nomes (5000)", "GET", "/api/lancamentos/changes",
+         {"params": {"since": 0, "limit": 5000, "expand": "names"}}, itens),
+        ("sincronização: nada mudou", "GET", "/api/lancamentos/changes",
+         {"params": {"since": db.scalar(select(func.max(L.seq)))}}, itens),
+        ("exportação CSV do mês", "GET", "/api/lancamentos/export",
+         {"params": exportado}, lambda r: r.text.count("\n") - 1),
+        ("extrato do sócio", "GET", f"/api/socios/{socio.id}/extrato", {}, lambda r: len(r.json()["extrato"])),
+        ("extrato do sócio: ano", "GET", f"/api/socios/{socio.id}/extrato",
+         {"params": {"start": f"{ano}-01", "end": f"{ano}-12"}}, lambda r: len(r.json()["extrato"])),
+        ("kpis do mês", "GET", "/api/kpis", {"params": {"mes": mes}}, None),
+        ("kpis do ano", "GET", "/api/kpis", {"params": {"inicio": f"{ano}-01", "fim": f"{ano}-12"}}, None),
+        ("demonstrativo do ano", "GET", "/api/demonstrativo", {"params": {"ano": ano}}, None),
+        ("demonstrativo completo", "GET", "/api/demonstrativo", {}, None),
+        ("séries: safras por natureza", "GET", "/api/series", {"params": {"granularidade": "safra"}}, None),
+        ("séries: meses por categoria", "GET", "/api/series",
+         {"params": {"granularidade": "mes", "dimensao": "categoria"}}, None),
+        ("resultado por centro: meses", "GET", "/api/centros/resultado", {"params": {"granularidade": "mes"}}, None),
+        ("IR do sócio: ano", "GET", f"/api/ir/{socio.id}/{ano}", {}, None),
+        ("IR do sócio: CSV do ano", "GET", f"/api/ir/{socio.id}/{ano}/csv", {}, lambda r: r.text.count("\n") - 1),
+        ("demonstrativo do ano: IR do sócio", "GET", "/api/demonstrativo",
+         {"params": {"ano": ano, "ir_socio": socio.id}}, None),
+    ]
+    if busca:
+        rotas.append(("busca", "GET", "/api/lancamentos/busca", {"params": {"q": "coxilha"}}, itens))
+    return rotas
+
+
+def _medir(client, contador: list, metodo: str, url: str, kwargs: dict, contar, repeticoes: int) -> dict:
+    for _ in range(2):  # aquecimento (caches, planos)
+        client.request(metodo, url, **kwargs).raise_for_status()
+    tempos, linhas = [], 0
+    consultas_antes = contador[0]
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        r = client.request(metodo, url, **kwargs)
+        tempos.append(time.perf_counter() - inicio)
+        r.raise_for_status()
+        if contar:
+            linhas += contar(r)
+    return _resumo(tempos, linhas if contar else None, (contador[0] - consultas_antes) / repeticoes)
+
+
+def _resumo(tempos: list, linhas, consultas: float) -> dict:
+    tempos = sorted(tempos)
+    p95 = tempos[min(len(tempos) - 1, round(0.95 * (len(tempos) - 1)))]
+    return {
+        "p50_ms": round(statistics.median(tempos) * 1000, 2),
+        "p95_ms": round(p95 * 1000, 2),
+        "linhas_s": round(linhas / sum(tempos)) if linhas is not None else None,
+        "consultas": round(consultas, 1),
+        "rss_mb": round(_rss_pico() / 1024, 1),
+    }
+
+
+def _rss_pico() -> int:
+    """Pico de RSS do processo em KiB (o Linux já reporta em KiB)."""
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico // 1024 if sys.platform == "darwin" else pico
+
+
+def _escritas(client, contador: list, insercoes: collections.Counter, repeticoes: int, base: dict) -> dict:
+    """Criar, alterar e excluir os mesmos lançamentos; lote e importação sem saldo líquido."""
+    resultados = {}
+
+    def medir(nome, chamadas):
+        tempos = []
+        antes, insercoes_antes = contador[0], insercoes.copy()
+        saidas = []
+        for metodo, url, kwargs in chamadas:
+            inicio = time.perf_counter()
+            r = client.request(metodo, url, **kwargs)
+            tempos.append(time.perf_counter() - inicio)
+            r.raise_for_status()
+            saidas.append(r)
+        resultados[nome] = _resumo(tempos, None, (contador[0] - antes) / len(chamadas))
+        # INSERTs na tabela mais gravada, por requisição: lote e importação devem fazer um só
+        por_tabela = (insercoes - insercoes_antes).values()
+        resultados[nome]["insercoes"] = round(max(por_tabela, default=0) / len(chamadas), 1)
+        return saidas
+
+    criados = medir("criar lançamento", [("POST", "/api/lancamentos", {"json": base})] * repeticoes)
+    ids = [r.json()["id"] for r in criados]
+    medir("alterar lançamento", [
+        ("PUT", f"/api/lancamentos/{i}", {"json": {"valor": "321.09", "centro_id": base["centro_id"]}}) for i in ids
+    ])
+    medir("excluir lançamento", [("DELETE", f"/api/lancamentos/{i}", {}) for i in ids])
+
+    vezes = max(1, repeticoes // 4)
+    # nulos em parte das linhas, como num lote real: não podem quebrar o INSERT
+    criar = [
+        {**base, "centro_id": base["centro_id"] if i % 2 else None,
+         "descricao": base["descricao"] if i % 3 else None, "pagamento": "pix" if i % 5 else None}
+        for i in range(100)
+    ]
+    lotes = medir("lote: criar 100", [("POST", "/api/lancamentos/batch", {"json": {"create": criar}})] * vezes)
+    medir("lote: excluir 100", [
+        ("POST", "/api/lancamentos/batch", {"json": {"delete": [item["id"] for item in r.json()["items"]]}})
+        for r in lotes
+    ])
+
+    # reimporta o CSV exportado: tudo cai na checagem de duplicados, nada é gravado
+    csv = client.get("/api/lancamentos/export", params={"start": base["data"], "end": base["data"]}).content
+    medir("importação CSV (duplicados)", [
+        ("POST", "/api/lancamentos/import", {"files": {"file": ("extrato.csv", csv, "text/csv")}})
+    ] * vezes)
+
+    # 100 linhas novas por requisição a partir da primeira do export, com centro/descrição/pagamento
+    # vazios em parte delas; o fornecedor marca cada uma, para o lote excluí-las no fim
+    cabecalho, modelo = csv.decode("utf-8-sig").splitlines()[:2]
+    colunas = cabecalho.split(";")
+    marca = "bench importação"
+
+    def arquivo(n):
+        novas = []
+        for i in range(100):
+            campos = dict(zip(colunas, modelo.split(";")))
+            campos.update(
+                id="", fornecedor_cliente=f"{marca} {n}-{i}", descricao=campos["descricao"] if i % 3 else "",
+                centro=campos["centro"] if i % 2 else "", pagamento="pix" if i % 5 else "",
+            )
+            novas.append(";".join(campos[c] for c in colunas))
+        return "\n".join([cabecalho, *novas]).encode()
+
+    medir("importação CSV (novas)", [
+        ("POST", "/api/lancamentos/import", {"files": {"file": ("novas.csv", arquivo(n), "text/csv")}})
+        for n in range(vezes)
+    ])
+    exportado = client.get("/api/lancamentos/export", params={"start": base["data"], "end": base["data"]}).text
+    fornecedor = colunas.index("fornecedor_cliente")
+    importados = [
+        int(campos[0]) for campos in (linha.split(";") for linha in exportado.splitlines()[1:])
+        if campos[fornecedor].startswith(marca)
+    ]
+    client.post("/api/lancamentos/batch", json={"delete": importados}).raise_for_status()
+    return resultados
+
+
+def cenario(url: str, repeticoes: int) -> dict:
+    """Mede as rotas sobre um banco já preparado (o DATABASE_URL precisa vir antes de importar o backend)."""
+    os.environ["DATABASE_URL"] = url
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event, select
+    from backend import models
+    from backend.database import SessionLocal, async_engine, engine
+    from backend.main import app
+
+    contador = [0]
+    insercoes = collections.Counter()  # INSERTs por tabela
+
+    def _contar(conn, cursor, statement, parameters, context, executemany):
+        if threading.current_thread().name == "job-lease":
+            return  # a ronda do lease das tarefas (backend/jobs.py) roda em paralelo, fora das rotas
+        contador[0] += 1
+        if statement.startswith("INSERT INTO "):
+            insercoes[statement.split()[2]] += 1
+
+    for _engine in (engine, async_engine.sync_engine):
+        event.listen(_engine, "before_cursor_execute", _contar)
+
+    with SessionLocal() as db:
+        rotas = _rotas(db)
+        L = models.Lancamento
+        exemplo = db.execute(
+            select(L.data, L.natureza_code, L.conta_id, L.categoria_id, L.centro_id).order_by(L.id.desc()).limit(1)
+        ).one()
+    base = {**exemplo._asdict(), "data": str(exemplo.data), "descricao": "benchmark", "valor": "123.45"}
+
+    resultados = {}
+    with TestClient(app) as client:
+        for nome, metodo, caminho, kwargs, contar in rotas:
+            resultados[nome] = _medir(client, contador, metodo, caminho, kwargs, contar, repeticoes)
+        resultados.update(_escritas(client, contador, insercoes, repeticoes, base))
+    return {"rss_mb": round(_rss_pico() / 1024, 1), "rotas": resultados}
+
+
+# ---- Orquestração ----
+
+def _rodar_cenario(url: str, linhas: int, args) -> dict:
+    """Gera o razão e mede em dois processos, para o RSS da medição não incluir a geração."""
+    def filho(*opcoes):
+        cmd = [sys.executable, "-m", "bench.runner", *opcoes, "--linhas", str(linhas), "--semente", str(args.semente)]
+        saida = subprocess.run(cmd, cwd=RAIZ.parent, check=True, stdout=subprocess.PIPE, text=True).stdout
+        return json.loads(saida.strip().splitlines()[-1])
+
+    geracao = filho("--preparar", url)
+    return {"geracao_s": round(geracao, 1), **filho("--cenario", url, "--repeticoes", str(args.repeticoes))}
+
+
+def _imprimir(chave: str, resultado: dict, baseline: dict) -> None:
+    print(f"\n== {chave}  (geração {resultado['geracao_s']}s, pico RSS {resultado['rss_mb']} MB)")
+    print(f"{'rota':34} {'p50 ms':>9} {'p95 ms':>9} {'linhas/s':>11} {'SQL/req':>8} {'RSS MB':>7}  {'vs baseline':>11}")
+    for nome, r in resultado["rotas"].items():
+        ref = baseline.get(chave, {}).get("rotas", {}).get(nome)
+        comparacao = f"{(r['p50_ms'] / ref['p50_ms'] - 1) * 100:+.0f}% p50" if ref and ref["p50_ms"] else ""
+        linhas_s = f"{r['linhas_s']:,}" if r["linhas_s"] is not None else "-"
+        print(f"{nome:34} {r['p50_ms']:9.2f} {r['p95_ms']:9.2f} {linhas_s:>11} "
+              f"{r['consultas']:8.1f} {r['rss_mb']:7.1f}  {comparacao:>11}")
+
+
+def regressoes(chave: str, resultado: dict, baseline: dict, tolerancia: float, piso_ms: float) -> list[str]:
+    """Rotas cuja mediana passou de baseline × (1 + tolerância), que fazem mais consultas
+    ou que gravam uma tabela com mais de um INSERT por requisição.
+
+    Compara o p50: com poucas repetições o p95 é uma única amostra e oscila demais.
+    """
+    falhas = []
+    for nome, r in resultado["rotas"].items():
+        if r.get("insercoes", 0) > 1:
+            falhas.append(f"{chave} {nome}: {r['insercoes']} INSERTs numa tabela por req (esperado 1)")
+        ref = baseline.get(chave, {}).get("rotas", {}).get(nome)
+        if not ref:
+            continue
+        limite = max(ref["p50_ms"] * (1 + tolerancia), ref["p50_ms"] + piso_ms)
+        if r["p50_ms"] > limite:
+            falhas.append(f"{chave} {nome}: p50 {r['p50_ms']} ms > {limite:.2f} ms")
+        if r["consultas"] > ref["consultas"]:
+            falhas.append(f"{chave} {nome}: {r['consultas']} consultas/req (baseline {ref['consultas']})")
+    return falhas
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--linhas", type=int, nargs="+", default=[10000, 100000],
+                        help="tamanhos do razão (ex.: 10000 100000 1000000)")
+    parser.add_argument("--pg", help="URL de um Postgres só para o benchmark (as tabelas são recriadas)")
+    parser.add_argument("--repeticoes", type=int, default=30, help="requisições medidas por rota")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--tolerancia", type=float, default=1.0,
+                        help="piora de p50 aceita em relação ao baseline (1.0 = o dobro)")
+    parser.add_argument("--piso-ms", type=float, default=5.0,
+                        help="diferença absoluta de p50 abaixo da qual não há regressão")
+    parser.add_argument("--salvar-baseline", action="store_true", help=f"grava o resultado em {BASELINE.name}")
+    parser.add_argument("--json", type=pathlib.Path, help="também grava o resultado completo neste arquivo")
+    parser.add_argument("--preparar", metavar="URL", help=argparse.SUPPRESS)
+    parser.add_argument("--cenario", metavar="URL", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.preparar:
+        os.environ["DATABASE_URL"] = args.preparar
+        print(json.dumps(_preparar(args.preparar, args.linhas[0], args.semente)))
+        return 0
+    if args.cenario:
+        print(json.dumps(cenario(args.cenario, args.repeticoes)))
+        return 0
+
+    DADOS.mkdir(exist_ok=True)
+    bancos = {"sqlite": lambda n: f"sqlite:///{DADOS / f'razao_{n}_{args.semente}.db'}"}
+    if args.pg:
+        bancos["postgres"] = lambda n: args.pg
+
+    baseline = json.loads(BASELINE.read_text()) if BASELINE.exists() else {}
+    resultados = {}
+    for banco, url in bancos.items():
+        for linhas in args.linhas:
+            chave = f"{banco}/{linhas}"
+            resultados[chave] = _rodar_cenario(url(linhas), linhas, args)
+            _imprimir(chave, resultados[chave], baseline)
+
+    if args.json:
+        args.json.write_text(json.dumps(resultados, indent=2, ensure_ascii=False))
+    if args.salvar_baseline:
+        baseline.update(resultados)
+        baseline["_gerado_em"] = date.today().isoformat()
+        BASELINE.write_text(json.dumps(baseline, indent=2, ensure_ascii=False) + "\n")
+        print(f"\nbaseline gravado em {BASELINE}")
+        return 0
+
+    falhas = []
+    for chave, resultado in resultados.items():
+        falhas += regressoes(chave, resultado, baseline, args.tolerancia, args.piso_ms)
+    if falhas:
+        print(f"\n{len(falhas)} regressão(ões) em relação ao baseline:")
+        for falha in falhas:
+            print("  " + falha)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
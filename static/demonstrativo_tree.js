@@ -5,39 +5,39 @@ const mockData = [
   { natureza:"Receita Operacional", 
     items:[
       {categoria:"Vendas", items:[
-        {conta:"Venda Gado Corte", ccValues:{"CC – Cria":125000, "CC – Recria":88000}, flags:{ dre:false, ir_eduardo:false, ir_roberto:false }, periodo:{safra:"24-25", ano:2025}},
-        {conta:"Venda Bezerros", ccValues:{"CC – Cria":54000, "CC – Recria":22000}, flags:{ dre:false, ir_eduardo:false, ir_roberto:false }, periodo:{safra:"24-25", ano:2025}}
+        {conta:"Venda Gado Corte", ccValues:{"CC – Cria":125000, "CC – Recria":88000}, flags:{ dre:false, ir:[] }, periodo:{safra:"24-25", ano:2025}},
+        {conta:"Venda Bezerros", ccValues:{"CC – Cria":54000, "CC – Recria":22000}, flags:{ dre:false, ir:[] }, periodo:{safra:"24-25", ano:2025}}
       ]}, 
       {categoria:"Serviços", items:[
-        {conta:"Arrendamento", ccValues:{"CC – Geral":12000}, flags:{ dre:true, ir_eduardo:false, ir_roberto:false }, periodo:{safra:"24-25", ano:2025}}
+        {conta:"Arrendamento", ccValues:{"CC – Geral":12000}, flags:{ dre:true, ir:[] }, periodo:{safra:"24-25", ano:2025}}
       ]}
     ]
   },
   { natureza:"Receita Não Operacional",
     items:[
       {categoria:"Financeiras", items:[
-        {conta:"Juros Recebidos", ccValues:{"CC – Geral":3500}, flags:{ dre:true, ir_eduardo:false, ir_roberto:false }, periodo:{safra:"24-25", ano:2025}}
+        {conta:"Juros Recebidos", ccValues:{"CC – Geral":3500}, flags:{ dre:true, ir:[] }, periodo:{safra:"24-25", ano:2025}}
       ]}
     ]
   },
   { natureza:"Despesa Operacional", 
     items:[
       {categoria:"Nutrição", items:[
-        {conta:"Ração", ccValues:{"CC – Recria":38000, "CC – Engorda":21000}, flags:{ dre:true, ir_eduardo:false, ir_roberto:false }, periodo:{safra:"24-25", ano:2025}},
-        {conta:"Sal Mineral", ccValues:{"CC – Cria":9000, "CC – Recria":6000}, flags:{ dre:false, ir_eduardo:false, ir_roberto:false }, periodo:{safra:"24-25", ano:2025}}
+        {conta:"Ração", ccValues:{"CC – Recria":38000, "CC – Engorda":21000}, flags:{ dre:true, ir:[] }, periodo:{safra:"24-25", ano:2025}},
+        {conta:"Sal Mineral", ccValues:{"CC – Cria":9000, "CC – Recria":6000}, flags:{ dre:false, ir:[] }, periodo:{safra:"24-25", ano:2025}}
       ]}, 
       {categoria:"Sanidade", items:[
-        {conta:"Vacinas", ccValues:{"CC – Cria":4500, "CC – Recria":4100}, flags:{ dre:false, ir_eduardo:false, ir_roberto:false }, periodo:{safra:"24-25", ano:2025}}
+        {conta:"Vacinas", ccValues:{"CC – Cria":4500, "CC – Recria":4100}, flags:{ dre:false, ir:[] }, periodo:{safra:"24-25", ano:2025}}
       ]}
     ]
   },
   { natureza:"Despesa Não Operacional", 
     items:[
       {categoria:"Financeiras", items:[
-        {conta:"Juros Pagos", ccValues:{"CC – Geral":4200}, flags:{ dre:true, ir_eduardo:false, ir_roberto:false }, periodo:{safra:"24-25", ano:2025}}
+        {conta:"Juros Pagos", ccValues:{"CC – Geral":4200}, flags:{ dre:true, ir:[] }, periodo:{safra:"24-25", ano:2025}}
       ]}, 
       {categoria:"Administrativas", items:[
-        {conta:"Contabilidade", ccValues:{"CC – Geral":7000}, flags:{ dre:false, ir_eduardo:true, ir_roberto:false }, periodo:{safra:"24-25", ano:2025}}
+        {conta:"Contabilidade", ccValues:{"CC – Geral":7000}, flags:{ dre:false, ir:[1] }, periodo:{safra:"24-25", ano:2025}}
       ]}
     ]
   }
@@ -57,13 +57,26 @@ function hasFlag(node, key) {
   return false;
 }
 
+// flags.ir: ids dos sócios que declaram a folha no IR
+function hasIR(node, socioId) {
+  const ir = node.flags?.ir;
+  if (ir !== undefined) {
+    return Array.from(ir).map(String).includes(String(socioId));
+  }
+  if (node.items) {
+    return node.items.some(child => hasIR(child, socioId));
+  }
+  return false;
+}
+
   const formatBRL = v => (Number(v)||0).toLocaleString('pt-BR',{style:'currency',currency:'BRL'});
   const slugify = str => String(str).normalize('NFD').replace(/[\u0300-\u036f]/g,'').replace(/[^\w\s-]/g,'').trim().replace(/\s+/g,'-').toLowerCase();
   function extractCostCenters(data){ const set = new Set(); const walk=n=>{ if(n.ccValues) Object.keys(n.ccValues).forEach(cc=>set.add(cc)); if(n.items) n.items.forEach(walk); }; data.forEach(walk); return Array.from(set).sort(); }
 function passesFilters(node, st) {
   if (st.filterDRE && !hasFlag(node, 'dre')) return false;
-  if (st.filterir_eduardo && !hasFlag(node, 'ir_eduardo')) return false;
-  if (st.filterir_roberto && !hasFlag(node, 'ir_roberto')) return false;
+  for (const socioId of st.filterIR) {
+    if (!hasIR(node, socioId)) return false;
+  }
     if (node.ccValues && st.periodType && st.periodValue) {
     const p = node.periodo || {};
     const want = String(st.periodValue);
@@ -134,8 +147,8 @@ const sortSmart = (arr) => arr.slice().sort((a, b) => {
       periodType: 'safra',
       periodValue: '',
    	  filterDRE: false,
-	  filterir_eduardo: false,
-      filterir_roberto: false,
+      socios: Array.isArray(opts.socios) ? opts.socios : [],
+      filterIR: new Set(),
     };
 
     const html = `
@@ -225,15 +238,17 @@ const sortSmart = (arr) => arr.slice().sort((a, b) => {
      const gFlags = document.createElement('div'); 
 	gFlags.className='sf-group'; 
 	gFlags.innerHTML = `<span class="title">Filtros</span>`;
-	[
-	{id:'sf-dre', label:'Somente DRE – Sinuelo', key:'filterDRE'},
-	{id:'sf-ir-edu', label:'Somente IR – Eduardo Paim', key:'filterir_eduardo'},
-	{id:'sf-ir-rob', label:'Somente IR – Roberto Paim', key:'filterir_roberto'},
-	].forEach(f=>{
+	const lblDre=document.createElement('label'); lblDre.className='sf-pill';
+	lblDre.innerHTML=`<input type="checkbox" id="sf-dre" ${state.filterDRE?'checked':''}/> Somente DRE – Sinuelo`;
+	lblDre.querySelector('input').addEventListener('change',e=>{ state.filterDRE=e.target.checked; renderAll(); });
+	gFlags.appendChild(lblDre);
+	// um filtro de IR por sócio cadastrado
+	state.socios.forEach(s=>{
 	const lbl=document.createElement('label'); lbl.className='sf-pill';
-	lbl.innerHTML=`<input type="checkbox" id="${f.id}" ${state[f.key]?'checked':''}/> ${f.label}`;
+	lbl.innerHTML=`<input type="checkbox" id="sf-ir-${s.id}" ${state.filterIR.has(s.id)?'checked':''}/> Somente IR – ${s.nome}`;
 	lbl.querySelector('input').addEventListener('change',e=>{
-    state[f.key]=e.target.checked; renderAll();
+    if(e.target.checked) state.filterIR.add(s.id); else state.filterIR.delete(s.id);
+    renderAll();
 	});
 	gFlags.appendChild(lbl);
 	});
@@ -341,8 +356,13 @@ function row({ id, level, name, total, percent, expandable, isOpen }){
       setData: (data, costCenters)=> setData(data, costCenters),
       setPeriodo: (tipo, valor)=>{ state.periodType=tipo; state.periodValue=valor; renderAll(); },
       setFiltroDRE: on => { state.filterDRE = !!on; renderAll(); },
-	  setFiltroir_eduardo: on => { state.filterir_eduardo = !!on; renderAll(); },
-	  setFiltroir_roberto: on => { state.filterir_roberto = !!on; renderAll(); },
+      setSocios: socios => {
+        state.socios = Array.isArray(socios) ? socios : [];
+        const ids = new Set(state.socios.map(s => s.id));
+        state.filterIR = new Set([...state.filterIR].filter(id => ids.has(id)));
+        renderAll();
+      },
+      setFiltroIR: (socioId, on) => { if(on) state.filterIR.add(socioId); else state.filterIR.delete(socioId); renderAll(); },
       expandAll: ()=>{ collectAllRowIds().forEach(id=>state.expanded.add(id)); renderAll(); },
       collapseAll: ()=>{ state.expanded.clear(); renderAll(); }
     };
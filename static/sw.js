@@ -1,5 +1,7 @@
 // Nome do cache (troque a versão quando fizer alterações importantes)
-const CACHE_NAME = "sinuelo-cache-v15"; // bump a versão para forçar update
+const CACHE_NAME = "sinuelo-cache-v21"; // bump a versão para forçar update
+// respostas GET da API (stale-while-revalidate); limpo a cada gravação
+const API_CACHE = "sinuelo-api-v1";
 
 const ASSETS = [
   "/static/",
@@ -10,6 +12,16 @@ const ASSETS = [
   "/static/icons/maskable-512.png",
   "/static/icons/favicon.ico",
   "/static/demonstrativo_tree.js",
+  "/static/sync.js",
+];
+
+// downloads e streaming não passam pelo cache da API; o delta do extrato
+// tem a cópia própria no IndexedDB (sync.js); as miniaturas ficam no cache
+// HTTP do navegador (imutáveis), fora do cache da API que é limpo a cada
+// gravação; o andamento das tarefas (/api/jobs) tem que vir sempre da rede
+const API_SEM_CACHE = [
+  "/api/lancamentos/export", "/api/upload", "/api/lancamentos/changes", /^\/api\/ir\/.+\/csv$/,
+  /^\/api\/anexos\/\d+\/miniatura$/, "/api/jobs",
 ];
 
 self.addEventListener("install", (event) => {
@@ -22,19 +34,63 @@ self.addEventListener("install", (event) => {
 self.addEventListener("activate", (event) => {
   event.waitUntil(
     caches.keys().then((keys) =>
-      Promise.all(keys.map((k) => k !== CACHE_NAME && caches.delete(k)))
+      Promise.all(keys.map((k) => k !== CACHE_NAME && k !== API_CACHE && caches.delete(k)))
     )
   );
   self.clients.claim();
 });
 
+// Revalida com If-None-Match: 304 mantém o cache; 200 com ETag novo
+// atualiza o cache e avisa as páginas abertas para recarregarem os dados.
+async function revalidar(req, cached) {
+  const headers = new Headers(req.headers);
+  const etag = cached?.headers.get("ETag");
+  if (etag) headers.set("If-None-Match", etag);
+  const res = await fetch(req.url, { headers, credentials: "same-origin", cache: "no-store" });
+  if (res.status === 304 && cached) return cached;
+  if (res.ok) {
+    const cache = await caches.open(API_CACHE);
+    await cache.put(req, res.clone());
+    if (cached && res.headers.get("ETag") !== etag) {
+      const clients = await self.clients.matchAll({ type: "window" });
+      clients.forEach((c) => c.postMessage({ type: "api-atualizada", url: req.url }));
+    }
+  }
+  return res;
+}
+
+// Stale-while-revalidate: responde do cache na hora (ou da rede, na
+// primeira vez) e revalida em segundo plano; offline, fica com o cache.
+function staleWhileRevalidate(event, req) {
+  return caches.open(API_CACHE).then(async (cache) => {
+    const cached = await cache.match(req);
+    const rede = revalidar(req, cached);
+    if (cached) {
+      event.waitUntil(rede.catch(() => {}));
+      return cached;
+    }
+    return rede;
+  });
+}
+
 self.addEventListener("fetch", (event) => {
   const req = event.request;
   const url = new URL(req.url);
 
-  // Nunca interceptar a API (sempre rede, sem cache)
   if (url.origin === location.origin && url.pathname.startsWith("/api/")) {
-    event.respondWith(fetch(req));
+    if (req.method === "GET" && !API_SEM_CACHE.some((p) => (p instanceof RegExp ? p.test(url.pathname) : url.pathname.startsWith(p)))) {
+      event.respondWith(staleWhileRevalidate(event, req));
+    } else if (req.method !== "GET") {
+      // gravação: o que está no cache da API deixa de valer
+      event.respondWith(
+        fetch(req).then(async (res) => {
+          if (res.ok) await caches.delete(API_CACHE);
+          return res;
+        })
+      );
+    } else {
+      event.respondWith(fetch(req));
+    }
     return;
   }
 
@@ -51,4 +107,4 @@ self.addEventListener("fetch", (event) => {
   event.respondWith(
     fetch(req).catch(() => caches.match("./index.html"))
   );
-});
\ No newline at end of file
+});
@@ -0,0 +1,197 @@
+// ===== Extrato offline =====
+// Cópia local dos lançamentos no IndexedDB, atualizada por delta em
+// /lancamentos/changes (só o que mudou desde a última seq), e fila das
+// gravações feitas sem conexão, reenviadas na ordem quando a rede volta.
+// Lançamentos criados offline ficam com id negativo até o reenvio. Os itens
+// vêm com os nomes da taxonomia (expand=names); quando a versão dos nomes
+// muda no servidor, a cópia é refeita do zero.
+const LancSync = (() => {
+  const DB_NOME = "sinuelo";
+  const DB_VERSAO = 1;
+  const PAGINA = "2000";
+  let conexao = null;
+
+  function abrir() {
+    if (!conexao) conexao = new Promise((resolve, reject) => {
+      const req = indexedDB.open(DB_NOME, DB_VERSAO);
+      req.onupgradeneeded = () => {
+        const db = req.result;
+        db.createObjectStore("lancamentos", { keyPath: "id" });
+        db.createObjectStore("meta");
+        db.createObjectStore("fila", { keyPath: "n", autoIncrement: true });
+      };
+      req.onsuccess = () => resolve(req.result);
+      req.onerror = () => reject(req.error);
+    });
+    return conexao;
+  }
+
+  // roda fn(stores...) numa transação; resolve com o resultado do request que fn devolver
+  async function tx(nomes, modo, fn) {
+    const db = await abrir();
+    return new Promise((resolve, reject) => {
+      const t = db.transaction(nomes, modo);
+      const req = fn(...nomes.map((n) => t.objectStore(n)));
+      t.oncomplete = () => resolve(req?.result);
+      t.onerror = t.onabort = () => reject(t.error);
+    });
+  }
+
+  // fetch falhou por falta de rede (não por resposta de erro do servidor)
+  const semRede = (err) => err instanceof TypeError;
+  // o servidor recusou a gravação de vez; 5xx, 429 ou timeout podem passar numa nova tentativa
+  const RECUSAS = [404, 409, 422];
+  const recusada = (err) => RECUSAS.includes(err.status);
+
+  async function todos() {
+    const lista = await tx(["lancamentos"], "readonly", (s) => s.getAll());
+    return lista.sort((a, b) => (a.data < b.data ? 1 : a.data > b.data ? -1 : b.id - a.id));
+  }
+
+  function aplicar(pagina) {
+    return tx(["lancamentos", "meta"], "readwrite", (lanc, meta) => {
+      // item e lápide do mesmo id: vale o de maior seq
+      pagina.deleted.forEach((d) => {
+        lanc.get(d.id).onsuccess = (e) => {
+          const atual = e.target.result;
+          if (atual && (atual.seq ?? 0) < d.seq) lanc.delete(d.id);
+        };
+      });
+      pagina.items.forEach((item) => {
+        lanc.get(item.id).onsuccess = (e) => {
+          const atual = e.target.result;
+          // gravação offline ainda na fila vale mais que a versão do servidor
+          if (!atual || (!atual.pendente && (atual.seq ?? 0) <= item.seq)) lanc.put(item);
+        };
+      });
+      meta.put({ seq: pagina.seq, after: pagina.after, nomes: pagina.nomes }, "cursor");
+    });
+  }
+
+  // recomeça do zero (base trocada no servidor, gravação recusada), sem perder o que está na fila
+  function limpar() {
+    return tx(["lancamentos", "meta"], "readwrite", (lanc, meta) => {
+      lanc.openCursor().onsuccess = (e) => {
+        const c = e.target.result;
+        if (!c) return;
+        if (!c.value.pendente) c.delete();
+        c.continue();
+      };
+      meta.delete("cursor");
+    });
+  }
+
+  // Traz as alterações desde a última sincronização e devolve o extrato local inteiro.
+  async function sincronizar() {
+    let { seq, after, nomes } = (await tx(["meta"], "readonly", (m) => m.get("cursor"))) || { seq: 0, after: null };
+    try {
+      for (;;) {
+        const qs = new URLSearchParams({ since: seq, limit: PAGINA, expand: "names" });
+        if (after != null) qs.set("after", after);
+        const res = await fetch(`${API_BASE}/lancamentos/changes?${qs}`, { headers: { Accept: "application/json" } });
+        if (res.status === 410) {
+          await limpar();
+          seq = 0; after = null;
+          continue;
+        }
+        if (!res.ok) throw new Error(`${res.status} ${res.statusText}`);
+        const pagina = await res.json();
+        if (seq && pagina.nomes !== nomes) {
+          // conta/categoria/centro renomeados: os nomes guardados estão velhos
+          await limpar();
+          seq = 0; after = null; nomes = pagina.nomes;
+          continue;
+        }
+        await aplicar(pagina);
+        ({ seq, after, nomes } = pagina);
+        if (!pagina.more) break;
+      }
+    } catch (err) {
+      if (!semRede(err)) throw err;
+      console.warn("Sem conexão: usando o extrato salvo no aparelho.");
+    }
+    return todos();
+  }
+
+  async function enviar(op) {
+    const opcoes = { method: op.metodo, headers: { "Content-Type": "application/json" } };
+    if (op.corpo) opcoes.body = JSON.stringify(op.corpo);
+    const url = `${API_BASE}/lancamentos` + (op.metodo === "POST" ? "" : `/${op.id}`);
+    const res = await fetch(url, opcoes);
+    if (!res.ok) {
+      const erro = new Error((await res.text()) || `HTTP ${res.status}`);
+      erro.status = res.status;
+      throw erro;
+    }
+    return res.json();
+  }
+
+  async function proximoIdLocal() {
+    const [menor] = await tx(["lancamentos"], "readonly", (s) => s.getAllKeys(null, 1));
+    return Math.min(0, menor ?? 0) - 1;
+  }
+
+  // Grava no servidor e na cópia local; sem rede, enfileira e devolve o item como ficou local.
+  async function gravar(metodo, id, corpo) {
+    const op = { metodo, id, corpo };
+    try {
+      const salvo = await enviar(op);
+      if (metodo === "DELETE") await tx(["lancamentos"], "readwrite", (s) => s.delete(id));
+      else await tx(["lancamentos"], "readwrite", (s) => s.put(salvo));
+      return salvo;
+    } catch (err) {
+      if (!semRede(err)) throw err;
+    }
+    if (metodo === "POST") op.id = await proximoIdLocal();
+    await tx(["lancamentos", "fila"], "readwrite", (lanc, fila) => {
+      fila.add(op);
+      if (metodo === "DELETE") {
+        lanc.delete(id);
+      } else {
+        lanc.get(op.id).onsuccess = (e) => lanc.put({ ...(e.target.result || {}), ...corpo, id: op.id, pendente: true });
+      }
+    });
+    return metodo === "DELETE" ? { detail: "Exclusão pendente" } : { ...corpo, id: op.id, pendente: true };
+  }
+
+  // Reenvia a fila na ordem; para na primeira falha que não seja uma recusa
+  // (sem rede, 5xx, 429), mantendo a op na fila. Devolve quantas foram enviadas.
+  async function reenviar() {
+    const fila = await tx(["fila"], "readonly", (s) => s.getAll());
+    const ids = {};  // id local (negativo) → id criado no servidor, para as ops já lidas acima
+    let enviadas = 0, recusadas = 0;
+    for (const op of fila) {
+      const id = ids[op.id] ?? op.id;
+      let salvo = null;
+      try {
+        salvo = await enviar({ ...op, id });
+        if (op.metodo === "POST") ids[op.id] = salvo.id;
+      } catch (err) {
+        if (!recusada(err)) break;
+        // recusada (ex.: lançamento já excluído em outro aparelho): descarta e segue
+        console.warn("Gravação offline recusada pelo servidor", op, err);
+        recusadas++;
+      }
+      await tx(["lancamentos", "fila"], "readwrite", (lanc, f) => {
+        f.delete(op.n);
+        if (op.id < 0 || !salvo) lanc.delete(op.id);  // id local some; o do servidor entra abaixo
+        if (salvo && op.metodo !== "DELETE") lanc.put(salvo);
+        if (salvo && op.metodo === "POST") {
+          // o resto da fila passa a usar o id do servidor: vale mesmo se o reenvio parar aqui
+          f.openCursor().onsuccess = (e) => {
+            const c = e.target.result;
+            if (!c) return;
+            if (c.value.id === op.id) c.update({ ...c.value, id: salvo.id });
+            c.continue();
+          };
+        }
+      });
+      enviadas++;
+    }
+    // a cópia local pode ter ficado diferente do servidor: sincroniza tudo de novo
+    if (recusadas) await limpar();
+    return enviadas;
+  }
+
+  return { sincronizar, gravar, reenviar };
+})();